@@ -1,13 +1,30 @@
 import streamlit as st
-import streamlit.components.v1 as components
-import pandas as pd
-import numpy as np
-import math
-import random
 import json
-import io
-import re
+import math
+import time as time_module
 from datetime import datetime, timedelta, time
+from lazy import lazy_import
+from model import MatchTable, Schedule, Session, Stage, VenueLayout
+from scheduling import get_match_priority, schedule_matches, optimize_schedule, multi_start_schedule, schedule_score, repair_schedule
+from generation import make_test_teams, assign_groups, generate_round_robin, generate_bracket
+from rendering import get_group_color_hex, get_match_color_hex, build_schedule_table, build_style_base, build_style_matrix, build_fill_matrix, build_heatmap_style
+from budget import CostRates, estimate_cost, plan_capacity, cheapest_candidates, verify_candidates, plan_groups, best_group_plan
+from cache import ARTIFACT_CACHE, content_key, matches_key
+from publish import PUBLISHED, ScheduleView
+from itinerary import TeamIndex
+from bracket import build_bracket_html
+from standings import GroupStandings, fill_placeholders, relabel_table, score_changes
+from store import get_store
+from config import ConfigError, dump_config, load_config
+from profiling import Trace, activate, span, span_in
+from venues import default_final_venue, schedule_venues
+from validation import validate_matches, validate_schedule, violation_rows
+
+# 大套件延遲載入：pandas 只在要顯示表格時、openpyxl 只在下載 Excel 時才 import
+pd = lazy_import("pandas")
+components = lazy_import("streamlit.components.v1")
+export = lazy_import("export")
+scoresheets = lazy_import("scoresheets")
 
 # 設定頁面寬度
 st.set_page_config(layout="wide", page_title="熊德盃賽事規劃系統 v4.6")
@@ -31,260 +48,83 @@ if 'schedule' not in st.session_state:
     st.session_state.schedule = None
 if 'schedule_list' not in st.session_state:
     st.session_state.schedule_list = [] 
-
-# --- 顏色定義 ---
-COLOR_PALETTE = [
-    '#FFCDD2', '#C8E6C9', '#BBDEFB', '#FFF9C4', 
-    '#E1BEE7', '#FFE0B2', '#B2DFDB', '#F0F4C3'
-]
-
-def get_group_color_hex(level_name, all_levels):
-    try:
-        if "決賽" in level_name or "總冠軍" in level_name: return '#FF8A80'
-        if "季殿" in level_name: return '#FFD180'
-        if "敗部" in level_name: return '#EA80FC'
-        
-        normal_levels = [l for l in all_levels if "決賽" not in l and "敗部" not in l]
-        if level_name in normal_levels:
-            idx = normal_levels.index(level_name) % len(COLOR_PALETTE)
-            return COLOR_PALETTE[idx]
-        return '#FFFFFF'
-    except:
-        return '#FFFFFF'
-
-# --- 核心功能：HTML/CSS 手繪樹狀圖 (直角無箭頭) ---
-def render_custom_bracket(final_match, sub_matches, title, icon):
-    """
-    使用 CSS Flexbox 繪製標準的 1對2 樹狀圖
-    """
-    # 準備資料
-    if not final_match:
-        return f"<div style='padding:20px;'>尚無 {title} 資料</div>"
-        
-    top_node_html = f"""
-    <div class="match-box final-box">
-        <div class="match-no">Match No.{final_match['match_no']} {icon}</div>
-        <div class="match-desc">{final_match['desc']}</div>
-        <div class="match-teams">{final_match['team_a']} <br>vs<br> {final_match['team_b']}</div>
-    </div>
-    """
-    
-    bottom_nodes_html = ""
-    # 如果有下層比賽 (來源比賽)，且數量為 2 (剛好畫成樹狀)
-    # 如果數量不夠，就用 placeholder 補
-    children = sub_matches[:2]
-    
-    # 確保有兩個子節點位置，為了排版對稱
-    if len(children) == 0:
-        # 如果沒有下層比賽 (例如季軍賽通常沒有直接的前置賽事編號，是輸的過來)，顯示「敗方」資訊
-        bottom_nodes_html = f"""
-        <div class="child-wrapper">
-            <div class="match-box sub-box placeholder">
-                4強賽 敗方1
-            </div>
-        </div>
-        <div class="child-wrapper">
-            <div class="match-box sub-box placeholder">
-                4強賽 敗方2
-            </div>
-        </div>
-        """
-    elif len(children) == 1:
-         # 只有一場? 雖然罕見但防呆
-         m = children[0]
-         bottom_nodes_html = f"""
-        <div class="child-wrapper">
-            <div class="match-box sub-box">
-                <div class="match-no">No.{m['match_no']}</div>
-                <div class="match-desc">{m['desc']}</div>
-                <div class="match-teams">{m['team_a']} vs {m['team_b']}</div>
-            </div>
-        </div>
-        <div class="child-wrapper"></div>
-        """
+if 'plan' not in st.session_state:
+    # 排程結果 (model.Schedule)；schedule / schedule_list 都是由它衍生的顯示用資料
+    st.session_state.plan = None
+if 'closed_courts' not in st.session_state:
+    st.session_state.closed_courts = set()
+if 'schedule_key' not in st.session_state:
+    st.session_state.schedule_key = None
+if 'filled_slots' not in st.session_state:
+    # 目前已套用到複賽的代稱 -> 隊名 (例："A組 冠軍" -> 實際隊名)
+    st.session_state.filled_slots = {}
+if 'knockout_results' not in st.session_state:
+    # 複賽 / 決賽成績：比賽 id -> (team_a, team_b, a 得點, b 得點)；隊名與目前的比賽不同時視為過期
+    st.session_state.knockout_results = {}
+if 'tournament_id' not in st.session_state:
+    # 目前開啟的賽事 (store.TournamentStore 的 id)；None 表示只存在這個 session
+    st.session_state.tournament_id = None
+
+# --- 效能紀錄：主辦在「效能分析」開啟後，這個 session 的每次 rerun 都記錄各階段耗時 ---
+if 'trace' not in st.session_state:
+    st.session_state.trace = Trace()
+trace = st.session_state.trace if st.session_state.get("profiling_on") else None
+activate(trace)
+if trace is not None:
+    trace.begin_rerun(f"#{len(trace.reruns) + 1}")
+    rerun_started = time_module.perf_counter_ns()
+
+# --- 樹狀圖 (HTML/CSS 直角連接線，由晉級圖產生) ---
+def render_all_brackets(plan, cache_key=None):
+    with span("bracket_html"):
+        if cache_key is None:
+            html_content, height = build_bracket_html(plan)
+        else:
+            html_content, height = ARTIFACT_CACHE.get_or_compute(("bracket_html", cache_key), lambda: build_bracket_html(plan))
+    with span("bracket_render", bytes=len(html_content)):
+        components.html(html_content, height=min(height, 2400), scrolling=True)
+
+
+# --- 賽事資料庫 (SQLite) ---
+def autosave(method, *args):
+    """有開啟賽事時，把這次的異動寫進資料庫 (只寫變動的列)"""
+    tid = st.session_state.tournament_id
+    if tid is not None:
+        getattr(get_store(), method)(tid, *args)
+
+def open_tournament(tid):
+    """從資料庫載入賽事：隊伍、比賽、排程與已輸入的初賽成績"""
+    data = get_store().load(tid)
+    st.session_state.tournament_id = tid
+    st.session_state.teams = data["teams"]
+    st.session_state.matches = data["matches"]
+    st.session_state.filled_slots = data["settings"].get("filled_slots", {})
+    st.session_state.knockout_results = data["knockout_results"]
+    st.session_state.closed_courts = set()
+    plan = data["plan"]
+    st.session_state.plan = plan
+    if plan is None:
+        st.session_state.schedule, st.session_state.schedule_list = None, []
+        st.session_state.schedule_key = None
     else:
-        # 正常兩場
-        for m in children:
-            bottom_nodes_html += f"""
-            <div class="child-wrapper">
-                <div class="match-box sub-box">
-                    <div class="match-no">No.{m['match_no']}</div>
-                    <div class="match-desc">{m['desc']}</div>
-                    <div class="match-teams">{m['team_a']} <br>vs<br> {m['team_b']}</div>
-                </div>
-            </div>
-            """
-
-    # HTML 結構：利用 CSS 畫線
-    html = f"""
-    <div class="bracket-group">
-        <div class="group-title">{title}</div>
-        <div class="tree-structure">
-            <!-- 上層 -->
-            <div class="level-1">
-                {top_node_html}
-            </div>
-            <!-- 連接線區 -->
-            <div class="connector-lines">
-                <div class="line-vertical-top"></div>
-                <div class="line-horizontal"></div>
-                <div class="line-vertical-bottom-left"></div>
-                <div class="line-vertical-bottom-right"></div>
-            </div>
-            <!-- 下層 -->
-            <div class="level-2">
-                {bottom_nodes_html}
-            </div>
-        </div>
-    </div>
-    """
-    return html
-
-def render_all_brackets(schedule_list):
-    # 1. 篩選資料
-    # 總冠軍
-    gold_final = next((m for m in schedule_list if "總冠軍" in m['desc']), None)
-    # 4強 (勝部)
-    semi_finals = [m for m in schedule_list if "4強" in m['desc'] and "敗部" not in m['desc']]
-    
-    # 敗部冠軍
-    loser_final = next((m for m in schedule_list if "敗部冠軍" in m['desc']), None)
-    # 敗部4強
-    loser_semis = [m for m in schedule_list if "敗部4強" in m['desc']]
-    
-    # 季軍賽
-    bronze_final = next((m for m in schedule_list if "季殿" in m['desc']), None)
-    # 季軍賽的來源是4強的敗方，通常沒有獨立的 "match no"，所以這部分僅顯示樹狀結構的尾端
-    # 這裡我們傳入空 list，讓 render 函數畫出 placeholder
-    bronze_sources = [] 
-
-    # CSS 樣式表
-    css = """
-    <style>
-        .container {
-            display: flex;
-            justify-content: space-around;
-            flex-wrap: wrap;
-            font-family: sans-serif;
-            background-color: #f9f9f9;
-            padding: 20px;
-        }
-        .bracket-group {
-            background-color: white;
-            border: 1px solid #ddd;
-            border-radius: 8px;
-            padding: 15px;
-            margin: 10px;
-            min-width: 300px;
-            box-shadow: 0 2px 5px rgba(0,0,0,0.1);
-        }
-        .group-title {
-            text-align: center;
-            font-weight: bold;
-            font-size: 1.2em;
-            margin-bottom: 20px;
-            color: #333;
-            border-bottom: 2px solid #eee;
-            padding-bottom: 10px;
-        }
-        .tree-structure {
-            display: flex;
-            flex-direction: column;
-            align-items: center;
-        }
-        .match-box {
-            border: 2px solid #FFC107; /* 黃色邊框 */
-            background-color: #FFF9C4; /* 淺黃底 */
-            padding: 8px;
-            text-align: center;
-            border-radius: 4px;
-            width: 180px;
-            position: relative;
-            z-index: 2;
-        }
-        .final-box {
-            font-weight: bold;
-            background-color: #FFF176;
-        }
-        .sub-box {
-            font-size: 0.9em;
-        }
-        .placeholder {
-            border: 2px dashed #ccc;
-            background-color: #eee;
-            color: #777;
-        }
-        .match-no { font-size: 0.8em; color: #555; margin-bottom: 2px; }
-        .match-desc { font-weight: bold; margin-bottom: 4px; }
-        .match-teams { font-size: 0.9em; }
-        
-        /* 線條魔法 */
-        .connector-lines {
-            position: relative;
-            height: 30px; /* 線條區高度 */
-            width: 100%;
-            margin-bottom: 0;
-        }
-        .line-vertical-top {
-            position: absolute;
-            left: 50%;
-            top: 0;
-            height: 15px; /* 上半段長度 */
-            width: 2px;
-            background-color: #333;
-            transform: translateX(-50%);
-        }
-        .line-horizontal {
-            position: absolute;
-            top: 15px; /* 橫線位置 = top線長度 */
-            left: 25%; /* 從左邊 1/4 處開始 */
-            width: 50%; /* 寬度佔一半 */
-            height: 2px;
-            background-color: #333;
-        }
-        /* 特別處理：如果有兩個子節點，橫線才需要。這裡簡化假設都有 */
-        
-        .line-vertical-bottom-left {
-            position: absolute;
-            top: 15px;
-            left: 25%;
-            height: 15px;
-            width: 2px;
-            background-color: #333;
-        }
-        .line-vertical-bottom-right {
-            position: absolute;
-            top: 15px;
-            right: 25%;
-            height: 15px;
-            width: 2px;
-            background-color: #333;
-        }
-
-        .level-2 {
-            display: flex;
-            justify-content: space-between;
-            width: 100%;
-            gap: 20px;
-        }
-        .child-wrapper {
-            flex: 1;
-            display: flex;
-            justify-content: center;
-        }
-    </style>
-    """
-    
-    html_content = f"""
-    {css}
-    <div class="container">
-        {render_custom_bracket(gold_final, semi_finals, "🏆 總冠軍賽程", "🥇")}
-        {render_custom_bracket(loser_final, loser_semis, "🛡️ 敗部冠軍賽程", "🛡️")}
-        {render_custom_bracket(bronze_final, bronze_sources, "🥉 季殿軍賽程", "🥉")}
-    </div>
-    """
-    
-    components.html(html_content, height=600, scrolling=True)
+        st.session_state.schedule, st.session_state.schedule_list = build_schedule_table(plan)
+        st.session_state.schedule_key = plan.fingerprint()
+    group_matches = [m for m in data["matches"] if get_match_priority(m) == 0]
+    standings = GroupStandings.from_matches(group_matches)
+    for a, b, score_a, score_b in data["results"]:
+        try:
+            standings.record(a, b, score_a, score_b)
+        except KeyError:
+            pass
+    st.session_state.standings = (matches_key(group_matches), standings)
+
+def show_violations(violations, table, plan=None):
+    """顯示排程檢查 (validation) 的結果"""
+    if not violations:
+        st.caption("✅ 檢查通過：無隊伍撞場、場地重疊或晉級順序錯誤")
+        return
+    st.error(f"❌ 檢查發現 {len(violations)} 個問題")
+    st.dataframe(pd.DataFrame(violation_rows(violations, table, plan)), hide_index=True, use_container_width=True)
 
 
 # --- 側邊欄設定 ---
@@ -305,6 +145,38 @@ with st.sidebar.expander("1. 時間與場地設定", expanded=not is_guest_mode)
     total_matchup_duration = mins_per_point * points_per_matchup
     st.info(f"ℹ️ 一場對戰佔用: {total_matchup_duration} 分鐘 ({points_per_matchup} 格)")
 
+    st.markdown("---")
+    use_venues = st.checkbox("🏟️ 多場館 / 多天", value=False,
+                             help="每個場館每天一列 (同一天可以有上下午兩個時段)；每組初賽整組排在同一個場館，"
+                                  "各場館平行排程後合併成一張大表。每個時段前後同樣扣除佈置/頒獎時間")
+    venue_layout, travel_minutes = None, 0
+    if use_venues:
+        today = datetime.today().date()
+        venue_rows = st.data_editor(
+            pd.DataFrame([
+                {"場館": "主場館", "日期": today, "開始": time(9, 0), "結束": time(18, 0), "場地數": 10},
+                {"場館": "副場館", "日期": today, "開始": time(9, 0), "結束": time(18, 0), "場地數": 6},
+            ]),
+            num_rows="dynamic", hide_index=True, key="venue_sessions",
+            column_config={
+                "日期": st.column_config.DateColumn(required=True),
+                "開始": st.column_config.TimeColumn(required=True, step=60 * 5),
+                "結束": st.column_config.TimeColumn(required=True, step=60 * 5),
+                "場地數": st.column_config.NumberColumn(min_value=1, max_value=40, step=1, required=True),
+            },
+        ).dropna()
+        setup = timedelta(minutes=setup_teardown_min)
+        try:
+            venue_layout = VenueLayout([
+                Session(str(r["場館"]).strip(), datetime.combine(r["日期"], r["開始"]) + setup,
+                        datetime.combine(r["日期"], r["結束"]) - setup, int(r["場地數"]))
+                for r in venue_rows.to_dict("records") if str(r["場館"]).strip()
+            ], mins_per_point)
+        except ValueError as e:
+            st.error(f"場館時段設定錯誤：{e}")
+        travel_minutes = st.number_input("跨場館移動時間 (分鐘)", 0, 240, 30,
+                                         help="其他場館的晉級隊伍到決賽場館的時間，複賽會晚這麼久才開始")
+
 if not is_guest_mode:
     with st.sidebar.expander("2. 費用與資源估算"):
         shuttles_per_point = st.number_input("每點(每局)使用球數", 1, 6, 2)
@@ -318,40 +190,212 @@ if not is_guest_mode:
         staff_fee = st.number_input("工作人員費用/人 ($)", 0, 5000, 1000)
 
     with st.sidebar.expander("3. 檔案存取"):
-        def convert_to_json():
-            data = {"teams": st.session_state.teams, "matches": st.session_state.matches}
-            return json.dumps(data, ensure_ascii=False)
-        json_data = convert_to_json()
-        st.download_button("💾 下載設定檔 (JSON)", json_data, "badminton_config.json", "application/json")
-        uploaded_file = st.file_uploader("📂 上傳設定檔")
-        if uploaded_file is not None:
+        store = get_store()
+        tournaments = store.list_tournaments()
+        t_names = {tid: name for tid, name, _ in tournaments}
+        current_tid = st.session_state.tournament_id
+        if tournaments:
+            picked = st.selectbox("賽事資料庫", list(t_names), format_func=lambda tid: t_names[tid],
+                                  index=list(t_names).index(current_tid) if current_tid in t_names else 0)
+            if st.button("📂 開啟賽事"):
+                open_tournament(picked)
+                st.rerun()
+        new_name = st.text_input("新賽事名稱")
+        if st.button("➕ 建立新賽事 (以目前資料)"):
+            if not new_name or new_name in t_names.values():
+                st.error("請輸入不重複的賽事名稱")
+            else:
+                tid = store.create_tournament(new_name)
+                store.save_teams(tid, st.session_state.teams)
+                store.save_matches(tid, st.session_state.matches)
+                if st.session_state.plan is not None:
+                    store.save_schedule(tid, st.session_state.plan, points_per_matchup)
+                st.session_state.tournament_id = tid
+                st.rerun()
+        if current_tid in t_names:
+            st.caption(f"目前賽事：{t_names[current_tid]} (異動自動存檔)")
+            with st.popover("🕘 異動紀錄"):
+                st.dataframe(pd.DataFrame(store.history(current_tid, 20), columns=["時間", "類型", "內容"]),
+                             hide_index=True, use_container_width=True)
+
+        st.markdown("---")
+        # 點下載時才產生檔案 (欄式格式，隊名等字串只存一次)
+        # Streamlit 在另一個 thread 呼叫，所以用預設參數綁定資料，不讀 session_state
+        st.download_button(
+            "💾 下載設定檔",
+            lambda teams=st.session_state.teams, matches=st.session_state.matches: dump_config(teams, matches),
+            "badminton_config.npz", "application/octet-stream",
+        )
+        # 舊版 JSON 仍保留給其他工具 / 舊版程式讀取；有開啟賽事時直接由資料庫匯出
+        st.download_button(
+            "💾 下載設定檔 (舊版 JSON)",
+            lambda tid=current_tid if current_tid in t_names else None, teams=st.session_state.teams,
+            matches=st.session_state.matches: store.export_json(tid) if tid is not None
+            else json.dumps({"teams": teams, "matches": matches}, ensure_ascii=False),
+            "badminton_config.json", "application/json",
+        )
+        uploaded_file = st.file_uploader("📂 上傳設定檔 (.npz 或舊版 .json)", type=["npz", "json"])
+        # 同一個檔案只在上傳時讀一次，之後的 rerun 不再覆蓋目前的資料
+        if uploaded_file is not None and st.session_state.get("loaded_config") != uploaded_file.file_id:
             try:
-                data = json.load(uploaded_file)
-                st.session_state.teams = data.get("teams", [])
-                st.session_state.matches = data.get("matches", [])
-                st.success("✅ 讀取成功！")
-            except:
-                st.error("讀取失敗")
+                teams, matches = load_config(uploaded_file.getvalue())
+                st.session_state.teams = teams
+                st.session_state.matches = matches
+                st.session_state.loaded_config = uploaded_file.file_id
+                # 比賽換了，舊排程 (與資料庫一樣) 作廢，需重新排程
+                st.session_state.plan = None
+                st.session_state.schedule, st.session_state.schedule_list = None, []
+                st.session_state.schedule_key = None
+                st.session_state.closed_courts = set()
+                st.session_state.knockout_results = {}
+                if current_tid in t_names:
+                    store.import_json(current_tid, {"teams": teams, "matches": matches})
+                st.success(f"✅ 讀取成功！({len(teams)} 隊 / {len(matches)} 場)")
+                table = MatchTable.from_dicts(matches, points_per_matchup)
+                with span("validate", matches=len(table)):
+                    violations = validate_matches(table, teams)
+                show_violations(violations, table)
+            except ConfigError as e:
+                st.error(f"讀取失敗：{e}")
+
+def _traced_bracket_excel(rows, trace):
+    with span_in(trace, "excel_bracket", matches=len(rows)):
+        return export.export_bracket_excel(rows)
 
 # --- 優先級邏輯 ---
-def get_match_priority(match):
-    m_type = match.get("type", "")
-    desc = match.get("desc", "")
-    if "初賽" in m_type: return 0
-    elif "總冠軍" in desc: return 4
-    elif "季殿軍" in desc: return 3
-    elif "敗部冠軍" in desc: return 2
-    elif "複賽" in m_type: return 1
-    return 1
-
 def sort_matches_by_priority():
     if st.session_state.matches:
         st.session_state.matches.sort(key=get_match_priority)
 
+def current_view():
+    """畫面要顯示的排程：訪客看主辦發布的快照 (共用、唯讀)，主辦看自己 session 的排程"""
+    if is_guest_mode:
+        return PUBLISHED.latest()
+    if st.session_state.schedule is None:
+        return None
+    return ScheduleView(None, None, st.session_state.schedule_key, st.session_state.plan,
+                        st.session_state.schedule, st.session_state.schedule_list,
+                        [t['name'] for t in st.session_state.teams])
+
+def get_team_index(schedule_key, plan):
+    """排程的隊伍反向索引 (隊名 / 晉級代稱 -> 比賽)，依排程內容跨 session 共用"""
+    return ARTIFACT_CACHE.get_or_compute(("team_index", schedule_key), lambda: TeamIndex(plan))
+
+def get_standings():
+    """初賽積分：組別結構跟著目前的初賽對戰重建，已輸入的成績保留"""
+    group_matches = [m for m in st.session_state.matches if get_match_priority(m) == 0]
+    key = matches_key(group_matches)
+    cached = st.session_state.get("standings")
+    if cached is None or cached[0] != key:
+        standings = GroupStandings.from_matches(group_matches)
+        if cached is not None:
+            for _, a, b, score_a, score_b in cached[1].results.values():
+                try:
+                    standings.record(a, b, score_a, score_b)
+                except KeyError:
+                    pass  # 重新分組後已不存在的對戰
+        st.session_state.standings = (key, standings)
+    return st.session_state.standings[1]
+
+def knockout_score(mid, team_a, team_b):
+    """已登錄的複賽 / 決賽成績 (team_a 得點, team_b 得點)；沒有或隊伍已不同時為 None"""
+    saved = st.session_state.knockout_results.get(mid)
+    if saved is None or saved[:2] != (team_a, team_b):
+        return None
+    return saved[2:]
+
+def import_score_sheets():
+    """裁判交回的填分表：每個檔只在上傳後讀一次，按下匯入時整批寫進積分與資料庫"""
+    files = st.file_uploader("填分表 (.xlsx)", type=["xlsx"], accept_multiple_files=True, key="score_sheet_files")
+    parsed = st.session_state.setdefault("score_sheets", {})
+    uploaded = {f.file_id: f for f in files or []}
+    for file_id in list(parsed):
+        if file_id not in uploaded:
+            del parsed[file_id]
+    for file_id, f in uploaded.items():
+        if file_id not in parsed:
+            with span("read_score_sheet", file=f.name):
+                parsed[file_id] = scoresheets.read_score_sheet(f.getvalue(), f.name)
+    rows = [row for sheet_rows, _ in parsed.values() for row in sheet_rows]
+    overwrite = st.checkbox("覆寫已登錄的成績", value=False, key="score_overwrite")
+    if st.button("📥 匯入成績", disabled=not rows):
+        plan = st.session_state.plan
+        table = plan.table
+        standings = get_standings()
+
+        def current(mid):
+            team_a, team_b = table.name(table.team_a[mid]), table.name(table.team_b[mid])
+            if table.stage[mid] == Stage.GROUP:
+                return standings.result(team_a, team_b)
+            return knockout_score(mid, team_a, team_b)
+
+        with span("merge_scores", rows=len(rows)):
+            updates, conflicts, unchanged = scoresheets.merge_scores(rows, plan, current, overwrite)
+        conflicts = [c for _, sheet_conflicts in parsed.values() for c in sheet_conflicts] + conflicts
+        group_rows, knockout_rows = [], []
+        for mid, (score_a, score_b) in updates.items():
+            team_a, team_b = table.name(table.team_a[mid]), table.name(table.team_b[mid])
+            if table.stage[mid] == Stage.GROUP:
+                try:
+                    standings.record(team_a, team_b, score_a, score_b)
+                except KeyError:
+                    conflicts.append(scoresheets.Conflict(None, None, None, int(plan.match_no[mid]), "不在目前的分組積分"))
+                    continue
+                group_rows.append((team_a, team_b, score_a, score_b))
+            else:
+                st.session_state.knockout_results[mid] = (team_a, team_b, score_a, score_b)
+                knockout_rows.append((mid, team_a, team_b, score_a, score_b))
+        if group_rows or knockout_rows:
+            autosave("record_results", group_rows, knockout_rows, f"{len(parsed)} 張填分表")
+        st.session_state.score_import_report = (
+            f"匯入 {len(group_rows)} 場初賽、{len(knockout_rows)} 場複賽 / 決賽；{unchanged} 場成績相同未變動",
+            [{"檔案": c.source, "工作表": c.sheet, "列": c.row, "No.": c.match_no, "原因": c.reason} for c in conflicts],
+        )
+    report = st.session_state.get("score_import_report")
+    if report is not None:
+        summary, conflict_rows = report
+        st.success(f"✅ {summary}")
+        if conflict_rows:
+            st.warning(f"⚠️ {len(conflict_rows)} 列未匯入")
+            st.dataframe(pd.DataFrame(conflict_rows), hide_index=True, use_container_width=True)
+
+def apply_standings(mapping):
+    """把已比完組別的名次填進複賽對戰 (比賽清單與目前的排程一起換，不重新排程)"""
+    previous = st.session_state.filled_slots
+    st.session_state.matches = fill_placeholders(st.session_state.matches, mapping, previous)
+    plan = st.session_state.plan
+    if plan is not None:
+        plan = plan.with_table(relabel_table(plan.table, mapping, previous))
+        st.session_state.plan = plan
+        st.session_state.schedule, st.session_state.schedule_list = build_schedule_table(plan)
+        st.session_state.schedule_key = plan.fingerprint()
+    st.session_state.filled_slots = mapping
+    autosave("save_matches", st.session_state.matches)
+    if plan is not None:
+        autosave("save_schedule", plan, points_per_matchup)
+    autosave("save_settings", {"filled_slots": mapping})
+
+# --- 可比賽時間 (租借時間前後扣除佈置/頒獎)：分組規劃與排程共用 ---
+t_start = datetime.combine(datetime.today(), start_time)
+t_end = datetime.combine(datetime.today(), end_time)
+play_start = t_start + timedelta(minutes=setup_teardown_min)
+play_end = t_end - timedelta(minutes=setup_teardown_min)
+total_play_minutes = (play_end - play_start).total_seconds() / 60
+slots_count = int(total_play_minutes // mins_per_point)
+
 # --- 主畫面 ---
 st.title("🏸 熊德盃羽球比賽 賽制規劃/查詢系統 v4.6")
 
 if is_guest_mode:
+    @st.fragment(run_every=30)
+    def watch_published_version():
+        # 訪客頁面每 30 秒只比對版本號，主辦重新發布時才整頁重畫
+        if PUBLISHED.version != st.session_state.get("seen_version"):
+            st.session_state.seen_version = PUBLISHED.version
+            st.rerun(scope="app")
+
+    st.session_state.seen_version = PUBLISHED.version
+    watch_published_version()
     tabs = st.tabs(["賽程查詢與排程", "樹狀圖與名次"])
 else:
     tabs = st.tabs(["1. 報名與分組", "2. 賽制產生器", "3. 排程與查詢", "4. 樹狀圖與名次", "5. 預算試算"])
@@ -369,36 +413,67 @@ if not is_guest_mode:
             if st.button("新增單一隊伍"):
                 if new_team:
                     st.session_state.teams.append({"name": new_team, "level": manual_level})
+                    autosave("add_team", st.session_state.teams[-1])
                     st.success(f"已新增 {new_team}")
 
             st.divider()
             test_count = st.number_input("生成數量", 1, 50, 8)
             if st.button("⚡ 一鍵生成測試隊伍"):
-                adjectives = ["無敵", "快樂", "爆汗", "光速", "黃金", "超級", "肉腳", "佛系"]
-                nouns = ["暴龍", "羽球團", "小隊", "殺球隊", "戰隊", "俱樂部", "聯隊"]
-                for i in range(test_count):
-                    name = f"{random.choice(adjectives)}{random.choice(nouns)}-{i+1:02d}"
-                    st.session_state.teams.append({"name": name, "level": "未分組"})
+                st.session_state.teams.extend(make_test_teams(test_count))
+                autosave("save_teams", st.session_state.teams)
                 st.success(f"已生成 {test_count} 隊")
                 st.rerun()
             if st.button("🗑️ 清空所有隊伍"):
                 st.session_state.teams = []
+                autosave("save_teams", st.session_state.teams)
                 st.rerun()
         with col2:
             st.subheader(f"隊伍清單 (共 {len(st.session_state.teams)} 隊)")
             with st.expander("⚖️ 自動平衡分組工具", expanded=True):
+                seed_text = st.text_area("種子隊 (選填，一行一隊，由強到弱)", height=80,
+                                         help="種子隊以蛇形分到各組 (A→D、D→A ...)，避免強隊同組；其餘隊伍亂數補滿")
+                seeds = [line.strip() for line in seed_text.splitlines() if line.strip()]
+                unknown_seeds = set(seeds) - {t['name'] for t in st.session_state.teams}
+                if unknown_seeds:
+                    st.warning(f"找不到種子隊：{', '.join(sorted(unknown_seeds))}")
                 target_groups = st.number_input("希望分成幾組？", 2, 8, 2)
-                group_names = ["A組", "B組", "C組", "D組", "E組", "F組", "G組", "H組"]
                 if st.button("🚀 執行亂數分組"):
                     if not st.session_state.teams:
                         st.error("沒有隊伍可以分組")
                     else:
-                        random.shuffle(st.session_state.teams)
-                        for i, team in enumerate(st.session_state.teams):
-                            grp_idx = i % target_groups
-                            team['level'] = group_names[grp_idx]
+                        assign_groups(st.session_state.teams, target_groups, seeds=seeds)
+                        autosave("save_teams", st.session_state.teams)
                         st.success(f"已分組完成！")
                         st.rerun()
+
+                st.markdown("---")
+                st.caption(f"🧮 依場地時間決定組數：{num_courts} 面場地、可比賽 {slots_count} 格 "
+                           f"({slots_count * mins_per_point} 分鐘)、每場 {points_per_matchup} 點，"
+                           "找出排得下且每隊打最多場的分法")
+                g1, g2 = st.columns(2)
+                plan_per_group = g1.number_input("複賽每組晉級隊數 (0 = 只打循環賽)", 0, 8, 2)
+                plan_loser = g2.checkbox("包含敗部", value=True, disabled=plan_per_group == 0)
+                if st.button("🧮 計算最佳分組"):
+                    if len(st.session_state.teams) < 2:
+                        st.error("沒有隊伍可以分組")
+                    else:
+                        with span("plan_groups", teams=len(st.session_state.teams)):
+                            candidates = plan_groups(len(st.session_state.teams), num_courts, slots_count,
+                                                     points_per_matchup, plan_per_group, plan_loser)
+                            best, grouped = best_group_plan(st.session_state.teams, num_courts, slots_count,
+                                                            points_per_matchup, plan_per_group, plan_loser, seeds,
+                                                            candidates=candidates)
+                        st.dataframe(candidates.head(10).rename(columns={
+                            "groups": "組數", "sizes": "各組人數", "matches_per_team": "每隊至少場數",
+                            "group_matches": "初賽場數", "knockout_matches": "複賽場數",
+                            "lb_slots": "最少需要格數", "slots_count": "可用格數", "feasible": "排得下",
+                        }), hide_index=True, use_container_width=True)
+                        if best is None:
+                            st.error("目前的場地與時間排不下任何分法，請增加場地、縮短每場點數或延長時間")
+                        else:
+                            st.session_state.teams = grouped
+                            autosave("save_teams", st.session_state.teams)
+                            st.success(f"已分成 {best.groups} 組 ({best.sizes})，每隊至少 {best.matches_per_team} 場初賽")
             if st.session_state.teams:
                 df_teams = pd.DataFrame(st.session_state.teams)
                 df_teams.index = df_teams.index + 1
@@ -414,204 +489,261 @@ if not is_guest_mode:
         with c1:
             st.markdown("### 🔹 第一階段：分組循環賽")
             if st.button("產生【初賽】循環賽程"):
-                st.session_state.matches = [] 
-                levels = sorted(list(set(t['level'] for t in st.session_state.teams)))
-                count = 0
-                for lvl in levels:
-                    if lvl == "未分組": continue
-                    lvl_teams = [t for t in st.session_state.teams if t['level'] == lvl]
-                    n = len(lvl_teams)
-                    for i in range(n):
-                        for j in range(i + 1, n):
-                            st.session_state.matches.append({
-                                "type": "初賽",
-                                "level": lvl,
-                                "team_a": lvl_teams[i]['name'],
-                                "team_b": lvl_teams[j]['name'],
-                                "desc": f"{lvl} 循環賽"
-                            })
-                            count += 1
+                st.session_state.matches = generate_round_robin(st.session_state.teams)
+                count = len(st.session_state.matches)
+                rounds = max((m['round'] for m in st.session_state.matches), default=0)
                 sort_matches_by_priority()
-                if count > 0: st.success(f"已新增 {count} 場初賽！")
+                autosave("save_matches", st.session_state.matches)
+                if count > 0: st.success(f"已新增 {count} 場初賽 (共 {rounds} 輪)！")
                 else: st.warning("請先分組。")
 
         with c2:
             st.markdown("### 🔸 第二階段：複賽 & 決賽")
-            col_a, col_b = st.columns(2)
-            group_1 = col_a.selectbox("對戰群組 1", ["A組", "B組", "C組", "D組"], index=0)
-            group_2 = col_b.selectbox("對戰群組 2", ["A組", "B組", "C組", "D組"], index=1)
+            group_options = sorted({t['level'] for t in st.session_state.teams if t['level'] != "未分組"}) or ["A組", "B組", "C組", "D組"]
+            col_a, col_b = st.columns([3, 1])
+            ko_groups = col_a.multiselect("晉級組別", group_options, default=group_options[:2])
+            per_group = col_b.number_input("每組晉級隊數", min_value=1, max_value=8, value=2)
             include_loser = st.checkbox("包含敗部賽程", value=True)
             
             if st.button("產生【複賽/決賽】對戰"):
-                match_sf1 = {"type": "複賽-勝部", "level": "決賽區", "team_a": f"{group_1} 冠軍", "team_b": f"{group_2} 亞軍", "desc": "4強賽 A1vsB2"}
-                match_sf2 = {"type": "複賽-勝部", "level": "決賽區", "team_a": f"{group_2} 冠軍", "team_b": f"{group_1} 亞軍", "desc": "4強賽 B1vsA2"}
-                st.session_state.matches.extend([match_sf1, match_sf2])
-                
-                if include_loser:
-                    match_ls1 = {"type": "複賽-敗部", "level": "敗部區", "team_a": f"{group_1} 季軍", "team_b": f"{group_2} 殿軍", "desc": "敗部4強 A3vsB4"}
-                    match_ls2 = {"type": "複賽-敗部", "level": "敗部區", "team_a": f"{group_2} 季軍", "team_b": f"{group_1} 殿軍", "desc": "敗部4強 B3vsA4"}
-                    match_l_final = {"type": "決賽-敗部", "level": "敗部區", "team_a": "敗部4強 勝方1", "team_b": "敗部4強 勝方2", "desc": "🛡️ 敗部冠軍賽"}
-                    st.session_state.matches.extend([match_ls1, match_ls2, match_l_final])
-                
-                match_bronze = {"type": "決賽-勝部", "level": "決賽區", "team_a": "4強賽 敗方1", "team_b": "4強賽 敗方2", "desc": "🥉 季殿軍賽"}
-                match_gold = {"type": "決賽-勝部", "level": "決賽區", "team_a": "4強賽 勝方1", "team_b": "4強賽 勝方2", "desc": "🏆 總冠軍賽"}
-                st.session_state.matches.extend([match_bronze, match_gold])
-                
-                sort_matches_by_priority()
-                st.success("已新增決賽賽程！")
+                try:
+                    knockout = generate_bracket(ko_groups, int(per_group), include_loser)
+                except ValueError as e:
+                    st.error(str(e))
+                else:
+                    st.session_state.matches.extend(knockout)
+                    sort_matches_by_priority()
+                    autosave("save_matches", st.session_state.matches)
+                    st.success("已新增決賽賽程！")
 
         st.divider()
         if st.button("⚠️ 清空賽程"):
             st.session_state.matches = []
+            autosave("save_matches", st.session_state.matches)
             st.rerun()
             
-        df_matches = pd.DataFrame(st.session_state.matches)
-        if not df_matches.empty:
+        if st.session_state.matches:
+            df_matches = pd.DataFrame(st.session_state.matches)
             df_matches.index = df_matches.index + 1
             st.dataframe(df_matches, use_container_width=True)
 
 # ==========================================
 # Tab 3: 排程 (賽程大表)
 # ==========================================
+def set_plan(plan, points_per_matchup):
+    """新排程存進 session (與資料庫) 並顯示結果"""
+    st.session_state.plan = plan
+    with span("build_table"):
+        st.session_state.schedule, st.session_state.schedule_list = build_schedule_table(plan)
+    st.session_state.closed_courts = set()
+    st.session_state.schedule_key = plan.fingerprint()
+    get_team_index(st.session_state.schedule_key, plan)
+    # 排程前會依優先級重排比賽，比賽順序 (= match_id) 要跟排程一起存
+    autosave("save_matches", st.session_state.matches)
+    autosave("save_schedule", plan, points_per_matchup)
+
+    unscheduled = plan.unscheduled_ids()
+    if len(unscheduled):
+        st.warning(f"⚠️ 尚有 {len(unscheduled)} 場排不進去")
+    else:
+        st.success("✅ 賽程大表生成完畢！")
+    with span("validate", matches=len(plan.table)):
+        violations = validate_schedule(plan, play_start, play_end, st.session_state.teams)
+    show_violations(violations, plan.table, plan)
+
 schedule_tab_idx = 0 if is_guest_mode else 2
 with tabs[schedule_tab_idx]:
     st.subheader("排程系統 (賽程大表)")
     
-    t_start = datetime.combine(datetime.today(), start_time)
-    t_end = datetime.combine(datetime.today(), end_time)
-    play_start = t_start + timedelta(minutes=setup_teardown_min)
-    play_end = t_end - timedelta(minutes=setup_teardown_min)
-    total_play_minutes = (play_end - play_start).total_seconds() / 60
-    slots_count = int(total_play_minutes // mins_per_point)
-    
     # 搜尋框
     c_filter, _ = st.columns([2, 2])
     with c_filter:
-        team_list = ["無"] + [t['name'] for t in st.session_state.teams]
-        team_list += ["A組", "B組", "C組", "D組", "冠軍", "季軍"]
+        shown_view = current_view()
+        if shown_view is not None:
+            team_list = ["無"] + get_team_index(shown_view.schedule_key, shown_view.plan).search_options()
+        else:
+            team_list = ["無"] + [t['name'] for t in st.session_state.teams]
         filter_team = st.selectbox("🔍 搜尋隊伍 (高亮顯示)", team_list)
 
     if not is_guest_mode:
+        c_opt, c_budget = st.columns([1, 1])
+        use_optimize = c_opt.checkbox("🧠 最佳化模式 (縮短總時程)", value=False, disabled=use_venues,
+                                      help="多場館模式不支援，請用多次嘗試")
+        optimize_seconds = c_budget.number_input("最佳化秒數", 1, 120, 5, disabled=not use_optimize)
+        c_multi, c_runs, c_seed = st.columns([2, 1, 1])
+        use_multi = c_multi.checkbox("🎲 多次嘗試取最佳 (多核心平行)", value=False,
+                                     help="以不同的比賽順序排很多次，取排不進去最少、最早結束的一份；同一個種子結果相同")
+        multi_attempts = c_runs.number_input("嘗試次數", 2, 2000, 64, disabled=not use_multi)
+        multi_seed = c_seed.number_input("亂數種子", 0, 999999, 0, disabled=not use_multi)
+        venue_groups, final_venue = {}, None
+        if venue_layout is not None:
+            with st.expander("🏟️ 組別分配場館", expanded=True):
+                final_venue = st.selectbox("複賽 / 決賽場館", venue_layout.venues,
+                                           index=venue_layout.venues.index(default_final_venue(venue_layout)))
+                group_levels = sorted({m['level'] for m in st.session_state.matches if get_match_priority(m) == 0})
+                if group_levels:
+                    picks = st.data_editor(
+                        pd.DataFrame({"組別": group_levels, "場館": ["自動"] * len(group_levels)}),
+                        hide_index=True, disabled=["組別"], key="venue_groups",
+                        column_config={"場館": st.column_config.SelectboxColumn(
+                            options=["自動"] + venue_layout.venues, required=True)},
+                    )
+                    venue_groups = {g: v for g, v in zip(picks["組別"], picks["場館"]) if v != "自動"}
         if st.button("🚀 開始排程 (生成大表)"):
             if not st.session_state.matches:
                 st.error("無賽程資料")
-            else:
+            elif use_venues and venue_layout is None:
+                st.error("請先修正場館時段設定")
+            elif venue_layout is not None:
                 sort_matches_by_priority()
-                
-                schedule_grid = [["" for _ in range(num_courts)] for _ in range(slots_count)]
-                grid_meta = [[None for _ in range(num_courts)] for _ in range(slots_count)]
-                match_queue = st.session_state.matches.copy()
-                team_busy_until = {} 
-                scheduled_matches_list = []
-
-                for row in range(slots_count):
-                    if row + points_per_matchup > slots_count: break
-                    if match_queue:
-                         match_queue.sort(key=get_match_priority)
-                         min_p = min(get_match_priority(m) for m in match_queue)
+                input_key = content_key(
+                    matches_key(st.session_state.matches), venue_layout.to_json(), points_per_matchup,
+                    sorted(venue_groups.items()), final_venue, travel_minutes,
+                    use_multi and (multi_attempts, multi_seed)
+                )
+                plan = ARTIFACT_CACHE.get(("schedule", input_key))
+                if plan is None:
+                    try:
+                        with st.spinner(f"{len(venue_layout.venues)} 個場館平行排程..."), span("schedule", matches=len(st.session_state.matches)):
+                            plan, assignment = schedule_venues(
+                                st.session_state.matches, points_per_matchup, venue_layout, venue_groups, final_venue,
+                                travel_minutes, attempts=multi_attempts if use_multi else 1, seed=multi_seed
+                            )
+                    except ValueError as e:
+                        st.error(str(e))
                     else:
-                        min_p = 999
-
-                    for col in range(num_courts):
-                        if not match_queue: break
-                        if schedule_grid[row][col] != "": continue
-                            
-                        found_match_idx = -1
-                        for idx, match in enumerate(match_queue):
-                            if get_match_priority(match) > min_p: continue
-                            ta, tb = match['team_a'], match['team_b']
-                            if not (row < team_busy_until.get(ta, -1) or row < team_busy_until.get(tb, -1)):
-                                found_match_idx = idx
-                                break
-                        
-                        if found_match_idx != -1:
-                            match = match_queue.pop(found_match_idx)
-                            end_row = row + points_per_matchup
-                            
-                            for r in range(row, end_row):
-                                schedule_grid[r][col] = "OCCUPIED"
-                                grid_meta[r][col] = match
-                            
-                            team_busy_until[match['team_a']] = end_row
-                            team_busy_until[match['team_b']] = end_row
-                            
-                            if match_queue:
-                                min_p = min(get_match_priority(m) for m in match_queue)
-
-                global_match_counter = 1
-                final_schedule_grid = [["" for _ in range(num_courts)] for _ in range(slots_count)]
-                
-                for row in range(slots_count):
-                    for col in range(num_courts):
-                        match_info = grid_meta[row][col]
-                        if match_info:
-                            current_no = global_match_counter
-                            global_match_counter += 1
-                            
-                            is_head = False
-                            if row == 0: is_head = True
-                            elif grid_meta[row-1][col] != match_info: is_head = True
-                            
-                            if is_head:
-                                cell_text = f"No.{current_no}\n{match_info['team_a']}\nvs\n{match_info['team_b']}\n({match_info['level']})"
-                                if 'start_no' not in match_info:
-                                    match_info['start_no'] = current_no
-                            else:
-                                cell_text = f"No.{current_no} ..."
-                            
-                            final_schedule_grid[row][col] = cell_text
-                            
-                            if is_head:
-                                export_item = match_info.copy()
-                                export_item['match_no'] = current_no
-                                export_item['time'] = (play_start + timedelta(minutes=row*mins_per_point)).strftime("%H:%M")
-                                scheduled_matches_list.append(export_item)
-
-                time_labels = []
-                for i in range(slots_count):
-                    t = play_start + timedelta(minutes=i*mins_per_point)
-                    time_labels.append(t.strftime("%H:%M"))
-                col_labels = [f"Court {i+1}" for i in range(num_courts)]
-                
-                st.session_state.schedule = pd.DataFrame(final_schedule_grid, index=time_labels, columns=col_labels)
-                st.session_state.schedule_list = scheduled_matches_list
-                
-                if match_queue:
-                    st.warning(f"⚠️ 尚有 {len(match_queue)} 場排不進去")
-                else:
-                    st.success("✅ 賽程大表生成完畢！")
-
-    if st.session_state.schedule is not None:
+                        ARTIFACT_CACHE.put(("schedule", input_key), plan)
+                        st.info("🏟️ " + "、".join(f"{g} → {v}" for g, v in sorted(assignment.items())))
+                if plan is not None:
+                    set_plan(plan, points_per_matchup)
+            else:
+                sort_matches_by_priority()
+                input_key = content_key(
+                    matches_key(st.session_state.matches), num_courts, slots_count, points_per_matchup,
+                    play_start, mins_per_point, use_optimize and optimize_seconds,
+                    use_multi and (multi_attempts, multi_seed)
+                )
+                # 排程結果只引用自己的 MatchTable，可以跨 session 共用
+                plan = ARTIFACT_CACHE.get(("schedule", input_key))
+                if plan is None:
+                    table = MatchTable.from_dicts(st.session_state.matches, points_per_matchup)
+                    with span("schedule", matches=len(table)):
+                        placements, unscheduled = schedule_matches(table, num_courts, slots_count)
+                    greedy_score = schedule_score(placements, unscheduled)
+                    start_order = None
+                    if use_multi:
+                        with st.spinner(f"平行嘗試 {multi_attempts} 種順序..."), span("multi_start", attempts=multi_attempts):
+                            placements, unscheduled, start_order, best_attempt = multi_start_schedule(
+                                table, num_courts, slots_count, multi_attempts, seed=multi_seed
+                            )
+                        multi_score = schedule_score(placements, unscheduled)
+                        st.info(f"🎲 第 {best_attempt} 次嘗試最佳：多排入 {greedy_score[0] - multi_score[0]} 場，"
+                                f"提早 {(greedy_score[1] - multi_score[1]) * mins_per_point} 分鐘結束 (種子 {multi_seed})")
+                    if use_optimize:
+                        with st.spinner(f"最佳化中 ({optimize_seconds} 秒)..."), span("optimize", seconds=optimize_seconds):
+                            placements, unscheduled = optimize_schedule(
+                                table, num_courts, slots_count, optimize_seconds, order=start_order
+                            )
+                        opt_score = schedule_score(placements, unscheduled)
+                        saved_slots = greedy_score[1] - opt_score[1]
+                        extra_matches = greedy_score[0] - opt_score[0]
+                        st.info(f"🧠 最佳化：多排入 {extra_matches} 場，提早 {saved_slots * mins_per_point} 分鐘結束")
+                    plan = Schedule.from_placements(table, placements, slots_count, num_courts, play_start, mins_per_point)
+                    ARTIFACT_CACHE.put(("schedule", input_key), plan)
+                set_plan(plan, points_per_matchup)
+
+    if not is_guest_mode and st.session_state.plan is not None:
         st.divider()
+        plan = st.session_state.plan
+        with st.expander("🛠️ 臨時狀況：從現在起局部重排 (不重新編號)"):
+            time_options = list(st.session_state.schedule.index)
+            r1, r2 = st.columns(2)
+            cutoff_label = r1.selectbox("現在時間 (此時間前開打的比賽固定不動)", time_options)
+            change_type = r2.radio("狀況", ["場地關閉", "比賽延長", "隊伍延遲"], horizontal=True)
+            cutoff_row = time_options.index(cutoff_label)
+            court_labels = list(st.session_state.schedule.columns)
+            extend, delays, close = {}, {}, set()
+            if change_type == "場地關閉":
+                close_label = st.selectbox("關閉場地", court_labels)
+                close = {court_labels.index(close_label)}
+            elif change_type == "比賽延長":
+                match_nos = [int(plan.match_no[mid]) for mid in plan.scheduled_ids()]
+                ext_no = st.selectbox("比賽編號 (No.)", match_nos)
+                ext_slots = st.number_input("延長幾格", 1, 10, 1)
+                extend = {ext_no: ext_slots}
+            else:
+                delay_team = st.selectbox("遲到隊伍", [t['name'] for t in st.session_state.teams] or ["無"])
+                ready_label = st.selectbox("最早可上場時間", time_options[cutoff_row:])
+                delays = {delay_team: time_options.index(ready_label)}
+            if st.button("🔧 重排後續賽程"):
+                closed_courts = st.session_state.closed_courts | close
+                with span("repair"):
+                    plan, moved, unscheduled = repair_schedule(
+                        plan, cutoff_row, closed_courts=closed_courts, extend=extend, delays=delays
+                    )
+                st.session_state.plan = plan
+                st.session_state.schedule, st.session_state.schedule_list = build_schedule_table(plan)
+                st.session_state.closed_courts = closed_courts
+                st.session_state.schedule_key = plan.fingerprint()
+                get_team_index(st.session_state.schedule_key, plan)
+                autosave("save_schedule", plan, points_per_matchup)
+                for mid in moved:
+                    st.write(f"🔁 No.{plan.match_no[mid]} → {plan.time_label(plan.start[mid])} {plan.court_label(plan.court[mid])}")
+                if unscheduled:
+                    st.warning(f"⚠️ 有 {len(unscheduled)} 場已無法排入")
+                else:
+                    st.success(f"✅ 已局部重排 {len(moved)} 場")
+                with span("validate", matches=len(plan.table)):
+                    violations = validate_schedule(plan, play_start, play_end, st.session_state.teams)
+                show_violations(violations, plan.table, plan)
+
+        c_pub, c_pub_info = st.columns([1, 3])
+        if c_pub.button("📢 發布賽程給訪客"):
+            PUBLISHED.publish(st.session_state.schedule_key, plan, st.session_state.schedule,
+                              st.session_state.schedule_list, [t['name'] for t in st.session_state.teams])
+        published = PUBLISHED.latest()
+        if published is None:
+            c_pub_info.caption("尚未發布，訪客目前看不到賽程")
+        elif published.schedule_key == st.session_state.schedule_key:
+            c_pub_info.caption(f"✅ 訪客看到的是目前的賽程 (第 {published.version} 版，{published.published_at:%H:%M:%S} 發布)")
+        else:
+            c_pub_info.caption(f"⚠️ 目前的賽程尚未發布；訪客看到的是第 {published.version} 版 ({published.published_at:%H:%M:%S})")
+
+    view = current_view()
+    if is_guest_mode and view is None:
+        st.info("主辦單位尚未發布賽程")
+    elif view is not None:
+        if is_guest_mode:
+            st.caption(f"第 {view.version} 版賽程 ({view.published_at:%H:%M} 更新)")
         all_match_levels = []
-        if st.session_state.schedule_list:
-            all_match_levels = sorted(list(set(m['level'] for m in st.session_state.schedule_list)))
-
-        def style_schedule_cells(val):
-            val_str = str(val)
-            if not val_str: return ''
-            if filter_team != "無" and filter_team in val_str:
-                return 'background-color: #ffeb3b; color: black; font-weight: bold; border: 2px solid red;'
-            if "..." in val_str:
-                 return 'background-color: #f5f5f5; color: #aaa;'
-
-            bg_color = '#FFFFFF'
-            try:
-                if "總冠軍" in val_str: bg_color = '#FF8A80'
-                elif "季殿" in val_str: bg_color = '#FFD180'
-                elif "敗部" in val_str: bg_color = '#EA80FC'
-                elif "決賽" in val_str: bg_color = '#FF8A80'
+        if view.schedule_list:
+            all_match_levels = sorted(list(set(m['level'] for m in view.schedule_list)))
+
+        schedule_key = view.schedule_key
+        plan = view.plan
+        team_index = get_team_index(schedule_key, plan)
+        with span("style_matrix"):
+            style_base = ARTIFACT_CACHE.get_or_compute(
+                ("style_base", schedule_key), lambda: build_style_base(plan, all_match_levels)
+            )
+            style_matrix = ARTIFACT_CACHE.get_or_compute(
+                ("style", schedule_key, filter_team),
+                lambda: build_style_matrix(style_base, plan, view.schedule_df, filter_team, team_index)
+            )
+
+        if filter_team != "無":
+            trip = team_index.itinerary(filter_team)
+            st.markdown(f"#### 📋 {filter_team} 的賽程 (共 {len(trip)} 場)")
+            if trip:
+                df_trip = pd.DataFrame(trip).rename(columns={
+                    "match_no": "No.", "time": "開始", "end": "結束", "court": "場地", "opponent": "對手",
+                    "level": "組別", "desc": "說明", "rest_minutes": "休息 (分)",
+                })
+                if df_trip["休息 (分)"].isna().all():
+                    df_trip = df_trip.drop(columns=["休息 (分)"])
                 else:
-                    found_level = None
-                    for lvl in all_match_levels:
-                        if lvl in val_str:
-                            found_level = lvl
-                            break
-                    if found_level:
-                        bg_color = get_group_color_hex(found_level, all_match_levels)
-            except:
-                pass
-            return f'background-color: {bg_color}; color: black;'
+                    df_trip["休息 (分)"] = df_trip["休息 (分)"].astype("Int64")
+                st.dataframe(df_trip, use_container_width=True, hide_index=True)
 
         st.write("🎨 **組別色碼圖例**：")
         cols = st.columns(8)
@@ -621,23 +753,25 @@ with tabs[schedule_tab_idx]:
             cols[i % 8].markdown(f"<div style='background-color:{c};padding:5px;border-radius:5px;text-align:center'>{level}</div>", unsafe_allow_html=True)
         st.write("")
 
-        st.dataframe(
-            st.session_state.schedule.style.applymap(style_schedule_cells),
-            height=800,
-            use_container_width=True
-        )
-        
-        buffer = io.BytesIO()
-        with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-            st.session_state.schedule.to_excel(writer, sheet_name='賽程大表')
-            df_list = pd.DataFrame(st.session_state.schedule_list)
-            if not df_list.empty:
-                df_list = df_list[['match_no', 'time', 'level', 'team_a', 'team_b', 'desc']]
-                df_list.to_excel(writer, sheet_name='對戰清單')
+        # Styler 在 st.dataframe 裡才真正套用樣式並序列化
+        with span("styled_table", cells=int(view.schedule_df.size)):
+            st.dataframe(
+                view.schedule_df.style.apply(lambda _: style_matrix, axis=None),
+                height=800,
+                use_container_width=True
+            )
         
+        def build_schedule_xlsx(schedule_df=view.schedule_df, schedule_list=view.schedule_list,
+                                plan=plan, levels=all_match_levels, trace=trace):
+            # 按下下載才執行 (Streamlit 在另一個 thread 呼叫，所以用預設參數綁定資料，不讀 session_state)
+            with span_in(trace, "excel_schedule", matches=len(schedule_list)):
+                fills = build_fill_matrix(plan, levels)
+                colors = {m['match_no']: get_match_color_hex(m, levels) for m in schedule_list}
+                return export.export_schedule_excel(schedule_df, schedule_list, fills, colors)
+
         st.download_button(
             label="📥 一鍵下載 Excel",
-            data=buffer.getvalue(),
+            data=lambda key=schedule_key: ARTIFACT_CACHE.get_or_compute(("schedule_xlsx", key), build_schedule_xlsx),
             file_name="badminton_master_schedule.xlsx",
             mime="application/vnd.ms-excel"
         )
@@ -649,11 +783,12 @@ tree_tab_idx = 1 if is_guest_mode else 3
 with tabs[tree_tab_idx]:
     st.subheader("🏆 晉級樹狀圖 (Brackets)")
     
-    if not st.session_state.schedule_list:
-        st.info("請先在「排程」頁面完成排程。")
+    view = current_view()
+    if view is None or not view.schedule_list:
+        st.info("主辦單位尚未發布賽程。" if is_guest_mode else "請先在「排程」頁面完成排程。")
     else:
-        schedule_list = st.session_state.schedule_list
-        render_all_brackets(schedule_list) # 呼叫新函數
+        schedule_list = view.schedule_list
+        render_all_brackets(view.plan, view.schedule_key)
 
         st.divider()
         st.info("👇 下方表格可直接複製到 Google Sheets (填分用)")
@@ -662,31 +797,83 @@ with tabs[tree_tab_idx]:
         bracket_matches = [m for m in schedule_list if "決賽" in m['type'] or "複賽" in m['type']]
         bracket_matches.sort(key=lambda x: x['match_no'])
         
+        id_by_no = {int(view.plan.match_no[mid]): int(mid) for mid in view.plan.scheduled_ids()}
         bracket_data = []
         for m in bracket_matches:
+            score = knockout_score(id_by_no.get(m['match_no']), m['team_a'], m['team_b'])
             bracket_data.append({
                 "Match No.": m['match_no'],
                 "Stage": m['desc'],
                 "Team A": m['team_a'],
-                "Score A": "",
-                "Score B": "",
+                "Score A": score[0] if score else "",
+                "Score B": score[1] if score else "",
                 "Team B": m['team_b'],
                 "Next Match": " (自行填寫)" 
             })
         df_bracket = pd.DataFrame(bracket_data)
         st.dataframe(df_bracket, use_container_width=True)
 
-        buffer_bracket = io.BytesIO()
-        with pd.ExcelWriter(buffer_bracket, engine='openpyxl') as writer:
-            df_bracket.to_excel(writer, sheet_name='樹狀圖填分表', index=False)
-                
         st.download_button(
             label="📥 下載填分表 (Excel)",
-            data=buffer_bracket.getvalue(),
+            data=lambda key=view.schedule_key, rows=bracket_data, trace=trace: ARTIFACT_CACHE.get_or_compute(
+                ("bracket_xlsx", key, content_key(rows)), lambda: _traced_bracket_excel(rows, trace)
+            ),
             file_name="tournament_brackets.xlsx",
             mime="application/vnd.ms-excel"
         )
 
+        if not is_guest_mode:
+            with st.expander("📤 匯入填分表 (可一次選多個 Excel)"):
+                import_score_sheets()
+
+    if not is_guest_mode and any(get_match_priority(m) == 0 for m in st.session_state.matches):
+        st.divider()
+        st.subheader("📊 初賽積分與名次")
+        standings = get_standings()
+        no_by_pair = {(m['team_a'], m['team_b']): m['match_no'] for m in st.session_state.schedule_list}
+        score_rows = []
+        for m in st.session_state.matches:
+            if get_match_priority(m) != 0:
+                continue
+            score = standings.result(m['team_a'], m['team_b'])
+            score_rows.append({
+                "No.": no_by_pair.get((m['team_a'], m['team_b'])), "組別": m['level'],
+                "Team A": m['team_a'], "Score A": score[0] if score else None,
+                "Score B": score[1] if score else None, "Team B": m['team_b'],
+            })
+        edited = st.data_editor(
+            pd.DataFrame(score_rows), key="group_scores", hide_index=True, use_container_width=True,
+            disabled=["No.", "組別", "Team A", "Team B"],
+            column_config={
+                "Score A": st.column_config.NumberColumn(min_value=0, step=1),
+                "Score B": st.column_config.NumberColumn(min_value=0, step=1),
+            },
+        )
+        # 只把有變動的那幾場送進積分 (每場 O(1))
+        for team_a, team_b, score in score_changes(score_rows, edited["Score A"], edited["Score B"]):
+            if score is None:
+                standings.clear(team_a, team_b)
+                autosave("clear_result", team_a, team_b)
+            else:
+                standings.record(team_a, team_b, *score)
+                autosave("record_result", team_a, team_b, *score)
+
+        group_cols = st.columns(min(4, max(1, len(standings.groups))))
+        for i, lvl in enumerate(sorted(standings.groups)):
+            with group_cols[i % len(group_cols)]:
+                done = "✅ 已完賽" if standings.is_complete(lvl) else f"{standings.played[lvl]}/{standings.expected[lvl]} 場"
+                st.markdown(f"**{lvl}** ({done})")
+                df_rank = pd.DataFrame(standings.table_rows(lvl)).rename(columns={
+                    "rank": "名次", "team": "隊伍", "played": "賽", "wins": "勝", "losses": "敗",
+                    "points_won": "得點", "points_lost": "失點", "point_diff": "點差", "point_ratio": "點數比",
+                })
+                st.dataframe(df_rank, hide_index=True, use_container_width=True)
+
+        mapping = standings.placeholder_map()
+        if mapping != st.session_state.filled_slots:
+            apply_standings(mapping)
+            st.rerun()
+
 # ==========================================
 # Tab 5: 預算
 # ==========================================
@@ -701,15 +888,13 @@ if not is_guest_mode:
             total_matches = len(st.session_state.matches)
             rent_hours = (datetime.combine(datetime.today(), end_time) - datetime.combine(datetime.today(), start_time)).total_seconds() / 3600
             
-            cost_court = num_courts * rent_hours * court_price_per_hr
-            total_shuttles = total_matches * points_per_matchup * shuttles_per_point
-            tubes_needed = math.ceil(total_shuttles / 12)
-            cost_shuttles = tubes_needed * shuttle_tube_price
-            cost_medals = total_players * medal_price
-            cost_food = total_players * food_price
-            cost_staff = staff_count * staff_fee
-            
-            total_cost = cost_court + cost_shuttles + cost_medals + cost_food + cost_staff
+            rates = CostRates(court_price_per_hr, shuttles_per_point, shuttle_tube_price,
+                              medal_price, food_price, staff_count, staff_fee)
+            cost = estimate_cost(rates, num_courts, rent_hours, total_matches, points_per_matchup, total_players)
+            cost_court, cost_shuttles = cost["court"], cost["shuttles"]
+            cost_medals, cost_food, cost_staff = cost["medals"], cost["food"], cost["staff"]
+            tubes_needed = int(cost["tubes"])
+            total_cost = cost["total"]
             
             c1, c2, c3 = st.columns(3)
             with c1:
@@ -734,4 +919,78 @@ if not is_guest_mode:
             ]
             df_cost = pd.DataFrame(cost_data)
             df_cost["金額"] = df_cost["金額"].apply(lambda x: f"${x:,.0f}")
-            st.table(df_cost)
\ No newline at end of file
+            st.table(df_cost)
+
+            st.markdown("### 🧮 容量規劃 (場地數 x 每點時間 x 點數 x 佈置時間)")
+            if not st.session_state.matches:
+                st.info("先在「賽制」分頁產生對戰，才能估算需要的場地與時間")
+            else:
+                def with_current(options, current):
+                    return sorted(set(options) | {current})
+
+                p1, p2, p3, p4 = st.columns(4)
+                courts_range = p1.slider("場地數範圍", 1, 20, (max(1, num_courts - 4), min(20, num_courts + 4)))
+                mins_options = p2.multiselect("每點分鐘", with_current([10, 12, 15, 20, 25, 30], mins_per_point), [mins_per_point])
+                points_options = p3.multiselect("每場點數", with_current(list(range(1, 8)), points_per_matchup),
+                                                sorted({max(1, points_per_matchup - 1), points_per_matchup, min(7, points_per_matchup + 1)}))
+                setup_options = p4.multiselect("佈置/頒獎預留 (分鐘)", with_current([0, 30, 45, 60, 90, 120], setup_teardown_min), [setup_teardown_min])
+
+                if mins_options and points_options and setup_options:
+                    rent_minutes = rent_hours * 60
+                    with span("capacity_plan"):
+                        capacity = plan_capacity(
+                            st.session_state.matches, rates, rent_minutes, total_players,
+                            range(courts_range[0], courts_range[1] + 1), mins_options, points_options, setup_options
+                        )
+                    # 熱度圖：排得下的組合顯示預算 (越綠越便宜)，灰色為下限就超出可用時間
+                    heat = capacity.assign(
+                        total_cost=capacity["total_cost"].where(capacity["feasible"]),
+                        row=capacity["points_per_matchup"].astype(str) + " 點 x " + capacity["mins_per_point"].astype(str) + " 分",
+                        col=capacity["num_courts"].astype(str) + " 面",
+                    ).pivot_table(index="row", columns="col", values="total_cost", aggfunc="min", dropna=False, sort=False)
+                    heat = heat[sorted(heat.columns, key=lambda c: int(c.split()[0]))]
+                    heat_style = build_heatmap_style(heat)
+                    st.dataframe(heat.style.apply(lambda _: heat_style, axis=None).format(
+                        lambda v: "" if pd.isna(v) else f"${v:,.0f}"), use_container_width=True)
+                    st.caption(f"共試算 {len(capacity)} 組參數；灰色 = 依下限估算也排不完")
+
+                    top_k = st.number_input("以實際排程驗證最便宜的前幾組", 1, 20, 5)
+                    candidates = cheapest_candidates(capacity, top_k)
+                    capacity_labels = {
+                        "num_courts": "場地數", "mins_per_point": "每點分鐘", "points_per_matchup": "每場點數",
+                        "setup_teardown_min": "佈置分鐘", "lb_minutes": "最快結束 (分, 下限)", "total_cost": "總預算",
+                        "finish_minutes": "實排結束 (分)", "unscheduled": "未排入",
+                    }
+                    check_key = content_key(matches_key(st.session_state.matches), candidates.to_dict("records"))
+                    if st.button("▶️ 執行實際排程驗證"):
+                        with span("capacity_verify", candidates=len(candidates)):
+                            st.session_state.capacity_checks = (check_key, verify_candidates(st.session_state.matches, candidates))
+                    checks = st.session_state.get("capacity_checks")
+                    shown = checks[1] if checks and checks[0] == check_key else candidates
+                    if shown.empty:
+                        st.warning("範圍內沒有排得下的組合，請增加場地數或減少點數")
+                    else:
+                        shown = shown[[c for c in capacity_labels if c in shown.columns]].rename(columns=capacity_labels)
+                        shown["總預算"] = shown["總預算"].apply(lambda x: f"${x:,.0f}")
+                        st.dataframe(shown, use_container_width=True, hide_index=True)
+# ==========================================
+# 效能分析 (主辦限定)
+# ==========================================
+if not is_guest_mode:
+    with st.sidebar.expander("4. 效能分析"):
+        st.checkbox("記錄每次 rerun 的各階段耗時", key="profiling_on")
+        if trace is not None:
+            # 整次 rerun 的耗時算到這裡為止 (不含這個面板本身)
+            trace.add_span("total", rerun_started, time_module.perf_counter_ns())
+            last = trace.reruns[-1]
+            st.markdown(f"**本次 rerun {last['label']}**")
+            st.dataframe(pd.DataFrame(trace.span_rows(last)), hide_index=True, use_container_width=True)
+            if last["counters"]:
+                st.dataframe(pd.DataFrame(sorted(last["counters"].items()), columns=["計數器", "值"]),
+                             hide_index=True, use_container_width=True)
+            st.markdown(f"**最近 {len(trace.reruns)} 次 rerun (ms)**")
+            st.dataframe(pd.DataFrame(trace.summary_rows()).set_index("rerun"), use_container_width=True)
+            st.download_button("📥 下載 Chrome trace (JSON)", trace.chrome_trace, "badminton_trace.json",
+                               "application/json", help="可用 chrome://tracing 或 ui.perfetto.dev 開啟，附在問題回報")
+            if st.button("🧹 清除紀錄"):
+                trace.reruns.clear()
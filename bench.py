@@ -0,0 +1,261 @@
+"""
+排程效能測試 (不需 Streamlit)
+
+以亂數隊伍組出模擬賽事，分段量測：
+循環賽產生 / 排程 / 大表組裝 / 上色 / Excel 匯出
+並記錄每段的峰值記憶體與排不進去的場數，結果寫成 JSON。
+
+    python bench.py --teams 8 50 200 1000 2000 --groups 8 --out bench_results.json
+    python bench.py --baseline old.json   # 與舊版結果比較，變慢超過容許倍數時 exit 1
+    python bench.py --cold-start          # 冷啟動檢查：超過時間預算或首頁載入大套件時 exit 1
+"""
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas  # noqa: F401  先載入 (app 裡是延遲載入)，避免算進第一個量測階段
+
+from model import MatchTable, Schedule
+from scheduling import schedule_matches
+from generation import make_test_teams, assign_groups, generate_round_robin, generate_knockout, group_name
+from rendering import build_schedule_table, build_style_base, build_style_matrix, build_fill_matrix, get_match_color_hex
+from export import export_schedule_excel
+
+PHASES = ["generate", "schedule", "grid", "style", "export"]
+
+# 冷啟動：新的 process 從 import streamlit 到 app.py 第一次執行完 (空白 session)
+COLD_START_BUDGET = 1.5  # 秒
+# 首頁不該載入的大套件 (要用到的功能才載入)
+LAZY_MODULES = ["pandas", "openpyxl", "pyarrow"]
+COLD_START_SCRIPT = """
+import json, sys, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=60).run()
+print(json.dumps({
+    "seconds": time.perf_counter() - t0,
+    "exceptions": [str(e.value) for e in at.exception],
+    "loaded": [m for m in json.loads(sys.argv[2]) if m in sys.modules],
+}))
+"""
+
+
+def build_teams(n_teams, target_groups, seed):
+    rng = random.Random(seed)
+    teams = make_test_teams(n_teams, rng)
+    assign_groups(teams, max(1, min(target_groups, n_teams // 2)), rng)
+    return teams
+
+
+def run_phase(fn, track_memory):
+    if track_memory:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+    t0 = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - t0
+    peak_mb = None
+    if track_memory:
+        peak_mb = (tracemalloc.get_traced_memory()[1] - base) / 1024 / 1024
+    return result, seconds, peak_mb
+
+
+def run_case(n_teams, target_groups, num_courts, mins_per_point, points_per_matchup,
+             play_minutes, seed, track_memory):
+    slots_count = int(play_minutes // mins_per_point)
+    play_start = datetime.combine(datetime.today(), datetime.min.time()).replace(hour=10)
+    teams = build_teams(n_teams, target_groups, seed)
+    timings = {}
+    state = {}
+
+    def generate():
+        matches = generate_round_robin(teams)
+        matches.extend(generate_knockout(group_name(0), group_name(1), True))
+        return matches
+
+    def schedule():
+        table = MatchTable.from_dicts(state["matches"], points_per_matchup)
+        placements, _ = schedule_matches(table, num_courts, slots_count)
+        return Schedule.from_placements(table, placements, slots_count, num_courts, play_start, mins_per_point)
+
+    def grid():
+        return build_schedule_table(state["plan"])
+
+    def style():
+        schedule_df, schedule_list = state["table"]
+        all_match_levels = sorted(list(set(m['level'] for m in schedule_list)))
+        style_base = build_style_base(state["plan"], all_match_levels)
+        style_matrix = build_style_matrix(style_base, state["plan"], schedule_df, group_name(0))
+        styler = schedule_df.style.apply(lambda _: style_matrix, axis=None)
+        # 與 st.dataframe 相同，只計算樣式不輸出 HTML
+        styler._compute()
+        return styler
+
+    def export():
+        schedule_df, schedule_list = state["table"]
+        levels = sorted(list(set(m['level'] for m in schedule_list)))
+        fills = build_fill_matrix(state["plan"], levels)
+        colors = {m['match_no']: get_match_color_hex(m, levels) for m in schedule_list}
+        return export_schedule_excel(schedule_df, schedule_list, fills, colors)
+
+    steps = [("generate", generate, "matches"), ("schedule", schedule, "plan"),
+             ("grid", grid, "table"), ("style", style, None), ("export", export, "xlsx")]
+    for name, fn, key in steps:
+        result, seconds, peak_mb = run_phase(fn, track_memory)
+        timings[name] = {"seconds": round(seconds, 6), "peak_mb": None if peak_mb is None else round(peak_mb, 3)}
+        if key:
+            state[key] = result
+
+    plan = state["plan"]
+    return {
+        "teams": n_teams,
+        "groups": max(1, min(target_groups, n_teams // 2)),
+        "num_courts": num_courts,
+        "mins_per_point": mins_per_point,
+        "points_per_matchup": points_per_matchup,
+        "slots_count": slots_count,
+        "matches": len(state["matches"]),
+        "scheduled": len(plan.scheduled_ids()),
+        "unscheduled": len(plan.unscheduled_ids()),
+        "xlsx_bytes": len(state["xlsx"]),
+        "phases": timings,
+        "total_seconds": round(sum(t["seconds"] for t in timings.values()), 6),
+    }
+
+
+def best_of(runs):
+    """重複執行時，每段取最快的一次 (記憶體取最大)"""
+    best = dict(runs[0])
+    best["phases"] = {}
+    for name in PHASES:
+        secs = min(r["phases"][name]["seconds"] for r in runs)
+        mems = [r["phases"][name]["peak_mb"] for r in runs if r["phases"][name]["peak_mb"] is not None]
+        best["phases"][name] = {"seconds": secs, "peak_mb": max(mems) if mems else None}
+    best["total_seconds"] = round(sum(t["seconds"] for t in best["phases"].values()), 6)
+    return best
+
+
+def environment_info():
+    import numpy
+    import pandas
+    import openpyxl
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                             text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        rev = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_rev": rev,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pandas": pandas.__version__,
+        "numpy": numpy.__version__,
+        "openpyxl": openpyxl.__version__,
+    }
+
+
+def compare(results, baseline_path, tolerance):
+    """回傳變慢超過 tolerance 倍的 (隊伍數, 階段, 舊秒數, 新秒數)"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    old_by_key = {(r["teams"], r["groups"], r["num_courts"]): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        old = old_by_key.get((r["teams"], r["groups"], r["num_courts"]))
+        if not old:
+            continue
+        for name in PHASES:
+            old_s = old["phases"][name]["seconds"]
+            new_s = r["phases"][name]["seconds"]
+            # 太短的量測誤差大，低於 5ms 不比較
+            if new_s > 0.005 and new_s > old_s * tolerance:
+                regressions.append((r["teams"], name, old_s, new_s))
+    return regressions
+
+
+def measure_cold_start(app_path="app.py", repeat=3):
+    """在新的 python process 量 app 的冷啟動時間，取最快的一次"""
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", COLD_START_SCRIPT, app_path, json.dumps(LAZY_MODULES)],
+                             capture_output=True, text=True, timeout=300, check=True).stdout
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+    return min(runs, key=lambda r: r["seconds"])
+
+
+def check_cold_start(budget, app_path="app.py"):
+    r = measure_cold_start(app_path)
+    print(f"冷啟動 {r['seconds']*1000:.0f}ms (預算 {budget*1000:.0f}ms)")
+    problems = []
+    if r["exceptions"]:
+        problems.append(f"app 執行錯誤: {r['exceptions']}")
+    if r["seconds"] > budget:
+        problems.append("超過冷啟動預算")
+    if r["loaded"]:
+        problems.append(f"首頁就載入了 {', '.join(r['loaded'])}")
+    for p in problems:
+        print(f"⚠️ {p}")
+    return 1 if problems else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="熊德盃排程效能測試")
+    parser.add_argument("--teams", type=int, nargs="+", default=[8, 50, 200, 1000, 2000])
+    parser.add_argument("--groups", type=int, default=8, help="target_groups")
+    parser.add_argument("--courts", type=int, default=10, help="num_courts")
+    parser.add_argument("--mins-per-point", type=int, default=15)
+    parser.add_argument("--points-per-matchup", type=int, default=5)
+    parser.add_argument("--play-minutes", type=int, default=420, help="扣除佈置後可比賽的分鐘數")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="不追蹤記憶體 (計時較準)")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--baseline", help="與舊的結果檔比較")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="容許變慢倍數")
+    parser.add_argument("--cold-start", action="store_true", help="只做冷啟動檢查")
+    parser.add_argument("--cold-start-budget", type=float, default=COLD_START_BUDGET, help="冷啟動時間預算 (秒)")
+    args = parser.parse_args(argv)
+
+    if args.cold_start:
+        return check_cold_start(args.cold_start_budget)
+
+    track_memory = not args.no_memory
+    if track_memory:
+        tracemalloc.start()
+
+    results = []
+    for n_teams in args.teams:
+        runs = [run_case(n_teams, args.groups, args.courts, args.mins_per_point,
+                         args.points_per_matchup, args.play_minutes, args.seed, track_memory)
+                for _ in range(args.repeat)]
+        r = best_of(runs)
+        results.append(r)
+        phases = "  ".join(f"{k}={v['seconds']*1000:.1f}ms" for k, v in r["phases"].items())
+        print(f"{n_teams:>5} 隊 {r['matches']:>7} 場 (未排 {r['unscheduled']:>7})  {phases}")
+
+    if track_memory:
+        tracemalloc.stop()
+
+    report = {"env": environment_info(), "args": vars(args), "results": results}
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"結果已寫入 {args.out}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for n_teams, name, old_s, new_s in regressions:
+            print(f"⚠️ {n_teams} 隊 {name}: {old_s*1000:.1f}ms -> {new_s*1000:.1f}ms")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+import html
+
+from cache import FRAGMENT_CACHE, content_key
+from model import Stage
+
+ROOT_TITLES = {
+    Stage.FINAL: ("🏆 總冠軍賽程", "🥇"),
+    Stage.LOSER_FINAL: ("🛡️ 敗部冠軍賽程", "🛡️"),
+    Stage.BRONZE: ("🥉 季殿軍賽程", "🥉"),
+}
+ROOT_ORDER = [Stage.FINAL, Stage.LOSER_FINAL, Stage.BRONZE, Stage.KNOCKOUT, Stage.GROUP]
+
+NODE_HEIGHT = 96  # 每個葉節點約佔的高度 (px)，用來估算 iframe 高度
+
+
+class BracketGraph:
+    """
+    複賽 / 決賽的晉級圖：feeds[mid] 為該場兩隊的來源，
+    roots 為勝方不再晉級的比賽 (總冠軍、敗部冠軍、季殿軍...)，每個 root 畫成一棵樹
+    """
+    __slots__ = ("schedule", "feeds", "roots")
+
+    def __init__(self, schedule):
+        self.schedule = schedule
+        table = schedule.table
+        links = table.links()
+        # 晉級來源直接取 MatchTable 的依賴 (由 "<輪次> 勝方k" 代稱解析)
+        feeds = {mid: list(links[mid].feeds) for mid in range(len(table)) if table.stage[mid] != Stage.GROUP}
+        fed_up = {feed.source for fs in feeds.values() for feed in fs if feed.kind == "win" and feed.source is not None}
+        self.feeds = feeds
+        self.roots = sorted((mid for mid in feeds if mid not in fed_up),
+                            key=lambda mid: (ROOT_ORDER.index(Stage(table.stage[mid])), mid))
+
+    def leaf_count(self, mid, seen=None):
+        seen = set() if seen is None else seen
+        seen.add(mid)
+        feeds = self.feeds.get(mid, [])
+        if not feeds:
+            return 1
+        total = 0
+        for feed in feeds:
+            if feed.kind == "win" and feed.source is not None and feed.source not in seen:
+                total += self.leaf_count(feed.source, seen)
+            else:
+                total += 1
+        return total
+
+
+def _render_node(match_no, desc, team_a, team_b, when, icon, is_root):
+    e = html.escape
+    label = f"No.{match_no}" if match_no else "未排入"
+    when_html = f'<div class="match-time">{e(when)}</div>' if when else ""
+    box_class = "match-box final-box" if is_root else "match-box"
+    return (
+        f'<div class="{box_class}">'
+        f'<div class="match-no">{label} {icon}</div>'
+        f'<div class="match-desc">{e(desc)}</div>'
+        f'<div class="match-teams">{e(team_a)} <br>vs<br> {e(team_b)}</div>'
+        f'{when_html}</div>'
+    )
+
+
+def node_html(schedule, mid, icon="", is_root=False):
+    """單一比賽節點的 HTML；依內容 hash 快取，內容沒變的節點不會重畫"""
+    table = schedule.table
+    s = table.strings
+    match_no = int(schedule.match_no[mid])
+    when = f"{schedule.time_label(schedule.start[mid])} {schedule.court_label(schedule.court[mid])}" if match_no else ""
+    fields = (match_no, s[table.desc[mid]], s[table.team_a[mid]], s[table.team_b[mid]], when, icon, is_root)
+    return FRAGMENT_CACHE.get_or_compute(("bracket_node", content_key(*fields)), lambda: _render_node(*fields))
+
+
+def _placeholder_html(text):
+    return f'<div class="subtree"><div class="match-box placeholder">{html.escape(text)}</div></div>'
+
+
+def _subtree_html(graph, mid, seen, icon="", is_root=False):
+    seen.add(mid)
+    children = []
+    for feed in graph.feeds.get(mid, []):
+        if feed.kind == "win" and feed.source is not None and feed.source not in seen:
+            children.append(_subtree_html(graph, feed.source, seen))
+        else:
+            # 敗方晉級 (例如季殿軍賽) 的來源已畫在主樹，這裡只放代稱
+            children.append(_placeholder_html(feed.text))
+    box = node_html(graph.schedule, mid, icon, is_root)
+    if not children:
+        return f'<div class="subtree">{box}</div>'
+    return f'<div class="subtree has-children"><div class="children">{"".join(children)}</div>{box}</div>'
+
+
+BRACKET_CSS = """
+<style>
+    .container {
+        display: flex;
+        justify-content: space-around;
+        flex-wrap: wrap;
+        font-family: sans-serif;
+        background-color: #f9f9f9;
+        padding: 20px;
+    }
+    .bracket-group {
+        background-color: white;
+        border: 1px solid #ddd;
+        border-radius: 8px;
+        padding: 15px;
+        margin: 10px;
+        min-width: 300px;
+        overflow-x: auto;
+        box-shadow: 0 2px 5px rgba(0,0,0,0.1);
+    }
+    .group-title {
+        text-align: center;
+        font-weight: bold;
+        font-size: 1.2em;
+        margin-bottom: 20px;
+        color: #333;
+        border-bottom: 2px solid #eee;
+        padding-bottom: 10px;
+    }
+    .match-box {
+        border: 2px solid #FFC107; /* 黃色邊框 */
+        background-color: #FFF9C4; /* 淺黃底 */
+        padding: 8px;
+        text-align: center;
+        border-radius: 4px;
+        width: 180px;
+        font-size: 0.9em;
+        position: relative;
+        z-index: 2;
+    }
+    .final-box {
+        font-weight: bold;
+        font-size: 1em;
+        background-color: #FFF176;
+    }
+    .placeholder {
+        border: 2px dashed #ccc;
+        background-color: #eee;
+        color: #777;
+    }
+    .match-no { font-size: 0.8em; color: #555; margin-bottom: 2px; }
+    .match-desc { font-weight: bold; margin-bottom: 4px; }
+    .match-teams { font-size: 0.9em; }
+    .match-time { font-size: 0.75em; color: #777; margin-top: 4px; }
+
+    /* 由左到右：來源比賽在左、晉級後的比賽在右，直角連接線 */
+    .subtree { display: flex; align-items: center; }
+    .children { display: flex; flex-direction: column; justify-content: center; }
+    .children > .subtree { position: relative; padding: 6px 20px 6px 0; }
+    .children > .subtree::after {
+        content: ""; position: absolute; right: 0; top: 50%; width: 20px; border-top: 2px solid #333;
+    }
+    .children > .subtree::before {
+        content: ""; position: absolute; right: 0; top: 0; bottom: 0; border-right: 2px solid #333;
+    }
+    .children > .subtree:first-child::before { top: 50%; }
+    .children > .subtree:last-child::before { bottom: 50%; }
+    .children > .subtree:only-child::before { display: none; }
+    .has-children > .match-box { margin-left: 20px; }
+    .has-children > .match-box::before {
+        content: ""; position: absolute; left: -22px; top: 50%; width: 20px; border-top: 2px solid #333;
+    }
+</style>
+"""
+
+
+def build_bracket_html(schedule):
+    """
+    所有晉級樹的 HTML 與建議高度 (px)
+    每個節點的片段各自快取，整頁只是把片段接起來
+    """
+    graph = BracketGraph(schedule)
+    if not graph.roots:
+        return "<div style='padding:20px;'>尚無複賽 / 決賽資料</div>", 120
+
+    table = schedule.table
+    groups = []
+    tallest = 1
+    for root in graph.roots:
+        title, icon = ROOT_TITLES.get(Stage(table.stage[root]), (table.strings[table.desc[root]], ""))
+        tree = _subtree_html(graph, root, set(), icon, is_root=True)
+        groups.append(f'<div class="bracket-group"><div class="group-title">{html.escape(title)}</div>{tree}</div>')
+        tallest = max(tallest, graph.leaf_count(root))
+    page = f'{BRACKET_CSS}<div class="container">{"".join(groups)}</div>'
+    return page, tallest * NODE_HEIGHT + 160
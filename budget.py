@@ -0,0 +1,228 @@
+import random
+from collections import namedtuple
+
+import numpy as np
+
+from generation import assign_groups, generate_bracket, generate_round_robin, group_name
+from lazy import lazy_import
+from model import MatchTable
+from scheduling import get_match_priority, schedule_matches
+
+pd = lazy_import("pandas")
+
+SHUTTLES_PER_TUBE = 12
+
+# 「5. 預算試算」分頁的單價設定
+CostRates = namedtuple("CostRates", [
+    "court_price_per_hr", "shuttles_per_point", "shuttle_tube_price",
+    "medal_price", "food_price", "staff_count", "staff_fee",
+])
+
+
+def estimate_cost(rates, num_courts, rent_hours, total_matches, points_per_matchup, total_players):
+    """
+    經費試算公式 (預算分頁與容量規劃共用)
+    參數可以是純數字，也可以是可 broadcast 的 numpy 陣列 (一次算整個參數網格)
+    """
+    cost_court = np.multiply(num_courts, rent_hours) * rates.court_price_per_hr
+    total_shuttles = np.multiply(total_matches, points_per_matchup) * rates.shuttles_per_point
+    tubes_needed = np.ceil(total_shuttles / SHUTTLES_PER_TUBE)
+    cost_shuttles = tubes_needed * rates.shuttle_tube_price
+    cost_medals = total_players * rates.medal_price
+    cost_food = total_players * rates.food_price
+    cost_staff = rates.staff_count * rates.staff_fee
+    return {
+        "court": cost_court,
+        "tubes": tubes_needed,
+        "shuttles": cost_shuttles,
+        "medals": cost_medals,
+        "food": cost_food,
+        "staff": cost_staff,
+        "total": cost_court + cost_shuttles + cost_medals + cost_food + cost_staff,
+    }
+
+
+def _load_profile(matches):
+    """
+    每場點數只影響「沒指定 points 的比賽」，所以把格數拆成
+    固定部分 + 預設場數 x 每場點數，之後對任何點數都能直接算
+    """
+    table = MatchTable.from_dicts(matches, 0)
+    span = np.frombuffer(table.span, dtype=np.int32).astype(np.int64) if len(table) else np.zeros(0, np.int64)
+    is_default = span == 0
+    team_a = np.frombuffer(table.team_a, dtype=np.int32) if len(table) else np.zeros(0, np.int32)
+    team_b = np.frombuffer(table.team_b, dtype=np.int32) if len(table) else np.zeros(0, np.int32)
+    n_ids = len(table.strings)
+    team_fixed = np.bincount(team_a, span, n_ids) + np.bincount(team_b, span, n_ids)
+    team_default = np.bincount(team_a, is_default, n_ids) + np.bincount(team_b, is_default, n_ids)
+    return int(span.sum()), int(is_default.sum()), team_fixed, team_default
+
+
+def finish_lower_bound(matches, num_courts, points_per_matchup):
+    """
+    最後結束格的下限 (向量化)：總格數平均到每個場地 / 單一隊伍要打的總格數，取大者
+    num_courts, points_per_matchup 可以是可 broadcast 的整數陣列
+    """
+    fixed_total, n_default, team_fixed, team_default = _load_profile(matches)
+    num_courts = np.asarray(num_courts)
+    ppm = np.asarray(points_per_matchup)
+    total = fixed_total + n_default * ppm
+    court_bound = -(-total // num_courts)
+    # 隊伍負擔只和點數有關，每種點數算一次 (隊伍數 x 點數種類)
+    values, inverse = np.unique(ppm, return_inverse=True)
+    if len(team_fixed):
+        per_value = (team_fixed[:, None] + team_default[:, None] * values[None, :]).max(axis=0)
+    else:
+        per_value = np.zeros(len(values))
+    team_bound = per_value[inverse].reshape(ppm.shape).astype(np.int64)
+    return np.maximum(court_bound, team_bound)
+
+
+def plan_capacity(matches, rates, rent_minutes, total_players,
+                  courts_values, mins_values, points_values, setup_values):
+    """
+    容量規劃：場地數 x 每點分鐘 x 每場點數 x 佈置分鐘 的整個網格一次算完
+    (不跑排程，用 finish_lower_bound 判斷是否可能排得下)
+
+    回傳 DataFrame，每列一組參數：lb_slots (結束格下限)、slots_count (可用格數)、
+    feasible (下限放得進可用時間)、total_cost，依 total_cost 排序
+    """
+    courts, mins, points, setup = np.meshgrid(
+        np.asarray(courts_values, dtype=np.int64), np.asarray(mins_values, dtype=np.int64),
+        np.asarray(points_values, dtype=np.int64), np.asarray(setup_values, dtype=np.int64),
+        indexing="ij"
+    )
+    courts, mins, points, setup = courts.ravel(), mins.ravel(), points.ravel(), setup.ravel()
+
+    play_minutes = rent_minutes - 2 * setup
+    slots_count = np.maximum(play_minutes, 0) // mins
+    lb_slots = finish_lower_bound(matches, courts, points)
+    cost = estimate_cost(rates, courts, rent_minutes / 60, len(matches), points, total_players)
+
+    df = pd.DataFrame({
+        "num_courts": courts,
+        "mins_per_point": mins,
+        "points_per_matchup": points,
+        "setup_teardown_min": setup,
+        "lb_slots": lb_slots,
+        "lb_minutes": lb_slots * mins,
+        "slots_count": slots_count,
+        "feasible": lb_slots <= slots_count,
+        "total_cost": np.broadcast_to(cost["total"], courts.shape).astype(float),
+    })
+    return df.sort_values(["total_cost", "lb_minutes"], kind="stable").reset_index(drop=True)
+
+
+def cheapest_candidates(plan_df, top_k):
+    """
+    可行組合裡最便宜的前 top_k 組；同一組 (場地, 每點分鐘, 點數) 只留佈置時間最長的那個
+    (預算相同，多留的時間給報到與頒獎)
+    """
+    feasible = plan_df[plan_df["feasible"]]
+    feasible = feasible.sort_values("setup_teardown_min", ascending=False, kind="stable")
+    feasible = feasible.drop_duplicates(["num_courts", "mins_per_point", "points_per_matchup"])
+    return feasible.sort_values(["total_cost", "lb_minutes"], kind="stable").head(top_k).reset_index(drop=True)
+
+
+def verify_candidates(matches, candidates):
+    """對候選組合跑真正的排程，補上 finish_slots / unscheduled 兩欄"""
+    finish, unscheduled = [], []
+    for row in candidates.itertuples(index=False):
+        table = MatchTable.from_dicts(matches, int(row.points_per_matchup))
+        placements, missing = schedule_matches(table, int(row.num_courts), int(row.slots_count))
+        finish.append(max((p.row + p.span for p in placements), default=0))
+        unscheduled.append(len(missing))
+    result = candidates.copy()
+    result["finish_slots"] = finish
+    result["finish_minutes"] = result["finish_slots"] * result["mins_per_point"]
+    result["unscheduled"] = unscheduled
+    return result
+
+
+# --- 分組規劃 ---
+def _knockout_lower_bound(qualifiers, include_loser, points_per_matchup):
+    """
+    複賽 / 決賽的 (場數, 依賴鏈格數)；qualifiers 為晉級隊數陣列 (0 = 不打複賽)
+    冠軍要一輪一輪打上去，所以鏈長 = 輪數 x 每場格數 (勝部 / 敗部、季殿軍賽與同一輪並行)
+    各輪不必整輪打完才開始下一輪，所以不以每輪的場地數累加
+    """
+    qualifiers = np.asarray(qualifiers, dtype=np.int64)
+    matches = np.zeros(qualifiers.shape, dtype=np.int64)
+    rounds = np.zeros(qualifiers.shape, dtype=np.int64)
+    brackets = 2 if include_loser else 1
+    size = qualifiers.copy()
+    while (size >= 2).any():
+        active = size >= 2
+        in_round = np.where(active, size // 2 * brackets, 0)
+        in_round = in_round + ((size == 2) & (qualifiers >= 4))  # 季殿軍賽
+        matches += in_round
+        rounds += active
+        size = np.where(active, size // 2, size)
+    return matches, rounds * points_per_matchup
+
+
+def plan_groups(n_teams, num_courts, slots_count, points_per_matchup, per_group=0, include_loser=True,
+                max_groups=None):
+    """
+    分組規劃：分成 1..max_groups 組 (各組人數差不超過 1) 一次用公式算完，不產生比賽也不排程
+
+    - 每隊場數 = 組內人數 - 1 (循環賽場數隨人數平方成長)
+    - 結束格下限 = max(初賽 + 複賽總格數平均到每個場地, 最大組每隊要打的格數 + 複賽 / 決賽的輪數 x 每場格數)
+      (複賽只等晉級來源的組別，可以和其他組的初賽重疊，所以兩段不能直接相加)
+    - per_group > 0 時每組前 per_group 名晉級，晉級總數須為 2 的次方 (敗部再取接下來的 per_group 名)
+
+    回傳 DataFrame，依 (可行, 每隊最少場數多, 總場數多, 結束早) 排序
+    """
+    max_groups = max_groups or max(1, n_teams // 2)
+    groups = np.arange(1, max_groups + 1, dtype=np.int64)
+    small, extra = n_teams // groups, n_teams % groups       # extra 組為 small + 1 人
+    big = small + (extra > 0)
+    group_matches = extra * (small + 1) * small // 2 + (groups - extra) * small * (small - 1) // 2
+    team_bound = (big - 1) * points_per_matchup
+
+    qualifiers = groups * per_group
+    places = per_group * (2 if include_loser else 1)
+    valid = (small >= 2) & ((per_group == 0) | ((qualifiers & (qualifiers - 1)) == 0) & (small >= places)
+                            & (qualifiers >= 2))
+    ko_matches, ko_slots = _knockout_lower_bound(qualifiers if per_group else np.zeros_like(groups),
+                                                 include_loser, points_per_matchup)
+    court_bound = -(-(group_matches + ko_matches) * points_per_matchup // num_courts)
+    lb_slots = np.maximum(court_bound, team_bound + ko_slots)
+
+    df = pd.DataFrame({
+        "groups": groups,
+        "sizes": [" + ".join(f"{size}人×{count}" for size, count in ((b, e), (sm, g - e)) if count)
+                  for g, sm, b, e in zip(groups.tolist(), small.tolist(), big.tolist(), extra.tolist())],
+        "matches_per_team": small - 1,
+        "group_matches": group_matches,
+        "knockout_matches": ko_matches,
+        "lb_slots": lb_slots,
+        "slots_count": slots_count,
+        "feasible": valid & (lb_slots <= slots_count),
+    })
+    df = df[valid]
+    # 每隊至少打幾場相同時，總場數多的 (多數隊伍多打一場) 優先
+    return df.sort_values(["feasible", "matches_per_team", "group_matches", "lb_slots"],
+                          ascending=[False, False, False, True], kind="stable").reset_index(drop=True)
+
+
+def best_group_plan(teams, num_courts, slots_count, points_per_matchup, per_group=0, include_loser=True,
+                    seeds=None, rng=random, max_groups=None, verify=5, candidates=None):
+    """
+    依 plan_groups 的順序，對前 verify 個可行的組數實際分組、產生比賽並排程一次，
+    取第一個全部排得進去的 (每隊場數最多)；回傳 (plan_groups 的那一列, 分好組的 teams 複本)，都不行時為 (None, None)
+    candidates：已算好的 plan_groups 結果 (同樣的參數)，呼叫端要顯示候選表時傳入，不必再算一次
+    """
+    if candidates is None:
+        candidates = plan_groups(len(teams), num_courts, slots_count, points_per_matchup, per_group, include_loser,
+                                 max_groups)
+    for row in candidates[candidates["feasible"]].head(verify).itertuples(index=False):
+        grouped = assign_groups([dict(t) for t in teams], int(row.groups), rng, seeds)
+        matches = generate_round_robin(grouped)
+        if per_group:
+            matches += generate_bracket([group_name(i) for i in range(int(row.groups))], per_group, include_loser)
+        matches.sort(key=get_match_priority)
+        _, missing = schedule_matches(MatchTable.from_dicts(matches, points_per_matchup), num_courts, slots_count)
+        if not missing:
+            return row, grouped
+    return None, None
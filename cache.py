@@ -0,0 +1,83 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from profiling import count
+
+# 影響排程結果的比賽欄位
+MATCH_KEY_FIELDS = ("type", "level", "team_a", "team_b", "desc", "points", "round")
+
+
+def content_key(*parts):
+    """把可 JSON 化的內容轉成固定長度的 key (內容相同 -> key 相同)"""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def matches_key(matches):
+    return content_key([[m.get(f) for f in MATCH_KEY_FIELDS] for m in matches])
+
+
+class LRUCache:
+    """
+    以內容 key 存放的 LRU 快取，超過 max_entries 時淘汰最久沒用到的項目
+    Streamlit 的每個 session 跑在不同 thread，所以存取時加鎖
+    """
+
+    def __init__(self, max_entries=32, name="cache"):
+        self.max_entries = max_entries
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                count(f"{self.name}_hits")
+                return self._data[key]
+            self.misses += 1
+        count(f"{self.name}_misses")
+        return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                count(f"{self.name}_hits")
+                return self._data[key]
+            self.misses += 1
+        count(f"{self.name}_misses")
+        # 計算時不持有鎖，避免一個慢的匯出卡住其他 session
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# 跨 session 共用的結果 (排程 / 上色矩陣 / Excel / 樹狀圖 HTML)，放進來之後都不再修改
+ARTIFACT_CACHE = LRUCache(max_entries=64, name="artifact_cache")
+
+# 樹狀圖等頁面的小片段 (依片段內容 hash)，數量多但每個都很小
+FRAGMENT_CACHE = LRUCache(max_entries=4096, name="fragment_cache")
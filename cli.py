@@ -0,0 +1,288 @@
+"""
+批次排程 (不需 Streamlit)
+
+每個輸入檔是一場賽事，可以是：
+- app 下載的設定檔 (.npz / 舊版 .json)：隊伍與比賽，時間與場地用命令列參數
+- 賽事 JSON：{"teams": [...], "matches": [...] (可省略，自動產生), "settings": {...}}
+  settings 可覆寫命令列參數，鍵名同參數 (num_courts, start, end, groups, knockout, per_group ...)；
+  多場館 / 多天的賽事在 settings 裡給 venues (每個場館每天一筆)
+
+每場賽事輸出到 <out>/<檔名>/：schedule_grid.csv (大表)、matches.csv (比賽清單)、schedule.xlsx
+(不同資料夾 / 副檔名的同名檔案依輸入順序改成 <檔名>-1、<檔名>-2 ...，不會互相覆蓋)
+有比賽排不進去時 exit 1，檔案讀取 / 格式錯誤時 exit 2，排程檢查 (validation) 有問題時 exit 3；
+多個賽事時回傳最嚴重的 (讀取 / 格式錯誤 > 排程檢查 > 排不進去)，與檔案順序無關
+
+    python cli.py events/*.json --out schedules --workers 4
+    python cli.py league.npz --courts 8 --start 08:30 --end 17:00 --attempts 64
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from config import ConfigError, load_config
+from budget import best_group_plan
+from generation import assign_groups, generate_bracket, generate_round_robin, group_name
+from model import MatchTable, Schedule, Session, VenueLayout
+from scheduling import get_match_priority, multi_start_schedule, schedule_matches
+from validation import KIND_LABELS, validate_schedule
+from venues import schedule_venues
+
+EXIT_OK = 0
+EXIT_UNSCHEDULED = 1
+EXIT_ERROR = 2
+EXIT_INVALID = 3
+# 由輕到重
+EXIT_SEVERITY = (EXIT_OK, EXIT_UNSCHEDULED, EXIT_INVALID, EXIT_ERROR)
+
+DEFAULT_SETTINGS = {
+    "num_courts": 10,
+    "start": "09:00",
+    "end": "18:00",
+    "setup_teardown_min": 60,
+    "mins_per_point": 15,
+    "points_per_matchup": 5,
+    "groups": None,          # 自動產生比賽前重新亂數分組 (隊伍還沒分組時必填)；"auto" = 依場地時間決定組數
+    "seeds": None,           # 種子隊名 (由強到弱)，分組時蛇形分散
+    "knockout": None,        # ["A組", "B組"]：沒有給比賽時一併產生複賽 / 決賽
+    "per_group": 2,          # 複賽每組晉級隊數 (晉級總數須為 2 的次方)
+    "include_loser": True,
+    "attempts": 1,           # > 1 時多次嘗試取最佳 (scheduling.multi_start_schedule)
+    "seed": 0,
+    "date": None,            # 比賽日期 (YYYY-MM-DD)，預設今天
+    # 多場館 / 多天 (只能寫在賽事 JSON)：[{"venue", "date", "start", "end", "courts"}, ...]
+    # 給了就改用 venues.schedule_venues，num_courts / start / end 不使用
+    "venues": None,
+    "venue_groups": None,    # {"A組": "甲館"}：指定組別的場館 (其餘自動分配)
+    "final_venue": None,     # 複賽 / 決賽場館 (預設最後結束的場館)
+    "travel_minutes": 30,    # 跨場館移動時間
+}
+
+
+def read_event(path, overrides):
+    """讀一個輸入檔，回傳 (teams, matches 或 None, settings)"""
+    with open(path, "rb") as f:
+        data = f.read()
+    settings = dict(DEFAULT_SETTINGS)
+    settings.update(overrides)
+    if data.startswith(b"PK"):
+        teams, matches = load_config(data)
+        return teams, matches or None, settings
+    try:
+        event = json.loads(data)
+    except ValueError as e:
+        raise ConfigError("無法解析設定檔") from e
+    unknown = set(event.get("settings", {})) - set(DEFAULT_SETTINGS)
+    if unknown:
+        raise ConfigError(f"不認得的設定 {', '.join(sorted(unknown))}")
+    settings.update(event.get("settings", {}))
+    return event.get("teams", []), event.get("matches") or None, settings
+
+
+def auto_groups(teams, settings):
+    """groups = "auto"：用 budget.best_group_plan 找排得下且每隊打最多場的組數"""
+    if settings["venues"]:
+        raise ConfigError("多場館賽事請指定 groups 組數")
+    _, slots_count = play_window(settings)
+    per_group = settings["per_group"] if settings["knockout"] else 0
+    best, grouped = best_group_plan(teams, settings["num_courts"], slots_count, settings["points_per_matchup"],
+                                    per_group, settings["include_loser"], settings["seeds"],
+                                    random.Random(settings["seed"]))
+    if best is None:
+        raise ConfigError("場地與時間排不下任何分組方式")
+    if settings["knockout"]:
+        # 晉級組別改成實際分出來的組
+        settings["knockout"] = [group_name(i) for i in range(int(best.groups))]
+    return grouped
+
+
+def build_matches(teams, matches, settings):
+    """沒有比賽時依分組產生循環賽 (與複賽)，並依優先級排序"""
+    if matches is None:
+        # 已有比賽的設定檔不重新分組，免得比賽與分組對不起來
+        if settings["groups"] or any(t['level'] == "未分組" for t in teams):
+            if not settings["groups"]:
+                raise ConfigError("有未分組的隊伍，請指定 groups")
+            if settings["groups"] == "auto":
+                teams[:] = auto_groups(teams, settings)
+            else:
+                assign_groups(teams, settings["groups"], random.Random(settings["seed"]), settings["seeds"])
+        matches = generate_round_robin(teams)
+        if settings["knockout"]:
+            matches.extend(generate_bracket(settings["knockout"], settings["per_group"], settings["include_loser"]))
+    matches.sort(key=get_match_priority)
+    return matches
+
+
+def play_window(settings):
+    """(開賽時間, 可用格數)；與 app 相同，租借時間前後各扣佈置 / 頒獎時間"""
+    day = datetime.strptime(settings["date"], "%Y-%m-%d").date() if settings["date"] else datetime.today().date()
+    t_start = datetime.combine(day, datetime.strptime(settings["start"], "%H:%M").time())
+    t_end = datetime.combine(day, datetime.strptime(settings["end"], "%H:%M").time())
+    setup = timedelta(minutes=settings["setup_teardown_min"])
+    play_minutes = ((t_end - setup) - (t_start + setup)).total_seconds() / 60
+    return t_start + setup, max(0, int(play_minutes // settings["mins_per_point"]))
+
+
+def venue_layout(settings):
+    """settings["venues"] -> VenueLayout；與單一場地相同，每個時段前後各扣佈置 / 頒獎時間"""
+    setup = timedelta(minutes=settings["setup_teardown_min"])
+    sessions = []
+    for v in settings["venues"]:
+        try:
+            date = v.get("date") or settings["date"]
+            day = datetime.strptime(date, "%Y-%m-%d").date() if date else datetime.today().date()
+            start = datetime.combine(day, datetime.strptime(v["start"], "%H:%M").time())
+            end = datetime.combine(day, datetime.strptime(v["end"], "%H:%M").time())
+            sessions.append(Session(v["venue"], start + setup, end - setup, int(v["courts"])))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ConfigError(f"場館時段設定錯誤 {v}") from e
+    return VenueLayout(sessions, settings["mins_per_point"])
+
+
+def schedule_event(teams, matches, settings, workers=1):
+    if settings["venues"]:
+        plan, _ = schedule_venues(matches, settings["points_per_matchup"], venue_layout(settings),
+                                  settings["venue_groups"], settings["final_venue"], settings["travel_minutes"],
+                                  attempts=settings["attempts"], seed=settings["seed"], workers=workers)
+        return plan
+    play_start, slots_count = play_window(settings)
+    table = MatchTable.from_dicts(matches, settings["points_per_matchup"])
+    if settings["attempts"] > 1:
+        placements, _, _, _ = multi_start_schedule(table, settings["num_courts"], slots_count,
+                                                   settings["attempts"], seed=settings["seed"], workers=workers)
+    else:
+        placements, _ = schedule_matches(table, settings["num_courts"], slots_count)
+    return Schedule.from_placements(table, placements, slots_count, settings["num_courts"],
+                                    play_start, settings["mins_per_point"])
+
+
+def write_outputs(plan, out_dir):
+    # 只有要輸出時才載入 pandas / openpyxl
+    import pandas as pd
+    from export import SCHEDULE_LIST_COLUMNS, export_schedule_excel
+    from rendering import build_fill_matrix, build_schedule_table, get_match_color_hex
+
+    schedule_df, schedule_list = build_schedule_table(plan)
+    levels = sorted(set(m['level'] for m in schedule_list))
+    fills = build_fill_matrix(plan, levels)
+    colors = {m['match_no']: get_match_color_hex(m, levels) for m in schedule_list}
+
+    os.makedirs(out_dir, exist_ok=True)
+    schedule_df.to_csv(os.path.join(out_dir, "schedule_grid.csv"), encoding="utf-8-sig")
+    rows = [dict(m) for m in schedule_list]
+    rows.extend({"match_no": None, "time": "未排入", **plan.table.to_dict(mid)} for mid in plan.unscheduled_ids().tolist())
+    matches_df = pd.DataFrame(rows)
+    front = [c for c in SCHEDULE_LIST_COLUMNS + ["type", "round"] if c in matches_df.columns]
+    matches_df = matches_df[front + [c for c in matches_df.columns if c not in front]]
+    if "round" in matches_df.columns:
+        matches_df["round"] = matches_df["round"].astype("Int64")
+    matches_df.to_csv(os.path.join(out_dir, "matches.csv"), index=False, encoding="utf-8-sig")
+    with open(os.path.join(out_dir, "schedule.xlsx"), "wb") as f:
+        f.write(export_schedule_excel(schedule_df, schedule_list, fills, colors))
+
+
+def event_names(paths):
+    """每個輸入檔的賽事名稱 (= 輸出資料夾名)：檔名去掉副檔名；同名的依序加 -1、-2 ..."""
+    stems = [os.path.splitext(os.path.basename(path))[0] for path in paths]
+    counts = {}
+    for stem in stems:
+        counts[stem] = counts.get(stem, 0) + 1
+    taken = {stem for stem in stems if counts[stem] == 1}
+    names, next_no = [], {}
+    for stem in stems:
+        if counts[stem] == 1:
+            names.append(stem)
+            continue
+        # 加了編號也不能撞到其他輸入檔的名稱
+        while True:
+            next_no[stem] = next_no.get(stem, 0) + 1
+            name = f"{stem}-{next_no[stem]}"
+            if name not in taken:
+                break
+        taken.add(name)
+        names.append(name)
+    return names
+
+
+def run_event(path, out_root, overrides, workers=1, name=None):
+    """
+    單一賽事；回傳結果摘要 dict
+    workers 為多次嘗試 / 多場館平行排程的 process 數 (多個檔案平行時每個檔案只用 1 個，不再開 process pool)
+    name 為輸出資料夾名 (預設為檔名去掉副檔名)
+    """
+    name = name or os.path.splitext(os.path.basename(path))[0]
+    summary = {"event": name, "path": path, "matches": 0, "unscheduled": 0, "finish": None, "error": None,
+               "violations": []}
+    try:
+        teams, matches, settings = read_event(path, overrides)
+        matches = build_matches(teams, matches, settings)
+        summary["matches"] = len(matches)
+        plan = schedule_event(teams, matches, settings, workers)
+        summary["unscheduled"] = int(len(plan.unscheduled_ids()))
+        summary["violations"] = [f"{KIND_LABELS[v.kind]} {v.detail}" for v in validate_schedule(plan, teams=teams)]
+        if len(plan.scheduled_ids()):
+            summary["finish"] = plan.end_label(plan.end_slot())
+        write_outputs(plan, os.path.join(out_root, name))
+    except (OSError, ConfigError, KeyError, ValueError) as e:
+        summary["error"] = f"{type(e).__name__}: {e}"
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="熊德盃批次排程")
+    parser.add_argument("configs", nargs="+", help="賽事設定檔 (.json / .npz)")
+    parser.add_argument("--out", default="schedules", help="輸出資料夾")
+    parser.add_argument("--workers", type=int, default=None, help="同時處理幾個檔案 (預設 CPU 數)")
+    parser.add_argument("--courts", type=int, dest="num_courts")
+    parser.add_argument("--start", help="租借開始時間 HH:MM")
+    parser.add_argument("--end", help="租借結束時間 HH:MM")
+    parser.add_argument("--setup", type=int, dest="setup_teardown_min", help="佈置/頒獎預留 (前後各扣除分鐘)")
+    parser.add_argument("--mins-per-point", type=int)
+    parser.add_argument("--points-per-matchup", type=int)
+    parser.add_argument("--groups", type=lambda v: v if v == "auto" else int(v),
+                        help="重新亂數分成幾組 (auto = 依場地時間決定)")
+    parser.add_argument("--knockout", nargs="+", metavar="GROUP", help="一併產生複賽 / 決賽的晉級組別")
+    parser.add_argument("--per-group", type=int, help="複賽每組晉級隊數")
+    parser.add_argument("--no-loser", dest="include_loser", action="store_const", const=False, help="不含敗部賽程")
+    parser.add_argument("--attempts", type=int, help="多次嘗試取最佳的次數")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--date", help="比賽日期 YYYY-MM-DD")
+    args = parser.parse_args(argv)
+
+    # 命令列有給的參數才覆寫 (賽事檔裡的 settings 優先)
+    overrides = {k: v for k, v in vars(args).items() if k in DEFAULT_SETTINGS and v is not None}
+    workers = args.workers or os.cpu_count() or 1
+    names = event_names(args.configs)
+    n = len(args.configs)
+    if workers > 1 and n > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, n)) as pool:
+            summaries = list(pool.map(run_event, args.configs, [args.out] * n, [overrides] * n, [1] * n, names))
+    else:
+        summaries = [run_event(path, args.out, overrides, args.workers, name)
+                     for path, name in zip(args.configs, names)]
+    for path, name in zip(args.configs, names):
+        if name != os.path.splitext(os.path.basename(path))[0]:
+            print(f"ℹ️ {path} 與其他檔案同名，輸出到 {os.path.join(args.out, name)}")
+
+    outcomes = {EXIT_OK}
+    for s in summaries:
+        if s["error"]:
+            print(f"❌ {s['event']}: {s['error']}")
+            outcomes.add(EXIT_ERROR)
+        elif s["violations"]:
+            print(f"❌ {s['event']}: 排程檢查發現 {len(s['violations'])} 個問題，例如 {s['violations'][0]}")
+            outcomes.add(EXIT_INVALID)
+        elif s["unscheduled"]:
+            print(f"⚠️ {s['event']}: {s['matches']} 場，{s['unscheduled']} 場排不進去")
+            outcomes.add(EXIT_UNSCHEDULED)
+        else:
+            print(f"✅ {s['event']}: {s['matches']} 場，{s['finish']} 結束")
+    return max(outcomes, key=EXIT_SEVERITY.index)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+import io
+import json
+import zipfile
+
+import numpy as np
+
+# 欄式設定檔 (.npz)：所有字串 (隊名 / 組別 / type / desc) 只存一次，
+# 隊伍與比賽都是字串表的整數 id 陣列；讀取時一次向量化檢查所有 id
+FORMAT_NAME = "badminton-config"
+FORMAT_VERSION = 1
+
+TEAM_COLUMNS = ("name", "level")
+MATCH_COLUMNS = ("type", "level", "team_a", "team_b", "desc")
+# 整數欄位：0 代表比賽 dict 裡沒有這個鍵
+MATCH_INT_COLUMNS = ("round", "points")
+KNOWN_MATCH_KEYS = set(MATCH_COLUMNS) | set(MATCH_INT_COLUMNS)
+
+
+class ConfigError(ValueError):
+    """設定檔格式錯誤"""
+
+
+class _StringTable:
+    __slots__ = ("strings", "_ids")
+
+    def __init__(self):
+        self.strings = []
+        self._ids = {}
+
+    def intern(self, s):
+        sid = self._ids.get(s)
+        if sid is None:
+            sid = len(self.strings)
+            self.strings.append(s)
+            self._ids[s] = sid
+        return sid
+
+    def encode(self):
+        """字串表 -> (utf-8 位元組, 每個字串的結束位置)"""
+        encoded = [s.encode("utf-8") for s in self.strings]
+        ends = np.cumsum([len(b) for b in encoded], dtype=np.int64)
+        return np.frombuffer(b"".join(encoded), dtype=np.uint8), ends
+
+
+def _decode_strings(blob, ends):
+    data = blob.tobytes()
+    starts = np.concatenate(([0], ends[:-1])).tolist()
+    return [data[a:b].decode("utf-8") for a, b in zip(starts, ends.tolist())]
+
+
+def dump_config(teams, matches):
+    """隊伍 / 比賽 dict list -> 欄式設定檔 bytes"""
+    table = _StringTable()
+    intern = table.intern
+    arrays = {}
+    for col in TEAM_COLUMNS:
+        arrays[f"team_{col}"] = np.fromiter((intern(t[col]) for t in teams), dtype=np.int32, count=len(teams))
+    for col in MATCH_COLUMNS:
+        arrays[f"match_{col}"] = np.fromiter((intern(m.get(col, "")) for m in matches), dtype=np.int32, count=len(matches))
+    for col in MATCH_INT_COLUMNS:
+        arrays[f"match_{col}"] = np.fromiter((int(m.get(col) or 0) for m in matches), dtype=np.int32, count=len(matches))
+    # 少見的自訂鍵不另開欄位，以 {比賽 index: {...}} 存在 meta
+    extra = {}
+    for i, m in enumerate(matches):
+        if m.keys() - KNOWN_MATCH_KEYS:
+            extra[str(i)] = {k: v for k, v in m.items() if k not in KNOWN_MATCH_KEYS}
+    meta = {"format": FORMAT_NAME, "version": FORMAT_VERSION, "teams": len(teams), "matches": len(matches),
+            "extra": extra}
+    arrays["meta"] = np.frombuffer(json.dumps(meta, ensure_ascii=False).encode("utf-8"), dtype=np.uint8)
+    arrays["strings"], arrays["string_ends"] = table.encode()
+
+    buf = io.BytesIO()
+    np.savez_compressed(buf, **arrays)
+    return buf.getvalue()
+
+
+def _validate(arrays, meta):
+    if meta.get("format") != FORMAT_NAME:
+        raise ConfigError("不是賽事設定檔")
+    if meta.get("version") != FORMAT_VERSION:
+        raise ConfigError(f"不支援的設定檔版本 {meta.get('version')}")
+    # 所有欄位都是一維整數陣列 (字串表為 utf-8 位元組)
+    if arrays["strings"].ndim != 1 or arrays["strings"].dtype != np.uint8:
+        raise ConfigError("字串表損毀")
+    names = (["string_ends"] + [f"team_{col}" for col in TEAM_COLUMNS]
+             + [f"match_{col}" for col in MATCH_COLUMNS + MATCH_INT_COLUMNS])
+    for name in names:
+        if arrays[name].ndim != 1 or arrays[name].dtype.kind not in "iu":
+            raise ConfigError(f"{name} 欄位錯誤")
+    ends = arrays["string_ends"]
+    if len(ends) and (ends[-1] != len(arrays["strings"]) or np.any(np.diff(ends) < 0) or ends[0] < 0):
+        raise ConfigError("字串表損毀")
+
+    n_strings = len(ends)
+    for prefix, count, cols in (("team", meta["teams"], TEAM_COLUMNS), ("match", meta["matches"], MATCH_COLUMNS)):
+        columns = [arrays[f"{prefix}_{col}"] for col in cols]
+        if any(c.shape != (count,) for c in columns):
+            raise ConfigError(f"{prefix} 欄位長度不一致")
+        ids = np.stack(columns)
+        if count and (ids.min() < 0 or ids.max() >= n_strings):
+            raise ConfigError(f"{prefix} 欄位有不存在的字串 id")
+    for col in MATCH_INT_COLUMNS:
+        values = arrays[f"match_{col}"]
+        if len(values) != meta["matches"] or (len(values) and values.min() < 0):
+            raise ConfigError(f"match_{col} 欄位錯誤")
+
+
+def load_config(data):
+    """
+    讀取設定檔 bytes，回傳 (teams, matches)
+    欄式格式 (.npz) 與舊版 JSON ({"teams", "matches"}) 都接受
+    """
+    if not data.startswith(b"PK"):
+        try:
+            legacy = json.loads(data)
+        except ValueError as e:
+            raise ConfigError("無法解析設定檔") from e
+        if not isinstance(legacy, dict):
+            raise ConfigError("不是賽事設定檔")
+        teams, matches = legacy.get("teams", []), legacy.get("matches", [])
+        if not isinstance(teams, list) or not isinstance(matches, list):
+            raise ConfigError("teams / matches 必須是清單")
+        return teams, matches
+
+    try:
+        with np.load(io.BytesIO(data), allow_pickle=False) as npz:
+            arrays = {k: npz[k] for k in npz.files}
+        meta = json.loads(arrays["meta"].tobytes().decode("utf-8"))
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+        raise ConfigError("無法解析設定檔") from e
+    if not isinstance(meta, dict):
+        raise ConfigError("不是賽事設定檔")
+    try:
+        _validate(arrays, meta)
+    except KeyError as e:
+        raise ConfigError(f"設定檔缺少欄位 {e}") from e
+
+    try:
+        strings = np.array(_decode_strings(arrays["strings"], arrays["string_ends"]), dtype=object)
+    except UnicodeDecodeError as e:
+        raise ConfigError("字串表損毀") from e
+    team_cols = [strings[arrays[f"team_{col}"]].tolist() for col in TEAM_COLUMNS]
+    teams = [dict(zip(TEAM_COLUMNS, row)) for row in zip(*team_cols)]
+
+    match_cols = [strings[arrays[f"match_{col}"]].tolist() for col in MATCH_COLUMNS]
+    matches = [dict(zip(MATCH_COLUMNS, row)) for row in zip(*match_cols)]
+    for col in MATCH_INT_COLUMNS:
+        values = arrays[f"match_{col}"]
+        for i in np.flatnonzero(values).tolist():
+            matches[i][col] = int(values[i])
+    extras = meta.get("extra", {})
+    try:
+        for i, extra in extras.items():
+            if not 0 <= int(i) < len(matches):
+                raise IndexError(i)
+            matches[int(i)].update(extra)
+    except (AttributeError, TypeError, ValueError, IndexError) as e:
+        raise ConfigError("extra 欄位錯誤") from e
+    return teams, matches
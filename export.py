@@ -0,0 +1,110 @@
+import io
+from copy import copy
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+SCHEDULE_LIST_COLUMNS = ['match_no', 'time', 'court', 'level', 'team_a', 'team_b', 'desc']
+BRACKET_COLUMNS = ["Match No.", "Stage", "Team A", "Score A", "Score B", "Team B", "Next Match"]
+
+HEADER_FONT = Font(bold=True)
+CENTER_WRAP = Alignment(horizontal="center", vertical="center", wrap_text=True)
+CONTINUATION_FONT = Font(color="AAAAAA")
+
+
+class _StyleBook:
+    """
+    write-only 模式下重複使用樣式：同一組 (底色, 字型, 對齊) 只登錄一次，
+    之後的儲存格直接複製登錄好的樣式索引，不再逐格比對樣式物件
+    """
+
+    def __init__(self, ws):
+        self.ws = ws
+        self._fills = {}
+        self._styles = {}
+
+    def fill(self, hex_color):
+        key = hex_color.lstrip('#').upper()
+        if key not in self._fills:
+            self._fills[key] = PatternFill(fill_type="solid", start_color=key, end_color=key)
+        return self._fills[key]
+
+    def cell(self, value, fill=None, font=None, alignment=None):
+        c = WriteOnlyCell(self.ws, value=value)
+        if not (fill or font is not None or alignment is not None):
+            return c
+        key = (fill, id(font), id(alignment))
+        style = self._styles.get(key)
+        if style is None:
+            if fill:
+                c.fill = self.fill(fill)
+            if font is not None:
+                c.font = font
+            if alignment is not None:
+                c.alignment = alignment
+            self._styles[key] = copy(c._style)
+        else:
+            c._style = copy(style)
+        return c
+
+
+def _write_schedule_sheet(wb, schedule_df, cell_fills):
+    ws = wb.create_sheet('賽程大表')
+    book = _StyleBook(ws)
+    ws.column_dimensions['A'].width = 8
+    for i in range(len(schedule_df.columns)):
+        ws.column_dimensions[get_column_letter(i + 2)].width = 22
+
+    ws.append([book.cell(None)] + [book.cell(c, font=HEADER_FONT, alignment=CENTER_WRAP) for c in schedule_df.columns])
+    for r, (label, *values) in enumerate(schedule_df.itertuples(name=None)):
+        row = [book.cell(label, font=HEADER_FONT)]
+        for c, val in enumerate(values):
+            if not val:
+                row.append(book.cell(None))
+                continue
+            fill = cell_fills[r][c] if cell_fills is not None else None
+            font = CONTINUATION_FONT if val.endswith("...") else None
+            row.append(book.cell(val, fill=fill, font=font, alignment=CENTER_WRAP))
+        ws.append(row)
+
+
+def _write_list_sheet(wb, schedule_list, match_colors):
+    ws = wb.create_sheet('對戰清單')
+    book = _StyleBook(ws)
+    ws.append([book.cell(None)] + [book.cell(c, font=HEADER_FONT) for c in SCHEDULE_LIST_COLUMNS])
+    for i, m in enumerate(schedule_list):
+        fill = match_colors.get(m.get('match_no')) if match_colors else None
+        row = [book.cell(i, font=HEADER_FONT)]
+        row += [book.cell(m.get(col), fill=fill) for col in SCHEDULE_LIST_COLUMNS]
+        ws.append(row)
+
+
+def export_schedule_excel(schedule_df, schedule_list, cell_fills=None, match_colors=None):
+    """
+    賽程大表 + 對戰清單 -> xlsx bytes (openpyxl write-only 串流寫入)
+
+    cell_fills: 與 schedule_df 同形狀的底色 (hex) 矩陣
+    match_colors: {match_no: hex}，對戰清單每列的底色
+    """
+    wb = Workbook(write_only=True)
+    _write_schedule_sheet(wb, schedule_df, cell_fills)
+    if schedule_list:
+        _write_list_sheet(wb, schedule_list, match_colors)
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def export_bracket_excel(bracket_rows):
+    """樹狀圖填分表 -> xlsx bytes；bracket_rows 為 dict list (欄位見 BRACKET_COLUMNS)"""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('樹狀圖填分表')
+    book = _StyleBook(ws)
+    ws.append([book.cell(c, font=HEADER_FONT) for c in BRACKET_COLUMNS])
+    for m in bracket_rows:
+        ws.append([m.get(c) for c in BRACKET_COLUMNS])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
@@ -0,0 +1,193 @@
+import random
+
+from standings import place_name
+
+GROUP_NAMES = ["A組", "B組", "C組", "D組", "E組", "F組", "G組", "H組"]
+
+
+def group_name(idx):
+    """第 idx 組的名稱；超過 H 組之後以 組9、組10 ... 延伸"""
+    if idx < len(GROUP_NAMES):
+        return GROUP_NAMES[idx]
+    return f"組{idx + 1}"
+
+
+def make_test_teams(count, rng=random):
+    """一鍵生成測試隊伍 (未分組)"""
+    adjectives = ["無敵", "快樂", "爆汗", "光速", "黃金", "超級", "肉腳", "佛系"]
+    nouns = ["暴龍", "羽球團", "小隊", "殺球隊", "戰隊", "俱樂部", "聯隊"]
+    teams = []
+    for i in range(count):
+        name = f"{rng.choice(adjectives)}{rng.choice(nouns)}-{i+1:02d}"
+        teams.append({"name": name, "level": "未分組"})
+    return teams
+
+
+def assign_groups(teams, target_groups, rng=random, seeds=None):
+    """
+    亂數平衡分組：洗牌後依序發到各組 (直接修改 teams)
+    seeds 為種子隊名 (由強到弱)：先以蛇形 (A→D、D→A ...) 分到各組，其餘隊伍洗牌後補到人數最少的組
+    """
+    rng.shuffle(teams)
+    seed_rank = {name: i for i, name in enumerate(seeds or ())}
+    # 種子隊移到最前面 (依強弱)，其餘維持洗牌後的順序
+    teams.sort(key=lambda t: seed_rank.get(t['name'], len(seed_rank)))
+    sizes = [0] * target_groups
+    for i, team in enumerate(teams):
+        if team['name'] in seed_rank:
+            lap, pos = divmod(i, target_groups)
+            g = pos if lap % 2 == 0 else target_groups - 1 - pos
+        else:
+            g = min(range(target_groups), key=lambda k: (sizes[k], k))
+        sizes[g] += 1
+        team['level'] = group_name(g)
+    return teams
+
+
+def round_robin_rounds(names):
+    """
+    圓桌法 (circle method) 逐輪產生單組循環賽對戰：第一隊固定，其餘隊伍每輪轉一格。
+    每輪 yield [(team_a, team_b), ...]，同一輪內每隊最多出場一次；
+    奇數隊時補一個輪空位，輪到輪空的隊伍該輪休息
+    """
+    slots = list(names)
+    if len(slots) < 2:
+        return
+    if len(slots) % 2:
+        slots.append(None)
+    n = len(slots)
+    for r in range(n - 1):
+        pairs = []
+        for i in range(n // 2):
+            a, b = slots[i], slots[n - 1 - i]
+            if a is None or b is None:
+                continue
+            # 固定的那隊每輪交換 A/B 邊，避免永遠站同一邊
+            if i == 0 and r % 2:
+                a, b = b, a
+            pairs.append((a, b))
+        yield pairs
+        slots.insert(1, slots.pop())
+
+
+def iter_round_robin(teams):
+    """
+    依組別產生【初賽】循環賽，一次 yield 一輪 (所有組別的第 r 輪)，
+    每場比賽帶 "round" (從 1 起算)；未分組的隊伍略過
+    """
+    levels = sorted(list(set(t['level'] for t in teams)))
+    groups = []
+    for lvl in levels:
+        if lvl == "未分組": continue
+        groups.append((lvl, round_robin_rounds([t['name'] for t in teams if t['level'] == lvl])))
+
+    r = 0
+    while groups:
+        r += 1
+        round_matches = []
+        active = []
+        for lvl, rounds in groups:
+            pairs = next(rounds, None)
+            if pairs is None:
+                continue
+            active.append((lvl, rounds))
+            for a, b in pairs:
+                round_matches.append({
+                    "type": "初賽",
+                    "level": lvl,
+                    "team_a": a,
+                    "team_b": b,
+                    "desc": f"{lvl} 循環賽",
+                    "round": r
+                })
+        groups = active
+        if round_matches:
+            yield round_matches
+
+
+def generate_round_robin(teams):
+    """依組別產生【初賽】循環賽 (依輪次排列)，未分組的隊伍略過"""
+    matches = []
+    for round_matches in iter_round_robin(teams):
+        matches.extend(round_matches)
+    return matches
+
+
+def _bracket_order(size):
+    """標準種子排法：第 1、2 種子分在兩半區，最後才會相遇 (size 為 2 的次方)"""
+    order = [1]
+    while len(order) < size:
+        n = len(order) * 2 + 1
+        order = [x for seed in order for x in (seed, n - seed)]
+    return order
+
+
+def _round_label(prefix, size):
+    return f"{prefix}{size}強賽" if not prefix else f"{prefix}{size}強"
+
+
+def _elimination(groups, places, prefix, kind, level, final_desc):
+    """
+    單淘汰樹：各組第 places 名交叉種子 (同名次依組別順序)，
+    第一輪寫出晉級代稱 ("A組 冠軍")，之後每輪為「<上一輪> 勝方k」
+    回傳 (比賽 list, 最後一輪之前那輪的名稱 — 季殿軍賽用)
+    """
+    seeds = [(g, rank) for rank in places for g in groups]
+    size = len(seeds)
+    order = _bracket_order(size)
+    entrants = [f"{seeds[i - 1][0]} {place_name(seeds[i - 1][1])}" for i in order]
+    codes = [f"{seeds[i - 1][0].rstrip('組')}{seeds[i - 1][1] + 1}" for i in order]
+
+    matches = []
+    semi_label = None
+    first = True
+    while size >= 2:
+        label = _round_label(prefix, size)
+        is_final = size == 2
+        for k in range(size // 2):
+            a, b = entrants[2 * k], entrants[2 * k + 1]
+            if is_final:
+                desc = final_desc
+            elif first:
+                desc = f"{label} {codes[2 * k]}vs{codes[2 * k + 1]}"
+            else:
+                desc = label
+            matches.append({"type": f"{'決賽' if is_final else '複賽'}-{kind}", "level": level,
+                            "team_a": a, "team_b": b, "desc": desc})
+        if size == 4:
+            semi_label = label
+        entrants = [f"{label} 勝方{k + 1}" for k in range(size // 2)]
+        size //= 2
+        first = False
+    return matches, semi_label
+
+
+def generate_bracket(groups, per_group=2, include_loser=True):
+    """
+    產生【複賽/決賽】淘汰賽：每組前 per_group 名交叉進勝部，
+    (include_loser 時) 接下來的 per_group 名進敗部；晉級隊數須為 2 的次方
+
+    例：2 組各取 2 名 = 4強賽 A1vsB2 / B1vsA2 -> 總冠軍賽 + 季殿軍賽；
+        4 組各取 2 名 = 8強賽 -> 4強賽 -> 總冠軍賽
+    比賽之間的依賴就寫在隊名代稱裡 ("4強賽 勝方1")，排程與樹狀圖由此解析
+    """
+    groups = list(groups)
+    total = len(groups) * per_group
+    if total < 2 or total & (total - 1):
+        raise ValueError(f"晉級隊數須為 2 的次方 (目前 {len(groups)} 組 x {per_group} 名 = {total})")
+
+    matches, semi_label = _elimination(groups, range(per_group), "", "勝部", "決賽區", "🏆 總冠軍賽")
+    final = matches.pop()
+    if include_loser:
+        loser, _ = _elimination(groups, range(per_group, 2 * per_group), "敗部", "敗部", "敗部區", "🛡️ 敗部冠軍賽")
+        matches.extend(loser)
+    if semi_label:
+        matches.append({"type": "決賽-勝部", "level": "決賽區", "team_a": f"{semi_label} 敗方1",
+                        "team_b": f"{semi_label} 敗方2", "desc": "🥉 季殿軍賽"})
+    matches.append(final)
+    return matches
+
+
+def generate_knockout(group_1, group_2, include_loser=True):
+    """產生【複賽/決賽】對戰 (兩組交叉 4 強)"""
+    return generate_bracket([group_1, group_2], 2, include_loser)
@@ -0,0 +1,100 @@
+import numpy as np
+
+from model import Stage
+
+
+class TeamIndex:
+    """
+    排程的反向索引：隊名 / 晉級代稱 (例："A組 冠軍") / 組別 / 代稱裡的詞 (例："冠軍")
+    -> 該名稱出場的比賽 id (依開賽時間排序)，排程產生時建一次，之後查詢都是 O(1)
+
+    初賽出現過的名字算「隊伍」，只在複賽出現的算「晉級代稱」
+    """
+    __slots__ = ("schedule", "_by_key", "teams", "placeholders", "groups", "words")
+
+    def __init__(self, schedule):
+        self.schedule = schedule
+        table = schedule.table
+        s = table.strings
+        placed = np.flatnonzero(schedule.start >= 0)
+        order = placed[np.lexsort((schedule.court[placed], schedule.start[placed]))]
+
+        by_key = {}
+        teams, placeholders, groups, words = {}, {}, {}, {}
+
+        def add(key, mid, kind):
+            hits = by_key.setdefault(key, [])
+            if not hits or hits[-1] != mid:
+                hits.append(mid)
+            kind[key] = None
+
+        for mid in order.tolist():
+            is_group = table.stage[mid] == Stage.GROUP
+            for sid in (table.team_a[mid], table.team_b[mid]):
+                name = s[sid]
+                add(name, mid, teams if is_group else placeholders)
+                tokens = name.split()
+                if len(tokens) > 1:
+                    for word in tokens:
+                        add(word, mid, words)
+            add(s[table.level[mid]], mid, groups)
+
+        self._by_key = {k: np.array(v, dtype=np.int32) for k, v in by_key.items()}
+        # 同一個名字若也是隊伍，就不重複列在代稱 / 組別
+        self.teams = sorted(teams)
+        self.placeholders = sorted(k for k in placeholders if k not in teams)
+        self.groups = sorted(k for k in groups if k not in teams and k not in placeholders)
+        self.words = sorted(k for k in words if k not in teams and k not in placeholders and k not in groups)
+
+    def __contains__(self, key):
+        return key in self._by_key
+
+    def match_ids(self, key):
+        """名稱出場的比賽 id (依開賽時間)；查無此名回傳空陣列"""
+        return self._by_key.get(key, np.zeros(0, dtype=np.int32))
+
+    def search_options(self):
+        """搜尋選單：隊伍、組別、晉級代稱、代稱裡的詞"""
+        return self.teams + self.groups + self.placeholders + self.words
+
+    def hit_mask(self, key):
+        """每場比賽是否命中 (長度 n+1，最後一格對應空格 -1)"""
+        hits = np.zeros(len(self.schedule.table) + 1, dtype=bool)
+        hits[self.match_ids(key)] = True
+        return hits
+
+    def itinerary(self, key):
+        """
+        名稱的行程表：每場的編號、時間、場地、對手與距離上一場結束的休息分鐘數
+        (組別或代稱裡的詞會對到多隊，對手欄改列出雙方、不算休息)
+        """
+        schedule = self.schedule
+        table = schedule.table
+        s = table.strings
+        per_team = key in self.teams or key in self.placeholders
+        rows = []
+        prev_end = None
+        for mid in self.match_ids(key).tolist():
+            start = int(schedule.start[mid])
+            end = start + int(schedule.span[mid])
+            team_a, team_b = s[table.team_a[mid]], s[table.team_b[mid]]
+            if per_team:
+                opponent = team_b if team_a == key else team_a
+                # 依實際時間算 (多天的賽程中間隔了一晚)
+                rest = None if prev_end is None else \
+                    int((schedule.row_time(start) - schedule.end_time(prev_end)).total_seconds() // 60)
+                prev_end = end
+            else:
+                opponent = f"{team_a} vs {team_b}"
+                rest = None
+            rows.append({
+                "match_no": int(schedule.match_no[mid]),
+                "time": schedule.time_label(start),
+                "end": schedule.end_label(end),
+                "court": schedule.court_label(schedule.court[mid]),
+                "opponent": opponent,
+                "level": s[table.level[mid]],
+                "desc": s[table.desc[mid]],
+                "rest_minutes": rest,
+            })
+        return rows
@@ -0,0 +1,30 @@
+import importlib
+
+
+class LazyModule:
+    """
+    延遲載入的模組：第一次取用屬性時才真正 import
+    (pandas / openpyxl 這類大套件只有用到的功能才付出載入時間)
+
+    不用 importlib.util.LazyLoader：它會先放進 sys.modules，
+    Streamlit 用 inspect 掃 sys.modules 時就會把模組全部觸發載入
+    """
+    __slots__ = ("_name", "_module")
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            module = self._module = importlib.import_module(self._name)
+        return getattr(module, attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    return LazyModule(name)
@@ -0,0 +1,410 @@
+import hashlib
+import json
+import re
+from array import array
+from collections import namedtuple
+from datetime import datetime, timedelta
+from enum import IntEnum
+
+import numpy as np
+
+# 一場比賽在大表上的位置：row = 起始格, col = 場地, span = 佔用格數
+Placement = namedtuple("Placement", ["match_id", "row", "col", "span"])
+
+# 晉級代稱：「<輪次> 勝方k / 敗方k」= 該輪次 (desc 的第一個詞) 第 k 場的勝 / 敗方
+FEED_RE = re.compile(r"^(\S+) (勝方|敗方)(\d+)$")
+
+# 晉級來源：kind 為 "win" / "lose"；source 為來源比賽 id (對不到時為 None)
+Feed = namedtuple("Feed", ["kind", "source", "text"])
+
+# 比賽的前置依賴：feeds = 來自哪幾場的勝 / 敗方，gates = 要等哪些組別 (level id) 的初賽全部打完
+Links = namedtuple("Links", ["feeds", "gates"])
+
+
+# 場館的一個時段 (通常是某一天)：start / end 為可比賽的開始與結束 (datetime)
+Session = namedtuple("Session", ["venue", "start", "end", "num_courts"])
+
+
+class Stage(IntEnum):
+    """比賽階段；數值即排程優先級 (越小越先排)"""
+    GROUP = 0        # 初賽 (分組循環)
+    KNOCKOUT = 1     # 複賽 (勝部 4強 / 敗部 4強)
+    LOSER_FINAL = 2  # 敗部冠軍賽
+    BRONZE = 3       # 季殿軍賽
+    FINAL = 4        # 總冠軍賽
+
+
+def get_match_stage(match):
+    """由 type / desc 判斷比賽 dict 的階段"""
+    m_type = match.get("type", "")
+    desc = match.get("desc", "")
+    if "初賽" in m_type: return Stage.GROUP
+    elif "總冠軍" in desc: return Stage.FINAL
+    elif "季殿軍" in desc: return Stage.BRONZE
+    elif "敗部冠軍" in desc: return Stage.LOSER_FINAL
+    return Stage.KNOCKOUT
+
+
+class MatchTable:
+    """
+    欄式比賽表：每個字串 (隊名 / level / type / desc) 只存一次，
+    比賽本身只存整數 id；隊伍 id 就是隊名在字串表的位置。
+    round 為循環賽輪次 (0 = 不分輪，例如複賽)
+    """
+    __slots__ = ("strings", "_string_ids", "team_a", "team_b", "level", "kind", "desc", "stage", "span", "round",
+                 "_links")
+
+    def __init__(self):
+        self.strings = []
+        self._string_ids = {}
+        self.team_a = array('i')
+        self.team_b = array('i')
+        self.level = array('i')
+        self.kind = array('i')
+        self.desc = array('i')
+        self.stage = array('b')
+        self.span = array('i')
+        self.round = array('i')
+        self._links = None
+
+    @classmethod
+    def from_dicts(cls, matches, points_per_matchup):
+        """由比賽 dict list 建表；dict 可用 "points" 覆寫該場的格數"""
+        table = cls()
+        for m in matches:
+            table.append(m.get("type", ""), m.get("level", ""), m['team_a'], m['team_b'], m.get("desc", ""),
+                         int(m.get("points") or points_per_matchup), get_match_stage(m), int(m.get("round") or 0))
+        return table
+
+    def intern(self, s):
+        sid = self._string_ids.get(s)
+        if sid is None:
+            sid = len(self.strings)
+            self.strings.append(s)
+            self._string_ids[s] = sid
+        return sid
+
+    def string_id(self, s):
+        return self._string_ids.get(s)
+
+    def append(self, kind, level, team_a, team_b, desc, span, stage, round_no=0):
+        self.kind.append(self.intern(kind))
+        self.level.append(self.intern(level))
+        self.team_a.append(self.intern(team_a))
+        self.team_b.append(self.intern(team_b))
+        self.desc.append(self.intern(desc))
+        self.span.append(span)
+        self.stage.append(int(stage))
+        self.round.append(round_no)
+        self._links = None
+        return len(self.team_a) - 1
+
+    def __len__(self):
+        return len(self.team_a)
+
+    def name(self, sid):
+        return self.strings[sid]
+
+    def to_dict(self, mid):
+        """還原成舊格式的比賽 dict (給匯出、樹狀圖等顯示用)"""
+        s = self.strings
+        match = {
+            "type": s[self.kind[mid]],
+            "level": s[self.level[mid]],
+            "team_a": s[self.team_a[mid]],
+            "team_b": s[self.team_b[mid]],
+            "desc": s[self.desc[mid]],
+        }
+        if self.round[mid]:
+            match["round"] = self.round[mid]
+        return match
+
+    def links(self):
+        """
+        每場比賽的前置依賴 (list of Links，以比賽 id 索引)，由隊名解析、建一次後快取：
+        - "4強賽 勝方1"：依賴「4強賽」這一輪的第 1 場
+        - "A組 冠軍" 或已填入的 A組 隊名：要等 A組 初賽全部打完
+        - 其他認不得的名字 (例如手動輸入、來源對不到)：保守地等所有初賽打完
+        初賽沒有依賴
+        """
+        if self._links is not None:
+            return self._links
+        s = self.strings
+        n = len(self)
+        rounds = {}       # 輪次名稱 -> 該輪的比賽 id (依產生順序)
+        team_group = {}   # 初賽隊伍 id -> 組別 id
+        for mid in range(n):
+            if self.stage[mid] == Stage.GROUP:
+                team_group[self.team_a[mid]] = self.level[mid]
+                team_group[self.team_b[mid]] = self.level[mid]
+            else:
+                words = s[self.desc[mid]].split()
+                if words:
+                    rounds.setdefault(words[0], []).append(mid)
+        group_levels = frozenset(team_group.values())
+
+        links = []
+        for mid in range(n):
+            if self.stage[mid] == Stage.GROUP:
+                links.append(Links((), frozenset()))
+                continue
+            feeds, gates = [], set()
+            for sid in (self.team_a[mid], self.team_b[mid]):
+                name = s[sid]
+                m = FEED_RE.match(name)
+                if m:
+                    same_round = rounds.get(m.group(1), [])
+                    k = int(m.group(3))
+                    source = same_round[k - 1] if 0 < k <= len(same_round) else None
+                    feeds.append(Feed("win" if m.group(2) == "勝方" else "lose", source, name))
+                    if source is None or source == mid:
+                        gates |= group_levels
+                elif sid in team_group:
+                    gates.add(team_group[sid])
+                else:
+                    level_id = self._string_ids.get(name.split()[0]) if name.split() else None
+                    gates |= {level_id} if level_id in group_levels else group_levels
+            links.append(Links(tuple(f for f in feeds if f.source != mid), frozenset(gates)))
+        self._links = links
+        return links
+
+    def fingerprint(self):
+        h = hashlib.sha1()
+        h.update("\x00".join(self.strings).encode("utf-8"))
+        for col in (self.team_a, self.team_b, self.level, self.kind, self.desc, self.stage, self.span, self.round):
+            h.update(col.tobytes())
+        return h.hexdigest()
+
+
+class VenueLayout:
+    """
+    多場館 / 多天的大表配置：
+    - 欄：各場館的場地依場館出現順序排開 (場館的欄數 = 它各時段最多的場地數)
+    - 列：各天的時間格依日期排開；同一天所有場館共用一條時間軸，
+      從當天最早開始的時段到最晚結束的時段
+    open[row, col] 為那個場地在那一格是否開放；session_rows / session_cols 為每個時段佔的列 / 欄範圍
+    """
+    __slots__ = ("sessions", "mins_per_point", "venues", "row_times", "court_venue", "court_no", "open",
+                 "session_rows", "session_cols", "time_format")
+
+    def __init__(self, sessions, mins_per_point):
+        if not sessions:
+            raise ValueError("至少要有一個場館時段")
+        # 場館 (欄) 依輸入順序，時段依時間
+        venues = list(dict.fromkeys(x.venue for x in sessions))
+        sessions = sorted(sessions, key=lambda x: (x.start, venues.index(x.venue)))
+        step = timedelta(minutes=mins_per_point)
+        width = {v: max(x.num_courts for x in sessions if x.venue == v) for v in venues}
+        first_col, cols = {}, 0
+        for v in venues:
+            first_col[v] = cols
+            cols += width[v]
+
+        days = sorted({x.start.date() for x in sessions})
+        row_times, session_rows = [], {}
+        for day in days:
+            todays = [i for i, x in enumerate(sessions) if x.start.date() == day]
+            day_start = min(sessions[i].start for i in todays)
+            day_end = max(sessions[i].end for i in todays)
+            base = len(row_times)
+            row_times.extend(day_start + k * step for k in range(int((day_end - day_start) // step)))
+            for i in todays:
+                x = sessions[i]
+                if x.end <= x.start or x.num_courts < 1:
+                    raise ValueError(f"{x.venue} {x.start:%m/%d %H:%M} 的時段設定錯誤")
+                # 時段開始沒有對齊時間格時往後取整
+                session_rows[i] = (base - (-(x.start - day_start) // step), base + (x.end - day_start) // step)
+
+        court_venue = np.zeros(cols, dtype=np.int32)
+        court_no = np.zeros(cols, dtype=np.int32)
+        for vi, v in enumerate(venues):
+            c0 = first_col[v]
+            court_venue[c0:c0 + width[v]] = vi
+            court_no[c0:c0 + width[v]] = np.arange(1, width[v] + 1)
+        is_open = np.zeros((len(row_times), cols), dtype=bool)
+        for i, x in enumerate(sessions):
+            r0, r1 = session_rows[i]
+            c0 = first_col[x.venue]
+            if is_open[r0:r1, c0:c0 + x.num_courts].any():
+                raise ValueError(f"{x.venue} 的時段重疊 ({x.start:%m/%d %H:%M})")
+            is_open[r0:r1, c0:c0 + x.num_courts] = True
+
+        self.sessions = tuple(sessions)
+        self.mins_per_point = mins_per_point
+        self.venues = venues
+        self.row_times = row_times
+        self.court_venue = court_venue
+        self.court_no = court_no
+        self.open = is_open
+        self.session_rows = [session_rows[i] for i in range(len(sessions))]
+        self.session_cols = [(first_col[x.venue], x.num_courts) for x in sessions]
+        self.time_format = "%m/%d %H:%M" if len(days) > 1 else "%H:%M"
+
+    @property
+    def shape(self):
+        return self.open.shape
+
+    def row_time(self, row):
+        """第 row 格的開始時間 (row 可以等於總列數，代表最後一格結束)"""
+        if row < len(self.row_times):
+            return self.row_times[row]
+        return self.row_times[-1] + timedelta(minutes=self.mins_per_point * (row - len(self.row_times) + 1))
+
+    def court_label(self, col):
+        if len(self.venues) == 1:
+            return f"Court {self.court_no[col]}"
+        return f"{self.venues[self.court_venue[col]]} Court {self.court_no[col]}"
+
+    def venue_sessions(self, venue):
+        """場館的時段 index (依時間先後)"""
+        return [i for i, x in enumerate(self.sessions) if x.venue == venue]
+
+    def to_json(self):
+        return json.dumps({"mins_per_point": self.mins_per_point,
+                           "sessions": [[x.venue, x.start.isoformat(), x.end.isoformat(), x.num_courts]
+                                        for x in self.sessions]}, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, text):
+        data = json.loads(text)
+        sessions = [Session(v, datetime.fromisoformat(a), datetime.fromisoformat(b), int(c))
+                    for v, a, b, c in data["sessions"]]
+        return cls(sessions, data["mins_per_point"])
+
+
+class Schedule:
+    """
+    排程結果：grid 為 slots x courts 的 int32 比賽 id 矩陣 (空格 -1)，
+    另以每場比賽一格的陣列記錄開始格、場地、格數與比賽編號 (0 = 未排入)。
+    大表文字、對戰清單、匯出都由這裡衍生。
+    多場館 / 多天時 layout 為 VenueLayout (每列的時間、每欄的場館)，否則為 None
+    """
+    __slots__ = ("table", "grid", "start", "court", "span", "match_no", "play_start", "mins_per_point", "layout")
+
+    def __init__(self, table, slots_count, num_courts, play_start=None, mins_per_point=None, layout=None):
+        n = len(table)
+        self.table = table
+        self.grid = np.full((slots_count, num_courts), -1, dtype=np.int32)
+        self.start = np.full(n, -1, dtype=np.int32)
+        self.court = np.full(n, -1, dtype=np.int32)
+        self.span = np.frombuffer(table.span, dtype=np.int32).copy() if n else np.zeros(0, dtype=np.int32)
+        self.match_no = np.zeros(n, dtype=np.int32)
+        self.play_start = play_start
+        self.mins_per_point = mins_per_point
+        self.layout = layout
+
+    @classmethod
+    def from_placements(cls, table, placements, slots_count, num_courts, play_start=None, mins_per_point=None,
+                        layout=None):
+        schedule = cls(table, slots_count, num_courts, play_start, mins_per_point, layout)
+        for p in placements:
+            schedule.place(p.match_id, p.row, p.col, p.span)
+        schedule.renumber()
+        return schedule
+
+    @property
+    def slots_count(self):
+        return self.grid.shape[0]
+
+    @property
+    def num_courts(self):
+        return self.grid.shape[1]
+
+    def place(self, mid, row, col, span):
+        self.grid[row:row + span, col] = mid
+        self.start[mid] = row
+        self.court[mid] = col
+        self.span[mid] = span
+
+    def renumber(self):
+        """依開賽時間、場地順序重新編號 1..N (不跳號)"""
+        placed = np.flatnonzero(self.start >= 0)
+        order = placed[np.lexsort((self.court[placed], self.start[placed]))]
+        self.match_no[:] = 0
+        self.match_no[order] = np.arange(1, len(order) + 1, dtype=np.int32)
+
+    def scheduled_ids(self):
+        """已排入的比賽 id，依比賽編號排序"""
+        placed = np.flatnonzero(self.match_no > 0)
+        return placed[np.argsort(self.match_no[placed])]
+
+    def unscheduled_ids(self):
+        return np.flatnonzero(self.start < 0)
+
+    def placements(self):
+        return [Placement(int(mid), int(self.start[mid]), int(self.court[mid]), int(self.span[mid]))
+                for mid in self.scheduled_ids()]
+
+    def id_by_match_no(self, match_no):
+        hits = np.flatnonzero(self.match_no == match_no)
+        return int(hits[0]) if len(hits) else None
+
+    def head_mask(self):
+        """每場比賽開賽那一格"""
+        mask = np.zeros(self.grid.shape, dtype=bool)
+        placed = self.start >= 0
+        mask[self.start[placed], self.court[placed]] = True
+        return mask
+
+    def row_time(self, row):
+        """第 row 格的開始時間"""
+        if self.layout is not None:
+            return self.layout.row_time(int(row))
+        return self.play_start + timedelta(minutes=int(row) * self.mins_per_point)
+
+    def end_time(self, row):
+        """在第 row 格之前打完的比賽的結束時間 (多天時不會算成隔天的開始)"""
+        return self.row_time(int(row) - 1) + timedelta(minutes=self.mins_per_point)
+
+    def _time_format(self):
+        return self.layout.time_format if self.layout is not None else "%H:%M"
+
+    def time_label(self, row):
+        return self.row_time(row).strftime(self._time_format())
+
+    def end_label(self, row):
+        return self.end_time(row).strftime(self._time_format())
+
+    def time_labels(self):
+        return [self.time_label(r) for r in range(self.slots_count)]
+
+    def court_label(self, col):
+        if self.layout is not None:
+            return self.layout.court_label(int(col))
+        return f"Court {int(col) + 1}"
+
+    def court_labels(self):
+        return [self.court_label(c) for c in range(self.num_courts)]
+
+    def end_slot(self):
+        placed = self.start >= 0
+        return int((self.start[placed] + self.span[placed]).max()) if placed.any() else 0
+
+    def copy(self):
+        other = Schedule.__new__(Schedule)
+        other.table = self.table
+        other.grid = self.grid.copy()
+        other.start = self.start.copy()
+        other.court = self.court.copy()
+        other.span = self.span.copy()
+        other.match_no = self.match_no.copy()
+        other.play_start = self.play_start
+        other.mins_per_point = self.mins_per_point
+        other.layout = self.layout
+        return other
+
+    def with_table(self, table):
+        """換一份比賽表 (例如把代稱換成實際隊名)；比賽 id 必須一一對應"""
+        other = self.copy()
+        other.table = table
+        return other
+
+    def fingerprint(self):
+        """排程內容的 key (比賽表 + 位置 + 編號 + 時間參數)"""
+        h = hashlib.sha1(self.table.fingerprint().encode("ascii"))
+        for arr in (self.grid, self.start, self.court, self.span, self.match_no):
+            h.update(arr.tobytes())
+        h.update(f"{self.grid.shape}|{self.play_start}|{self.mins_per_point}".encode("utf-8"))
+        if self.layout is not None:
+            h.update(self.layout.to_json().encode("utf-8"))
+        return h.hexdigest()
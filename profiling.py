@@ -0,0 +1,120 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+# 目前 thread 正在記錄的 Trace (Streamlit 每個 session 的 rerun 跑在自己的 thread)
+_local = threading.local()
+
+
+class Trace:
+    """
+    一個 session 的效能紀錄：每次 rerun 一筆，內含計時區段 (span) 與計數器
+    只保留最近 max_reruns 次 rerun；可匯出成 Chrome trace (chrome://tracing / Perfetto)
+    """
+    __slots__ = ("reruns", "_lock")
+
+    def __init__(self, max_reruns=30):
+        self.reruns = deque(maxlen=max_reruns)
+        self._lock = threading.Lock()
+
+    def begin_rerun(self, label=""):
+        rerun = {"label": label, "started_ns": time.perf_counter_ns(), "wall": time.time(),
+                 "spans": [], "counters": {}}
+        with self._lock:
+            self.reruns.append(rerun)
+        return rerun
+
+    def _current(self):
+        return self.reruns[-1] if self.reruns else None
+
+    def add_span(self, name, start_ns, end_ns, args=None):
+        rerun = self._current()
+        if rerun is None:
+            return
+        with self._lock:
+            rerun["spans"].append((name, start_ns, end_ns, threading.get_ident(), args or {}))
+
+    def count(self, name, value=1):
+        rerun = self._current()
+        if rerun is None:
+            return
+        with self._lock:
+            rerun["counters"][name] = rerun["counters"].get(name, 0) + value
+
+    @contextmanager
+    def span(self, name, **args):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.add_span(name, start, time.perf_counter_ns(), args)
+
+    # --- 顯示 / 匯出 ---
+    def span_rows(self, rerun):
+        """一次 rerun 的各區段：名稱、開始 (ms，相對 rerun 開始)、耗時 (ms)"""
+        base = rerun["started_ns"]
+        return [{"span": name, "start_ms": round((s - base) / 1e6, 2), "ms": round((e - s) / 1e6, 2), **args}
+                for name, s, e, _, args in sorted(rerun["spans"], key=lambda x: x[1])]
+
+    def summary_rows(self):
+        """每次 rerun 一列：各區段名稱合計耗時 (ms)"""
+        rows = []
+        for rerun in self.reruns:
+            row = {"rerun": rerun["label"], "time": time.strftime("%H:%M:%S", time.localtime(rerun["wall"]))}
+            for name, s, e, _, _ in rerun["spans"]:
+                row[name] = round(row.get(name, 0) + (e - s) / 1e6, 2)
+            rows.append(row)
+        return rows
+
+    def chrome_trace(self):
+        """Chrome trace event format (JSON bytes)"""
+        pid = os.getpid()
+        events = []
+        with self._lock:
+            reruns = list(self.reruns)
+        for i, rerun in enumerate(reruns):
+            for name, s, e, tid, args in rerun["spans"]:
+                events.append({"name": name, "cat": "app", "ph": "X", "ts": s / 1e3, "dur": (e - s) / 1e3,
+                               "pid": pid, "tid": tid, "args": dict(args, rerun=i)})
+            if rerun["counters"]:
+                end = max((e for _, _, e, _, _ in rerun["spans"]), default=rerun["started_ns"])
+                events.append({"name": "counters", "ph": "C", "ts": end / 1e3, "pid": pid,
+                               "args": rerun["counters"]})
+        return json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}, default=str).encode("utf-8")
+
+
+def activate(trace):
+    """之後這個 thread 的 span() / count() 都記到 trace (None = 不記錄)"""
+    _local.trace = trace
+
+
+def current_trace():
+    return getattr(_local, "trace", None)
+
+
+@contextmanager
+def span(name, **args):
+    """計時區段；目前 thread 沒有啟用 Trace 時幾乎沒有成本"""
+    trace = getattr(_local, "trace", None)
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        trace.add_span(name, start, time.perf_counter_ns(), args)
+
+
+def count(name, value=1):
+    trace = getattr(_local, "trace", None)
+    if trace is not None:
+        trace.count(name, value)
+
+
+def span_in(trace, name, **args):
+    """記到指定的 Trace (給不在 rerun thread 上執行的程式，例如下載按鈕的 callable)"""
+    return trace.span(name, **args) if trace is not None else nullcontext()
@@ -0,0 +1,58 @@
+import threading
+from collections import namedtuple
+from datetime import datetime
+from types import MappingProxyType
+
+# 一份可以給畫面顯示的排程；訪客讀的是主辦發布的版本 (version > 0)，
+# 主辦自己 session 的草稿 version 為 None
+ScheduleView = namedtuple("ScheduleView", [
+    "version", "published_at", "schedule_key", "plan", "schedule_df", "schedule_list", "team_names",
+])
+
+
+def _freeze_plan(plan):
+    frozen = plan.copy()
+    for arr in (frozen.grid, frozen.start, frozen.court, frozen.span, frozen.match_no):
+        arr.flags.writeable = False
+    return frozen
+
+
+class PublishedSchedule:
+    """
+    主辦發布給訪客看的排程 (整個 process 只有一份)
+
+    發布時複製一次並設為唯讀，之後所有訪客 session 直接引用同一個快照，
+    不在各自的 session_state 裡另存 DataFrame；版本號每次發布加一，
+    訪客只在版本號改變時才需要重畫
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._version = 0
+
+    @property
+    def version(self):
+        return self._version
+
+    def latest(self):
+        return self._snapshot
+
+    def publish(self, schedule_key, plan, schedule_df, schedule_list, team_names):
+        schedule_df = schedule_df.copy()
+        schedule_list = tuple(MappingProxyType(dict(m)) for m in schedule_list)
+        frozen = (schedule_key, _freeze_plan(plan), schedule_df, schedule_list, tuple(team_names))
+        with self._lock:
+            self._version += 1
+            snapshot = ScheduleView(self._version, datetime.now(), *frozen)
+            # 整份快照一次換掉，讀取端不需要加鎖
+            self._snapshot = snapshot
+        return snapshot
+
+    def clear(self):
+        with self._lock:
+            self._snapshot = None
+            self._version += 1
+
+
+PUBLISHED = PublishedSchedule()
@@ -0,0 +1,147 @@
+import numpy as np
+
+from itinerary import TeamIndex
+from lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+# --- 顏色定義 ---
+COLOR_PALETTE = [
+    '#FFCDD2', '#C8E6C9', '#BBDEFB', '#FFF9C4', 
+    '#E1BEE7', '#FFE0B2', '#B2DFDB', '#F0F4C3'
+]
+
+def get_group_color_hex(level_name, all_levels):
+    try:
+        if "決賽" in level_name or "總冠軍" in level_name: return '#FF8A80'
+        if "季殿" in level_name: return '#FFD180'
+        if "敗部" in level_name: return '#EA80FC'
+        
+        normal_levels = [l for l in all_levels if "決賽" not in l and "敗部" not in l]
+        if level_name in normal_levels:
+            idx = normal_levels.index(level_name) % len(COLOR_PALETTE)
+            return COLOR_PALETTE[idx]
+        return '#FFFFFF'
+    except:
+        return '#FFFFFF'
+
+def get_match_color_hex(match, all_levels):
+    """依比賽本身的 desc / level 決定顏色 (不解析大表文字)"""
+    desc = match.get('desc', '')
+    if "總冠軍" in desc: return '#FF8A80'
+    if "季殿" in desc: return '#FFD180'
+    return get_group_color_hex(match.get('level', ''), all_levels)
+
+
+def build_schedule_table(schedule):
+    """
+    由 Schedule 衍生賽程大表 (DataFrame) 與對戰清單 (schedule_list)
+    開賽格顯示完整對戰，延續格只顯示同一個比賽編號
+    """
+    table = schedule.table
+    n = len(table)
+    s = table.strings
+    head_text = np.empty(n + 1, dtype=object)
+    cont_text = np.empty(n + 1, dtype=object)
+    head_text[n] = cont_text[n] = ""  # grid 的 -1 (空格) 會取到最後一格
+    scheduled_matches_list = []
+    for mid in schedule.scheduled_ids():
+        no = int(schedule.match_no[mid])
+        head_text[mid] = f"No.{no}\n{s[table.team_a[mid]]}\nvs\n{s[table.team_b[mid]]}\n({s[table.level[mid]]})"
+        cont_text[mid] = f"No.{no} ..."
+        export_item = table.to_dict(mid)
+        export_item['match_no'] = no
+        export_item['time'] = schedule.time_label(schedule.start[mid])
+        export_item['court'] = schedule.court_label(schedule.court[mid])
+        scheduled_matches_list.append(export_item)
+
+    grid = schedule.grid
+    cells = np.where(schedule.head_mask(), head_text[grid], cont_text[grid])
+    if schedule.layout is not None:
+        cells[~schedule.layout.open] = CLOSED_TEXT
+    schedule_df = pd.DataFrame(cells, index=schedule.time_labels(), columns=schedule.court_labels())
+    return schedule_df, scheduled_matches_list
+
+
+# --- 大表上色 (依排程結果的每格 metadata，一次向量化算完) ---
+CONTINUATION_COLOR = '#F5F5F5'
+CONTINUATION_CSS = 'background-color: #f5f5f5; color: #aaa;'
+# 多場館時場館沒開的格子
+CLOSED_TEXT = '—'
+CLOSED_COLOR = '#E0E0E0'
+CLOSED_CSS = 'background-color: #e0e0e0; color: #bbb;'
+HIGHLIGHT_CSS = 'background-color: #ffeb3b; color: black; font-weight: bold; border: 2px solid red;'
+
+
+def _match_colors(table, all_levels):
+    """每場比賽的顏色 (同 desc + level 只算一次)"""
+    memo = {}
+    colors = []
+    for mid in range(len(table)):
+        key = (table.desc[mid], table.level[mid])
+        if key not in memo:
+            memo[key] = get_match_color_hex(table.to_dict(mid), all_levels)
+        colors.append(memo[key])
+    return colors
+
+
+def _gather(schedule, per_match, continuation, empty, closed):
+    """以 schedule.grid 索引 per_match 表，延續格、空格與場館沒開的格子另外填值"""
+    table = np.array(list(per_match) + [empty], dtype=object)  # 索引 -1 -> empty
+    out = table[schedule.grid]
+    out[(schedule.grid >= 0) & ~schedule.head_mask()] = continuation
+    if schedule.layout is not None:
+        out[~schedule.layout.open] = closed
+    return out
+
+
+def build_fill_matrix(schedule, all_levels):
+    """每格底色 hex (與大表同形狀)：開賽格用組別/階段色，延續格用淺灰，空格為 ''"""
+    return _gather(schedule, _match_colors(schedule.table, all_levels), CONTINUATION_COLOR, '', CLOSED_COLOR)
+
+
+def build_style_base(schedule, all_levels):
+    """整張大表的 CSS 矩陣 (不含搜尋高亮)"""
+    css = [f'background-color: {c}; color: black;' for c in _match_colors(schedule.table, all_levels)]
+    return _gather(schedule, css, CONTINUATION_CSS, '', CLOSED_CSS)
+
+
+def search_mask(schedule, keyword, index=None):
+    """
+    搜尋命中的格子 (bool 矩陣，整場比賽的所有格)
+    以 TeamIndex 查：隊名完全相同，或是 level / 晉級代稱裡的一個詞 (例："A組 冠軍" 的 "A組"、"冠軍")
+    """
+    if not keyword or keyword == "無":
+        return np.zeros(schedule.grid.shape, dtype=bool)
+    if index is None:
+        index = TeamIndex(schedule)
+    return index.hit_mask(keyword)[schedule.grid]
+
+
+def build_style_matrix(style_base, schedule, schedule_df, keyword="無", index=None):
+    """套上搜尋高亮，回傳與 schedule_df 同形狀、給 Styler.apply(axis=None) 用的 DataFrame"""
+    css = style_base
+    mask = search_mask(schedule, keyword, index)
+    if mask.any():
+        css = np.where(mask, HIGHLIGHT_CSS, css)
+    return pd.DataFrame(css, index=schedule_df.index, columns=schedule_df.columns)
+
+
+# --- 容量規劃熱度圖 ---
+HEATMAP_LOW = np.array([0xC8, 0xE6, 0xC9])   # 最便宜：綠
+HEATMAP_HIGH = np.array([0xFF, 0xCD, 0xD2])  # 最貴：紅
+INFEASIBLE_CSS = 'background-color: #eeeeee; color: #bbb;'
+
+
+def build_heatmap_style(values_df):
+    """數值越小越綠、越大越紅；NaN (排不下) 為灰色。回傳給 Styler.apply(axis=None) 用的 DataFrame"""
+    values = values_df.to_numpy(dtype=float)
+    valid = ~np.isnan(values)
+    css = np.full(values.shape, INFEASIBLE_CSS, dtype=object)
+    if valid.any():
+        lo, hi = values[valid].min(), values[valid].max()
+        ratio = np.zeros(values.shape) if hi == lo else np.nan_to_num((values - lo) / (hi - lo))
+        rgb = (HEATMAP_LOW + (HEATMAP_HIGH - HEATMAP_LOW) * ratio[..., None]).round().astype(int)
+        hex_colors = np.array([f'#{r:02X}{g:02X}{b:02X}' for r, g, b in rgb.reshape(-1, 3)], dtype=object)
+        css[valid] = [f'background-color: {c}; color: black;' for c in hex_colors.reshape(values.shape)[valid]]
+    return pd.DataFrame(css, index=values_df.index, columns=values_df.columns)
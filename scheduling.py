@@ -0,0 +1,615 @@
+import heapq
+import os
+import random
+import time
+from bisect import bisect_left, insort
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from model import Placement, Schedule, Stage, get_match_stage
+from profiling import count
+
+
+# --- 優先級邏輯 ---
+def get_match_priority(match):
+    return int(get_match_stage(match))
+
+
+def dependency_graph(table):
+    """
+    由 table.links() 建排程用的依賴圖：
+    (每場剩幾個前置, 比賽 id -> 依賴它的比賽, 組別 id -> 要等這組打完的比賽, 組別 id -> 初賽場數)
+    """
+    links = table.links()
+    preds_left = [0] * len(table)
+    after_match = {}
+    after_group = {}
+    group_size = {}
+    for mid, link in enumerate(links):
+        if table.stage[mid] == Stage.GROUP:
+            lvl = table.level[mid]
+            group_size[lvl] = group_size.get(lvl, 0) + 1
+            continue
+        for feed in link.feeds:
+            if feed.source is not None:
+                after_match.setdefault(feed.source, []).append(mid)
+                preds_left[mid] += 1
+        for lvl in link.gates:
+            after_group.setdefault(lvl, []).append(mid)
+            preds_left[mid] += 1
+    return preds_left, after_match, after_group, group_size
+
+
+def critical_path_lengths(table):
+    """
+    每場比賽到整個賽程結束的最長依賴鏈格數 (含自己)
+    初賽 = 同組剩下的輪次 + 這組晉級後的最長鏈
+    """
+    _, after_match, after_group, _ = dependency_graph(table)
+    span = table.span
+    tail = {}
+
+    def knockout_tail(mid, visiting):
+        if mid in tail:
+            return tail[mid]
+        visiting.add(mid)
+        longest = max((knockout_tail(d, visiting) for d in after_match.get(mid, ()) if d not in visiting), default=0)
+        visiting.discard(mid)
+        tail[mid] = span[mid] + longest
+        return tail[mid]
+
+    gate_tail = {lvl: max(knockout_tail(d, set()) for d in deps) for lvl, deps in after_group.items()}
+    # 循環賽每輪每隊都要上場，同組的後續輪次也是一條鏈：第 r 輪之後還有 (最後一輪 - r) 輪
+    last_round = {}
+    for mid in range(len(table)):
+        if table.stage[mid] == Stage.GROUP:
+            lvl = table.level[mid]
+            last_round[lvl] = max(last_round.get(lvl, 0), table.round[mid])
+    lengths = [0] * len(table)
+    for mid in range(len(table)):
+        if table.stage[mid] == Stage.GROUP:
+            lvl = table.level[mid]
+            rounds_left = last_round[lvl] - table.round[mid] + 1 if table.round[mid] else 1
+            lengths[mid] = span[mid] * rounds_left + gate_tail.get(lvl, 0)
+        else:
+            lengths[mid] = knockout_tail(mid, set())
+    return lengths
+
+
+def critical_path_order(table, lengths=None):
+    """
+    預設排程順序：依賴鏈越長的越先 (例如餵 4 強的組別初賽、8 強 -> 4 強 -> 決賽)，
+    其次依階段、循環賽輪次、表內順序
+    """
+    lengths = critical_path_lengths(table) if lengths is None else lengths
+    stage, rounds = table.stage, table.round
+    return sorted(range(len(table)), key=lambda mid: (-lengths[mid], stage[mid], rounds[mid], mid))
+
+
+def schedule_matches(table, num_courts, slots_count, order=None, sessions=None):
+    """
+    事件驅動排程引擎 (取代逐格掃描)
+
+    - 比賽要等前置依賴全部打完才能上場 (table.links()：晉級來源的比賽、
+      代稱所屬組別的初賽)，其餘比賽不必等整個階段排完
+    - 可以上場的比賽依 order 的順序挑第一場「兩隊都有空」的
+      (預設為 critical_path_order：依賴鏈長的先排，同長度依循環賽輪次)
+    - 同一時間點，場地依編號由小到大填入
+    - 比賽必須在 slots_count 格內打完；排不進去的比賽，依賴它的比賽也不會排入
+    - sessions = [(結束格, 場地數), ...] 時，時間軸由多個時段接成 (多天 / 同一場館上下午)：
+      比賽不能跨時段，時段剩下的時間放不下就等下一個時段；每個時段的場地數可以不同
+
+    只在「有場地空出來」的時間點處理，並用
+    場地結束時間 heap / 可上場比賽的 heap / 隊伍等待索引 / 依賴計數
+    取代每一格對整個佇列的重新排序與掃描。
+    每場比賽的長度取 table.span。
+
+    table: MatchTable；order: 比賽 id 的排列
+    回傳 (placements, unscheduled_ids)
+    """
+    n = len(table)
+    sessions = list(sessions) if sessions else [(slots_count, num_courts)]
+    slots_count = sessions[-1][0]
+    session = 0
+    session_end = sessions[0][0]
+    order = critical_path_order(table) if order is None else list(order)
+    stage, span, level = table.stage, table.span, table.level
+    team_a, team_b = table.team_a, table.team_b
+
+    rank_of = [0] * n
+    for rank, mid in enumerate(order):
+        rank_of[mid] = rank
+    preds_left, after_match, after_group, group_left = dependency_graph(table)
+
+    team_free_at = [0] * len(table.strings)   # 隊伍 id -> 可以再上場的格數
+    waiting = {}                               # 隊伍 id -> 等這隊空出來的 rank
+    ready = []                                 # heap of rank：前置已完成、兩隊都有空的比賽
+    placed = [False] * n
+
+    def busy_team(mid, t):
+        ta, tb = team_a[mid], team_b[mid]
+        fa, fb = team_free_at[ta], team_free_at[tb]
+        if fa <= t and fb <= t:
+            return None
+        return ta if fa >= fb else tb
+
+    def enqueue(rank, t):
+        team = busy_team(order[rank], t)
+        if team is None:
+            heapq.heappush(ready, rank)
+        else:
+            waiting.setdefault(team, []).append(rank)
+
+    def release(deps, t):
+        for dep in deps:
+            preds_left[dep] -= 1
+            if preds_left[dep] == 0:
+                enqueue(rank_of[dep], t)
+
+    scans = 0  # 從可上場 heap 取出檢查的次數
+
+    def pick(t):
+        nonlocal scans
+        while ready:
+            rank = heapq.heappop(ready)
+            scans += 1
+            mid = order[rank]
+            team = busy_team(mid, t)
+            if team is not None:
+                waiting.setdefault(team, []).append(rank)
+                continue
+            if t + span[mid] > session_end:
+                if session + 1 < len(sessions):
+                    # 這個時段放不下，留到下一個時段
+                    deferred.append(rank)
+                    continue
+                # 放不下的比賽不會再有機會 (依賴它的比賽也一樣)
+                continue
+            return mid
+        return None
+
+    placements = []
+    running = []                          # heap of (結束格, 場地, 比賽 id)
+    idle = list(range(sessions[0][1]))    # 目前空著的場地 (已排序)
+    deferred = []                         # 這個時段剩下的時間放不下的比賽 rank
+    t = 0
+    for rank, mid in enumerate(order):
+        if preds_left[mid] == 0:
+            enqueue(rank, t)
+
+    while t < slots_count:
+        # 1. 釋放在 t 之前結束的場地與隊伍，以及前置剛打完的比賽
+        while running and running[0][0] <= t:
+            _, col, mid = heapq.heappop(running)
+            insort(idle, col)
+            for team in (team_a[mid], team_b[mid]):
+                for w in waiting.pop(team, ()):
+                    enqueue(w, t)
+            release(after_match.get(mid, ()), t)
+            if stage[mid] == Stage.GROUP:
+                group_left[level[mid]] -= 1
+                if group_left[level[mid]] == 0:
+                    release(after_group.get(level[mid], ()), t)
+
+        # 換時段：比賽都在時段內打完，所以場地全部空出來
+        while session + 1 < len(sessions) and t >= session_end:
+            session += 1
+            session_end = sessions[session][0]
+            idle = list(range(sessions[session][1]))
+            for rank in deferred:
+                enqueue(rank, t)
+            deferred = []
+
+        # 2. 依場地編號填入
+        still_idle = []
+        for i, col in enumerate(idle):
+            mid = pick(t)
+            if mid is None:
+                still_idle.extend(idle[i:])
+                break
+            end = t + span[mid]
+            team_free_at[team_a[mid]] = end
+            team_free_at[team_b[mid]] = end
+            placed[mid] = True
+            placements.append(Placement(mid, t, col, span[mid]))
+            heapq.heappush(running, (end, col, mid))
+        idle = still_idle
+
+        # 3. 跳到下一個有場地空出來的時間點 (或下一個時段的開始)
+        if running:
+            t = running[0][0]
+        elif session + 1 < len(sessions) and deferred:
+            t = session_end
+        else:
+            break
+
+    unscheduled = [mid for mid in order if not placed[mid]]
+    count("matches_placed", len(placements))
+    count("queue_scans", scans)
+    return placements, unscheduled
+
+
+def schedule_score(placements, unscheduled):
+    """排程好壞 (越小越好)：(排不進去的場數, 最後結束格, 所有比賽結束格總和)"""
+    ends = [p.row + p.span for p in placements]
+    return (len(unscheduled), max(ends, default=0), sum(ends))
+
+
+def schedule_lower_bound(table, num_courts):
+    """最後結束格的下限：總格數平均到每個場地 / 單一隊伍要打的總格數"""
+    total = 0
+    team_load = {}
+    for mid in range(len(table)):
+        span = table.span[mid]
+        total += span
+        for team in (table.team_a[mid], table.team_b[mid]):
+            team_load[team] = team_load.get(team, 0) + span
+    return max(-(-total // num_courts) if num_courts else 0, max(team_load.values(), default=0))
+
+
+def shuffled_order(table, rng, lengths=None):
+    """
+    隨機起點：每組的輪次順序重新洗牌 (同組各輪可以互換)，
+    同一輪內的比賽順序也打亂；依賴鏈長度 (critical_path_lengths) 與階段的先後不變
+    """
+    lengths = critical_path_lengths(table) if lengths is None else lengths
+    rounds_by_level = {}
+    for mid in range(len(table)):
+        if table.round[mid]:
+            rounds_by_level.setdefault(table.level[mid], set()).add(table.round[mid])
+    remap = {}
+    for lvl, rounds in sorted(rounds_by_level.items()):
+        rounds = sorted(rounds)
+        shuffled = list(rounds)
+        rng.shuffle(shuffled)
+        remap.update({(lvl, r): s for r, s in zip(rounds, shuffled)})
+
+    order = list(range(len(table)))
+    rng.shuffle(order)
+    return sorted(order, key=lambda mid: (-lengths[mid], table.stage[mid],
+                                          remap.get((table.level[mid], table.round[mid]), 0)))
+
+
+def _attempt_order(table, seed, attempt, lengths):
+    # 第 0 次固定用預設順序，確保多次嘗試不會比一般排程差
+    if attempt == 0:
+        return critical_path_order(table, lengths)
+    # 以字串當種子：與 PYTHONHASHSEED、行程無關，同 seed 同 attempt 一定得到同一個順序
+    return shuffled_order(table, random.Random(f"{seed}:{attempt}"), lengths)
+
+
+def _run_attempts(table, num_courts, slots_count, seed, attempts, sessions=None):
+    """在 worker 行程裡跑一批嘗試，只回傳這批裡最好的 (score, attempt, order, result)"""
+    best = None
+    lengths = critical_path_lengths(table)
+    for attempt in attempts:
+        order = _attempt_order(table, seed, attempt, lengths)
+        result = schedule_matches(table, num_courts, slots_count, order, sessions)
+        score = schedule_score(*result)
+        if best is None or (score, attempt) < (best[0], best[1]):
+            best = (score, attempt, order, result)
+    return best
+
+
+def multi_start_schedule(table, num_courts, slots_count, attempts, seed=0, workers=None, sessions=None):
+    """
+    多起點排程：以 attempts 種不同的比賽順序各排一次，取
+    (排不進去的場數, 最後結束格, 結束時間總和) 最小者；分數相同取編號小的嘗試。
+
+    嘗試分批交給 ProcessPoolExecutor 平行執行。每次嘗試的順序只由 (seed, 嘗試編號)
+    決定，所以結果與 worker 數量、完成順序無關，同一個 seed 一定選出同一份排程。
+    sessions 同 schedule_matches (多時段的時間軸)
+
+    回傳 (placements, unscheduled_ids, order, best_attempt)
+    """
+    attempts = max(1, int(attempts))
+    workers = min(workers or os.cpu_count() or 1, attempts)
+    if workers <= 1:
+        batches = [range(attempts)]
+    else:
+        # 交錯分批，讓每個 worker 拿到的嘗試數差不多
+        batches = [range(w, attempts, workers) for w in range(workers)]
+
+    if len(batches) == 1:
+        results = [_run_attempts(table, num_courts, slots_count, seed, batches[0], sessions)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_run_attempts, table, num_courts, slots_count, seed, b, sessions) for b in batches]
+            results = [f.result() for f in futures]
+
+    score, attempt, order, (placements, unscheduled) = min(results, key=lambda r: (r[0], r[1]))
+    return placements, unscheduled, order, attempt
+
+
+def optimize_schedule(table, num_courts, slots_count, time_budget, seed=None, order=None):
+    """
+    最佳化模式：從貪婪排程出發，在 time_budget 秒內做局部搜尋
+
+    搜尋的是「同一階段範圍內的比賽順序」，每個候選順序都交給
+    schedule_matches 重新排一次，所以隊伍不會撞場、
+    晉級依賴也和貪婪法一樣被遵守。
+    目標依序為：排不進去的場數、最後結束時間、結束時間總和。
+
+    order: 起始順序 (例如 multi_start_schedule 選出的順序)，預設為 critical_path_order
+
+    回傳 (placements, unscheduled_ids)，格式與 schedule_matches 相同
+    """
+    rng = random.Random(seed)
+    deadline = time.perf_counter() + time_budget
+    stage = table.stage
+
+    if order is None:
+        order = critical_path_order(table)
+    else:
+        order = list(order)
+    best = schedule_matches(table, num_courts, slots_count, order)
+    best_score = schedule_score(*best)
+    lower_bound = schedule_lower_bound(table, num_courts)
+
+    # 各階段在 order 裡的範圍 [lo, hi)，只在範圍內搬動 (任何順序都合法，範圍只是縮小搜尋)
+    tier_ranges = {}
+    for i, mid in enumerate(order):
+        lo, _ = tier_ranges.get(stage[mid], (i, i))
+        tier_ranges[stage[mid]] = (lo, i + 1)
+    movable = [r for r in tier_ranges.values() if r[1] - r[0] > 1]
+    if not movable:
+        return best
+
+    current, current_result, current_score = order, best, best_score
+    while time.perf_counter() < deadline:
+        if best_score[0] == 0 and best_score[1] <= lower_bound:
+            break
+        placements, unscheduled = current_result
+        candidate = list(current)
+
+        # 一半機率把「排不進去」或「最晚結束」的比賽往前搬，其餘隨機交換
+        if unscheduled:
+            late = set(unscheduled)
+        else:
+            last_end = max(p.row + p.span for p in placements)
+            late = set(p.match_id for p in placements if p.row + p.span == last_end)
+        late_pos = []
+        for i, mid in enumerate(candidate):
+            lo, hi = tier_ranges[stage[mid]]
+            if mid in late and hi - lo > 1:
+                late_pos.append(i)
+        if late_pos and rng.random() < 0.5:
+            i = rng.choice(late_pos)
+            lo, _ = tier_ranges[stage[candidate[i]]]
+            candidate.insert(rng.randrange(lo, i + 1), candidate.pop(i))
+        else:
+            lo, hi = rng.choice(movable)
+            i, j = rng.randrange(lo, hi), rng.randrange(lo, hi)
+            candidate[i], candidate[j] = candidate[j], candidate[i]
+
+        result = schedule_matches(table, num_courts, slots_count, candidate)
+        score = schedule_score(*result)
+        # 分數相同也接受，讓搜尋可以在平台上移動
+        if score <= current_score:
+            current, current_result, current_score = candidate, result, score
+            if score < best_score:
+                best, best_score = result, score
+    return best
+
+
+class _Timeline:
+    """單一場地或隊伍的已佔用區間 (依開始格排序)"""
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+
+    def add(self, start, end):
+        i = bisect_left(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+
+    def conflict_end(self, start, end):
+        """[start, end) 與已佔用區間重疊時，回傳重疊區間的結束格，否則 None"""
+        i = bisect_left(self.starts, end)
+        if i > 0 and self.ends[i - 1] > start:
+            return self.ends[i - 1]
+        return None
+
+
+def repair_schedule(schedule, cutoff, closed_courts=(), extend=None, delays=None):
+    """
+    從 cutoff (格) 開始局部重排，不重新編號
+
+    - 已結束 / 進行中的比賽固定不動 (進行中的比賽可延長)
+    - cutoff 之後的比賽若原位置仍可用就留在原地
+    - 受影響的比賽 (場地關閉、被延長的比賽擋到、隊伍遲到、
+      或被前面搬動的比賽擠掉) 才搬到最早可用的位置，且不早於原本公布的時間
+    - 仍遵守隊伍不撞場與晉級依賴 (比賽不早於前置比賽 / 所屬組別初賽的結束)
+    - 多場館 (schedule.layout) 時只用場館開放的時段，且比賽不會搬到別的場館
+
+    closed_courts: 從 cutoff 起關閉的場地編號 (0 起算)
+    extend: {比賽編號: 延長幾格}
+    delays: {隊名: 最早可上場的格數}
+
+    回傳 (new_schedule, moved_ids, unscheduled_ids)；比賽編號沿用原排程
+    """
+    table = schedule.table
+    num_courts, slots_count = schedule.num_courts, schedule.slots_count
+    closed = set(closed_courts)
+    extend = extend or {}
+    delays = {table.string_id(name): row for name, row in (delays or {}).items()
+              if table.string_id(name) is not None}
+
+    courts = [_Timeline() for _ in range(num_courts)]
+    teams = {}
+    layout = schedule.layout
+    if layout is not None:
+        # 場館沒開的時間當成已佔用
+        for col in range(num_courts):
+            closed_rows = np.flatnonzero(~layout.open[:, col])
+            if len(closed_rows):
+                breaks = np.flatnonzero(np.diff(closed_rows) > 1)
+                for a, b in zip(np.r_[0, breaks + 1], np.r_[breaks, len(closed_rows) - 1]):
+                    courts[col].add(int(closed_rows[a]), int(closed_rows[b]) + 1)
+
+    def team_line(tid):
+        if tid not in teams:
+            teams[tid] = _Timeline()
+        return teams[tid]
+
+    def commit(p):
+        ends[p.match_id] = p.row + p.span
+        courts[p.col].add(p.row, p.row + p.span)
+        team_line(table.team_a[p.match_id]).add(p.row, p.row + p.span)
+        team_line(table.team_b[p.match_id]).add(p.row, p.row + p.span)
+        result.append(p)
+
+    def blocked_until(mid, row, span):
+        """隊伍在 [row, row+span) 有衝突或還沒到時，回傳可再嘗試的格數"""
+        end = row + span
+        nxt = None
+        for tid in (table.team_a[mid], table.team_b[mid]):
+            ready_at = delays.get(tid, 0)
+            if row < ready_at:
+                nxt = max(nxt or 0, ready_at)
+            busy = team_line(tid).conflict_end(row, end)
+            if busy is not None:
+                nxt = max(nxt or 0, busy)
+        return nxt
+
+    def free_gaps():
+        """cutoff 之後各開放場地的空檔 (start, end, col)"""
+        gaps = []
+        for col in range(num_courts):
+            if col in closed:
+                continue
+            line = courts[col]
+            t = cutoff
+            for s, e in zip(line.starts, line.ends):
+                if s > t:
+                    gaps.append((t, min(s, slots_count), col))
+                t = max(t, e)
+            if t < slots_count:
+                gaps.append((t, slots_count, col))
+        return gaps
+
+    links = table.links()
+    depth = {}
+
+    def dep_depth(mid):
+        """依賴層數：初賽 0，第一輪複賽 1，之後每輪加 1"""
+        if mid not in depth:
+            if table.stage[mid] == Stage.GROUP:
+                depth[mid] = 0
+            else:
+                depth[mid] = -1  # 防止循環代稱無限遞迴
+                depth[mid] = 1 + max((dep_depth(f.source) for f in links[mid].feeds if f.source is not None), default=0)
+        return depth[mid]
+
+    group_end, group_missing = {}, set()
+
+    def ready_at(mid):
+        """前置比賽都排好時回傳最早可開打的格數，否則 None"""
+        link = links[mid]
+        row = 0
+        for feed in link.feeds:
+            if feed.source is not None:
+                if feed.source not in ends:
+                    return None
+                row = max(row, ends[feed.source])
+        for lvl in link.gates:
+            if lvl in group_missing:
+                return None
+            row = max(row, group_end.get(lvl, 0))
+        return row
+
+    result = []
+    future = []
+    ends = {}
+    for p in schedule.placements():
+        span = p.span
+        if p.row + p.span > cutoff:
+            # 已打完的比賽不能再延長
+            span += extend.get(int(schedule.match_no[p.match_id]), 0)
+        if p.row < cutoff:
+            # 已結束或進行中：固定；已結束的比賽不會和 cutoff 之後衝突，不必建索引
+            if p.row + span <= cutoff:
+                result.append(p)
+                ends[p.match_id] = p.row + span
+            else:
+                commit(p._replace(span=min(span, slots_count - p.row)))
+        else:
+            future.append(p._replace(span=span))
+    # 原本就排不進去的初賽，那組的晉級比賽也無法確定對手
+    for mid in schedule.unscheduled_ids().tolist():
+        if table.stage[mid] == Stage.GROUP:
+            group_missing.add(table.level[mid])
+
+    # 依依賴層數分批處理；每批先保留仍有效的原位置，再把被擠掉的塞進最早空檔
+    future.sort(key=lambda p: (dep_depth(p.match_id), p.row, p.col))
+    moved, unscheduled = [], []
+    i = 0
+    while i < len(future):
+        level_depth = dep_depth(future[i].match_id)
+        j = i
+        while j < len(future) and dep_depth(future[j].match_id) == level_depth:
+            j += 1
+        if level_depth >= 1:
+            # 初賽都處理完了：各組最後結束的格數
+            for mid, end in ends.items():
+                if table.stage[mid] == Stage.GROUP:
+                    lvl = table.level[mid]
+                    group_end[lvl] = max(group_end.get(lvl, 0), end)
+
+        displaced = []
+        for p in future[i:j]:
+            floor = ready_at(p.match_id)
+            if floor is None:
+                unscheduled.append(p.match_id)
+                continue
+            end = p.row + p.span
+            ok = (p.col not in closed and p.row >= floor and end <= slots_count
+                  and courts[p.col].conflict_end(p.row, end) is None
+                  and blocked_until(p.match_id, p.row, p.span) is None)
+            if ok:
+                commit(p)
+            else:
+                displaced.append((p, floor))
+
+        # 被擠掉的比賽：在各場地的空檔裡找最早、隊伍也有空的位置
+        gaps = free_gaps() if displaced else []
+        for p, floor in displaced:
+            row = max(cutoff, floor, p.row)
+            placed = None
+            while True:
+                cands = [g for g in gaps if g[1] - max(g[0], row) >= p.span
+                         and (layout is None or layout.court_venue[g[2]] == layout.court_venue[p.col])]
+                if not cands:
+                    break
+                row = max(row, min(g[0] for g in cands))
+                nxt = blocked_until(p.match_id, row, p.span)
+                if nxt is not None:
+                    row = nxt
+                    continue
+                fit = [g for g in cands if g[0] <= row]
+                if fit:
+                    g = min(fit, key=lambda g: g[2])
+                    gaps.remove(g)
+                    if g[0] < row:
+                        gaps.append((g[0], row, g[2]))
+                    if row + p.span < g[1]:
+                        gaps.append((row + p.span, g[1], g[2]))
+                    placed = p._replace(row=row, col=g[2])
+                    break
+                row = min(g[0] for g in cands if g[0] > row)
+            if placed:
+                commit(placed)
+                moved.append(placed.match_id)
+            else:
+                unscheduled.append(p.match_id)
+                if table.stage[p.match_id] == Stage.GROUP:
+                    group_missing.add(table.level[p.match_id])
+        i = j
+
+    repaired = Schedule(table, slots_count, num_courts, schedule.play_start, schedule.mins_per_point, layout)
+    for p in result:
+        repaired.place(p.match_id, p.row, p.col, p.span)
+        repaired.match_no[p.match_id] = schedule.match_no[p.match_id]
+    return repaired, moved, unscheduled
@@ -0,0 +1,143 @@
+"""
+填分表匯入：裁判交回的 Excel 填分表一次讀多個檔
+
+- 格式同 export.export_bracket_excel (樹狀圖填分表)；其他表只要有 "Match No." (或 "No.")、"Score A"、"Score B" 欄也可以
+- openpyxl read-only 串流讀取，每張表只讀表頭與需要的那幾欄
+- 依比賽編號對到目前排程的比賽；隊伍不符、成績不合理、同一場在幾張表的成績不同都列為衝突，不套用
+"""
+import io
+import zipfile
+from collections import namedtuple
+
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+
+from model import Stage
+
+MATCH_NO_HEADERS = ("Match No.", "No.")
+SCORE_HEADERS = ("Score A", "Score B")
+TEAM_HEADERS = ("Team A", "Team B")
+
+# 表上的一列成績；row 為 Excel 的列號，team_a / team_b 沒有隊伍欄時為 None
+SheetRow = namedtuple("SheetRow", ["source", "sheet", "row", "match_no", "team_a", "team_b", "score_a", "score_b"])
+# 沒有套用的一列與原因
+Conflict = namedtuple("Conflict", ["source", "sheet", "row", "match_no", "reason"])
+
+
+def _score(value):
+    """儲存格 -> 得點 (非負整數)；空白為 None，其他值 raise ValueError"""
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    if isinstance(value, bool):
+        raise ValueError(value)
+    if isinstance(value, float):
+        if not value.is_integer():
+            raise ValueError(value)
+        value = int(value)
+    score = int(value.strip()) if isinstance(value, str) else int(value)
+    if score < 0:
+        raise ValueError(value)
+    return score
+
+
+def _text(value):
+    return str(value).strip() if value is not None and str(value).strip() else None
+
+
+def read_score_sheet(data, source):
+    """一個 xlsx (bytes) -> (SheetRow list, Conflict list)；沒有欄位的工作表、兩邊都沒填成績的列略過"""
+    rows, conflicts = [], []
+    try:
+        wb = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile, InvalidFileException) as e:
+        return rows, [Conflict(source, None, None, None, f"無法讀取：{e}")]
+    try:
+        for ws in wb.worksheets:
+            header = next(ws.iter_rows(min_row=1, max_row=1, values_only=True), ())
+            names = {_text(v): i for i, v in enumerate(header) if _text(v)}
+            no_col = next((names[h] for h in MATCH_NO_HEADERS if h in names), None)
+            if no_col is None or not all(h in names for h in SCORE_HEADERS):
+                continue
+            cols = [no_col] + [names[h] for h in SCORE_HEADERS] + [names.get(h) for h in TEAM_HEADERS]
+            width = max(c for c in cols if c is not None) + 1
+            for r, values in enumerate(ws.iter_rows(min_row=2, max_col=width, values_only=True), start=2):
+                values = tuple(values) + (None,) * (width - len(values))
+                no, a, b, team_a, team_b = (values[c] if c is not None else None for c in cols)
+                if _text(no) is None:
+                    continue
+                try:
+                    match_no = int(float(no))
+                    score_a, score_b = _score(a), _score(b)
+                except (TypeError, ValueError):
+                    conflicts.append(Conflict(source, ws.title, r, _text(no), "編號或成績格式錯誤"))
+                    continue
+                if score_a is None and score_b is None:
+                    continue
+                if score_a is None or score_b is None:
+                    conflicts.append(Conflict(source, ws.title, r, match_no, "成績不完整"))
+                    continue
+                rows.append(SheetRow(source, ws.title, r, match_no, _text(team_a), _text(team_b), score_a, score_b))
+    finally:
+        wb.close()
+    return rows, conflicts
+
+
+def merge_scores(rows, plan, current, overwrite=False):
+    """
+    把讀進來的成績對到排程 (依 Match No.)，只走一遍所有列
+    current(mid) -> 目前已登錄的 (team_a 得點, team_b 得點) 或 None
+    overwrite=False 時，與已登錄成績不同的列列為衝突
+
+    回傳 (updates {比賽 id: (team_a 得點, team_b 得點)} (依比賽的 team_a / team_b 順序), Conflict list, 未變動場數)
+    """
+    table = plan.table
+    by_no = {int(plan.match_no[mid]): int(mid) for mid in plan.scheduled_ids()}
+    # 初賽出場的隊伍；複賽 / 決賽還是代稱 ("A組 冠軍"、"4強賽 勝方1") 時不收成績
+    entrants = set()
+    for mid in range(len(table)):
+        if table.stage[mid] == Stage.GROUP:
+            entrants.add(table.team_a[mid])
+            entrants.add(table.team_b[mid])
+    candidates = {}
+    conflicts = []
+    for row in rows:
+        mid = by_no.get(row.match_no)
+        if mid is None:
+            conflicts.append(Conflict(row.source, row.sheet, row.row, row.match_no, "排程裡沒有這個比賽編號"))
+            continue
+        team_a, team_b = table.name(table.team_a[mid]), table.name(table.team_b[mid])
+        score = (row.score_a, row.score_b)
+        if row.team_a is not None or row.team_b is not None:
+            if (row.team_a, row.team_b) == (team_b, team_a):
+                score = (row.score_b, row.score_a)
+            elif (row.team_a, row.team_b) != (team_a, team_b):
+                conflicts.append(Conflict(row.source, row.sheet, row.row, row.match_no,
+                                          f"隊伍不符：表上 {row.team_a} vs {row.team_b}，排程為 {team_a} vs {team_b}"))
+                continue
+        if table.stage[mid] != Stage.GROUP and entrants and not {table.team_a[mid], table.team_b[mid]} <= entrants:
+            conflicts.append(Conflict(row.source, row.sheet, row.row, row.match_no, "對戰隊伍尚未確定"))
+            continue
+        if table.stage[mid] != Stage.GROUP and score[0] == score[1]:
+            conflicts.append(Conflict(row.source, row.sheet, row.row, row.match_no, "淘汰賽不能平手"))
+            continue
+        candidates.setdefault(mid, []).append((score, row))
+
+    updates, unchanged = {}, 0
+    for mid, entries in candidates.items():
+        scores = {score for score, _ in entries}
+        if len(scores) > 1:
+            text = " / ".join(f"{a}:{b}" for a, b in sorted(scores))
+            conflicts.extend(Conflict(row.source, row.sheet, row.row, row.match_no, f"多張表成績不同 ({text})")
+                             for _, row in entries)
+            continue
+        score = scores.pop()
+        old = current(mid)
+        if old == score:
+            unchanged += 1
+        elif old is not None and not overwrite:
+            _, row = entries[0]
+            conflicts.append(Conflict(row.source, row.sheet, row.row, row.match_no,
+                                      f"已登錄 {old[0]}:{old[1]}，表上為 {score[0]}:{score[1]}"))
+        else:
+            updates[mid] = score
+    return updates, conflicts, unchanged
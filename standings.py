@@ -0,0 +1,220 @@
+from model import MatchTable, Stage, get_match_stage
+
+PLACE_NAMES = ["冠軍", "亞軍", "季軍", "殿軍"]
+
+
+def place_name(rank):
+    """第 rank 名 (0 起算) 的稱呼，與複賽代稱 "A組 冠軍" 的寫法一致"""
+    return PLACE_NAMES[rank] if rank < len(PLACE_NAMES) else f"第{rank + 1}名"
+
+
+class GroupStandings:
+    """
+    初賽 (分組循環) 積分
+
+    - 每輸入 / 修改一筆成績只更新兩隊的累計 (勝場、得失點)，O(1)
+    - 排名在讀取時才重算，而且只重算有新成績的組別；
+      勝場相同的隊伍才套用勝負關係 / 點數比，不會整組重算
+    - 整組比完後才產生 "A組 冠軍" 這類代稱對應的隊伍
+    """
+    __slots__ = ("groups", "group_of", "expected", "played", "results", "stats", "_rankings", "_dirty")
+
+    def __init__(self):
+        self.groups = {}      # 組別 -> [隊名]
+        self.group_of = {}    # 隊名 -> 組別
+        self.expected = {}    # 組別 -> 應賽場數
+        self.played = {}      # 組別 -> 已有成績的場數
+        self.results = {}     # frozenset({a, b}) -> (組別, a, b, a 得點, b 得點)
+        self.stats = {}       # 隊名 -> [出賽, 勝, 敗, 得點, 失點]
+        self._rankings = {}
+        self._dirty = set()
+
+    @classmethod
+    def from_matches(cls, matches):
+        standings = cls()
+        for m in matches:
+            if get_match_stage(m) != Stage.GROUP:
+                continue
+            lvl = m['level']
+            members = standings.groups.setdefault(lvl, [])
+            for name in (m['team_a'], m['team_b']):
+                if name not in standings.stats:
+                    standings.stats[name] = [0, 0, 0, 0, 0]
+                    standings.group_of[name] = lvl
+                    members.append(name)
+            standings.expected[lvl] = standings.expected.get(lvl, 0) + 1
+            standings.played.setdefault(lvl, 0)
+            standings._dirty.add(lvl)
+        return standings
+
+    def _apply(self, a, b, score_a, score_b, sign):
+        sa, sb = self.stats[a], self.stats[b]
+        sa[0] += sign
+        sb[0] += sign
+        if score_a > score_b:
+            sa[1] += sign
+            sb[2] += sign
+        elif score_b > score_a:
+            sb[1] += sign
+            sa[2] += sign
+        sa[3] += sign * score_a
+        sa[4] += sign * score_b
+        sb[3] += sign * score_b
+        sb[4] += sign * score_a
+
+    def record(self, team_a, team_b, score_a, score_b):
+        """輸入或修改一場初賽成績 (得點 = 贏的點數)；不是同組的兩隊會 raise KeyError"""
+        key = frozenset((team_a, team_b))
+        lvl = self._group_of(team_a, team_b)
+        old = self.results.get(key)
+        if old is not None:
+            self._apply(old[1], old[2], old[3], old[4], -1)
+        else:
+            self.played[lvl] += 1
+        self._apply(team_a, team_b, score_a, score_b, 1)
+        self.results[key] = (lvl, team_a, team_b, score_a, score_b)
+        self._dirty.add(lvl)
+
+    def clear(self, team_a, team_b):
+        old = self.results.pop(frozenset((team_a, team_b)), None)
+        if old is not None:
+            self._apply(old[1], old[2], old[3], old[4], -1)
+            self.played[old[0]] -= 1
+            self._dirty.add(old[0])
+
+    def result(self, team_a, team_b):
+        """(team_a 得點, team_b 得點)；尚無成績回傳 None"""
+        old = self.results.get(frozenset((team_a, team_b)))
+        if old is None:
+            return None
+        return (old[3], old[4]) if old[1] == team_a else (old[4], old[3])
+
+    def _group_of(self, team_a, team_b):
+        lvl = self.group_of.get(team_a)
+        if lvl is None or self.group_of.get(team_b) != lvl or team_a == team_b:
+            raise KeyError(f"{team_a} / {team_b} 不是同組的初賽對戰")
+        return lvl
+
+    def is_complete(self, lvl):
+        return self.played.get(lvl, 0) >= self.expected.get(lvl, 0)
+
+    # --- 排名 ---
+    def _ratio(self, name):
+        s = self.stats[name]
+        return s[3] / s[4] if s[4] else float("inf") if s[3] else 0.0
+
+    def _head_to_head_wins(self, name, subset):
+        wins = 0
+        for other in subset:
+            if other == name:
+                continue
+            score = self.result(name, other)
+            if score and score[0] > score[1]:
+                wins += 1
+        return wins
+
+    def _break_tie(self, tied):
+        """勝場相同的隊伍：先比彼此間的勝場，分不開再比點數比、點數差"""
+        h2h = {name: self._head_to_head_wins(name, tied) for name in tied}
+        buckets = {}
+        for name in tied:
+            buckets.setdefault(h2h[name], []).append(name)
+        if len(buckets) == 1:
+            s = self.stats
+            return sorted(tied, key=lambda n: (-self._ratio(n), -(s[n][3] - s[n][4]), n))
+        ordered = []
+        for wins in sorted(buckets, reverse=True):
+            sub = buckets[wins]
+            ordered.extend(sub if len(sub) == 1 else self._break_tie(sub))
+        return ordered
+
+    def ranking(self, lvl):
+        """組內排名 (隊名 list)；只有這組有新成績時才重算"""
+        if lvl in self._dirty or lvl not in self._rankings:
+            by_wins = {}
+            for name in self.groups.get(lvl, []):
+                by_wins.setdefault(self.stats[name][1], []).append(name)
+            ordered = []
+            for wins in sorted(by_wins, reverse=True):
+                tied = by_wins[wins]
+                ordered.extend(tied if len(tied) == 1 else self._break_tie(tied))
+            self._rankings[lvl] = ordered
+            self._dirty.discard(lvl)
+        return self._rankings[lvl]
+
+    def table_rows(self, lvl):
+        """顯示用的積分表"""
+        rows = []
+        for rank, name in enumerate(self.ranking(lvl)):
+            played, wins, losses, won, lost = self.stats[name]
+            rows.append({
+                "rank": rank + 1, "team": name, "played": played, "wins": wins, "losses": losses,
+                "points_won": won, "points_lost": lost, "point_diff": won - lost,
+                "point_ratio": round(self._ratio(name), 3),
+            })
+        return rows
+
+    def placeholder_map(self):
+        """已比完組別的代稱 -> 隊名，例如 {"A組 冠軍": "快樂小隊-03", ...}"""
+        mapping = {}
+        for lvl in self.groups:
+            if not self.is_complete(lvl):
+                continue
+            for rank, name in enumerate(self.ranking(lvl)):
+                mapping[f"{lvl} {place_name(rank)}"] = name
+        return mapping
+
+
+def _score_pair(score_a, score_b):
+    """編輯器的一列成績 -> (a, b)；任一邊空白 (None / NaN) 視為沒有成績 None"""
+    if any(v is None or v != v for v in (score_a, score_b)):
+        return None
+    return int(score_a), int(score_b)
+
+
+def score_changes(rows, scores_a, scores_b):
+    """
+    初賽成績表編輯後真正有變動的場次：[(team_a, team_b, (a, b) 或 None = 清除), ...]
+    rows 為編輯前的列 ("Team A" / "Team B" / "Score A" / "Score B")；
+    編輯器整欄有數字時空白會變成 NaN，與原本的 None 視為相同，沒動的列不會每次 rerun 都寫入
+    """
+    changes = []
+    for row, new_a, new_b in zip(rows, scores_a, scores_b):
+        old, new = _score_pair(row["Score A"], row["Score B"]), _score_pair(new_a, new_b)
+        if old != new:
+            changes.append((row["Team A"], row["Team B"], new))
+    return changes
+
+
+def _resolve(name, mapping, previous_inverse):
+    slot = previous_inverse.get(name, name)
+    return mapping.get(slot, slot)
+
+
+def fill_placeholders(matches, mapping, previous=None):
+    """
+    把複賽 / 決賽比賽裡的 "A組 冠軍" 換成實際隊名，回傳新的比賽 dict list。
+    previous 為上次套用的對應；排名變動時會先換回代稱再套新的對應
+    (初賽比賽不動，所以同名的隊伍不會被誤換)
+    """
+    inverse = {team: slot for slot, team in (previous or {}).items()}
+    filled = []
+    for m in matches:
+        if get_match_stage(m) != Stage.GROUP:
+            m = dict(m, team_a=_resolve(m['team_a'], mapping, inverse), team_b=_resolve(m['team_b'], mapping, inverse))
+        filled.append(m)
+    return filled
+
+
+def relabel_table(table, mapping, previous=None):
+    """同 fill_placeholders，作用在 MatchTable 上 (比賽 id / 格數 / 輪次不變，可直接套回原排程)"""
+    inverse = {team: slot for slot, team in (previous or {}).items()}
+    relabeled = MatchTable()
+    for mid in range(len(table)):
+        m = table.to_dict(mid)
+        if table.stage[mid] != Stage.GROUP:
+            m['team_a'] = _resolve(m['team_a'], mapping, inverse)
+            m['team_b'] = _resolve(m['team_b'], mapping, inverse)
+        relabeled.append(m['type'], m['level'], m['team_a'], m['team_b'], m['desc'],
+                         table.span[mid], table.stage[mid], table.round[mid])
+    return relabeled
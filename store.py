@@ -0,0 +1,328 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from model import MatchTable, Schedule, VenueLayout
+
+DEFAULT_DB_PATH = os.environ.get("BADMINTON_DB", "badminton.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tournaments (
+    id          INTEGER PRIMARY KEY,
+    name        TEXT NOT NULL UNIQUE,
+    created_at  TEXT NOT NULL,
+    updated_at  TEXT NOT NULL,
+    settings    TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE IF NOT EXISTS teams (
+    tournament_id INTEGER NOT NULL REFERENCES tournaments(id) ON DELETE CASCADE,
+    pos           INTEGER NOT NULL,
+    name          TEXT NOT NULL,
+    level         TEXT NOT NULL,
+    PRIMARY KEY (tournament_id, pos)
+);
+CREATE INDEX IF NOT EXISTS teams_by_name ON teams(tournament_id, name);
+CREATE TABLE IF NOT EXISTS matches (
+    tournament_id INTEGER NOT NULL REFERENCES tournaments(id) ON DELETE CASCADE,
+    match_id      INTEGER NOT NULL,
+    type          TEXT NOT NULL,
+    level         TEXT NOT NULL,
+    team_a        TEXT NOT NULL,
+    team_b        TEXT NOT NULL,
+    description   TEXT NOT NULL,
+    extra         TEXT,
+    PRIMARY KEY (tournament_id, match_id)
+);
+CREATE INDEX IF NOT EXISTS matches_by_team_a ON matches(tournament_id, team_a);
+CREATE INDEX IF NOT EXISTS matches_by_team_b ON matches(tournament_id, team_b);
+CREATE TABLE IF NOT EXISTS schedules (
+    tournament_id   INTEGER PRIMARY KEY REFERENCES tournaments(id) ON DELETE CASCADE,
+    slots_count     INTEGER NOT NULL,
+    num_courts      INTEGER NOT NULL,
+    points_per_matchup INTEGER NOT NULL,
+    play_start      TEXT,
+    mins_per_point  INTEGER,
+    layout          TEXT
+);
+CREATE TABLE IF NOT EXISTS placements (
+    tournament_id INTEGER NOT NULL REFERENCES tournaments(id) ON DELETE CASCADE,
+    match_id      INTEGER NOT NULL,
+    start_slot    INTEGER NOT NULL,
+    court         INTEGER NOT NULL,
+    span          INTEGER NOT NULL,
+    match_no      INTEGER NOT NULL,
+    PRIMARY KEY (tournament_id, match_id)
+);
+CREATE INDEX IF NOT EXISTS placements_by_no ON placements(tournament_id, match_no);
+CREATE TABLE IF NOT EXISTS results (
+    tournament_id INTEGER NOT NULL REFERENCES tournaments(id) ON DELETE CASCADE,
+    team_a        TEXT NOT NULL,
+    team_b        TEXT NOT NULL,
+    score_a       INTEGER NOT NULL,
+    score_b       INTEGER NOT NULL,
+    updated_at    TEXT NOT NULL,
+    PRIMARY KEY (tournament_id, team_a, team_b)
+);
+CREATE TABLE IF NOT EXISTS knockout_results (
+    tournament_id INTEGER NOT NULL REFERENCES tournaments(id) ON DELETE CASCADE,
+    match_id      INTEGER NOT NULL,
+    team_a        TEXT NOT NULL,
+    team_b        TEXT NOT NULL,
+    score_a       INTEGER NOT NULL,
+    score_b       INTEGER NOT NULL,
+    updated_at    TEXT NOT NULL,
+    PRIMARY KEY (tournament_id, match_id)
+);
+CREATE TABLE IF NOT EXISTS history (
+    id            INTEGER PRIMARY KEY,
+    tournament_id INTEGER NOT NULL REFERENCES tournaments(id) ON DELETE CASCADE,
+    at            TEXT NOT NULL,
+    kind          TEXT NOT NULL,
+    detail        TEXT
+);
+CREATE INDEX IF NOT EXISTS history_by_tournament ON history(tournament_id, id);
+"""
+
+# 比賽 dict 裡有獨立欄位的鍵；其餘 (round / points ...) 以 JSON 存在 extra
+MATCH_COLUMNS = ("type", "level", "team_a", "team_b", "desc")
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+class TournamentStore:
+    """
+    本機 SQLite (WAL) 賽事資料庫：隊伍 / 比賽 / 排程位置 / 成績 / 異動紀錄，
+    可同時存放多個賽事。每次異動只寫變動的那幾列，並記一筆 history
+
+    Streamlit 的各 session 在不同 thread，所以共用一條連線並加鎖
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """舊版資料庫補上新欄位"""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(schedules)")}
+        if "layout" not in columns:
+            # 多場館的大表配置 (model.VenueLayout JSON)；單一場地為 NULL
+            self._conn.execute("ALTER TABLE schedules ADD COLUMN layout TEXT")
+
+    def _write(self, tournament_id, kind, detail, statements):
+        """在同一個 transaction 裡執行 [(sql, rows 或 params, many?)]，並更新 updated_at / history"""
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params, many in statements:
+                    if many:
+                        cur.executemany(sql, params)
+                    else:
+                        cur.execute(sql, params)
+                now = _now()
+                cur.execute("UPDATE tournaments SET updated_at = ? WHERE id = ?", (now, tournament_id))
+                cur.execute("INSERT INTO history (tournament_id, at, kind, detail) VALUES (?, ?, ?, ?)",
+                            (tournament_id, now, kind, detail))
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+
+    def _read(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # --- 賽事 ---
+    def list_tournaments(self):
+        """[(id, name, updated_at)]，最近更新的在前"""
+        return self._read("SELECT id, name, updated_at FROM tournaments ORDER BY updated_at DESC, id DESC")
+
+    def create_tournament(self, name):
+        now = _now()
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO tournaments (name, created_at, updated_at) VALUES (?, ?, ?)", (name, now, now)
+            )
+            return cur.lastrowid
+
+    def delete_tournament(self, tournament_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM tournaments WHERE id = ?", (tournament_id,))
+
+    def save_settings(self, tournament_id, settings):
+        self._write(tournament_id, "settings", None, [
+            ("UPDATE tournaments SET settings = ? WHERE id = ?",
+             (json.dumps(settings, ensure_ascii=False), tournament_id), False),
+        ])
+
+    def history(self, tournament_id, limit=50):
+        return self._read("SELECT at, kind, detail FROM history WHERE tournament_id = ? ORDER BY id DESC LIMIT ?",
+                          (tournament_id, limit))
+
+    # --- 隊伍 ---
+    def add_team(self, tournament_id, team):
+        self._write(tournament_id, "add_team", team['name'], [
+            ("INSERT INTO teams (tournament_id, pos, name, level) "
+             "SELECT ?, COALESCE(MAX(pos) + 1, 0), ?, ? FROM teams WHERE tournament_id = ?",
+             (tournament_id, team['name'], team['level'], tournament_id), False),
+        ])
+
+    def save_teams(self, tournament_id, teams):
+        """整份隊伍清單 (分組、清空、批次新增)；只改有變動的列"""
+        old = {pos: (name, level) for pos, name, level in self._read(
+            "SELECT pos, name, level FROM teams WHERE tournament_id = ?", (tournament_id,))}
+        changed = [(tournament_id, pos, t['name'], t['level']) for pos, t in enumerate(teams)
+                   if old.get(pos) != (t['name'], t['level'])]
+        self._write(tournament_id, "teams", f"{len(changed)} changed", [
+            ("DELETE FROM teams WHERE tournament_id = ? AND pos >= ?", (tournament_id, len(teams)), False),
+            ("INSERT OR REPLACE INTO teams (tournament_id, pos, name, level) VALUES (?, ?, ?, ?)", changed, True),
+        ])
+
+    # --- 比賽 ---
+    def save_matches(self, tournament_id, matches):
+        """整份比賽清單 (產生賽程、排序、填入名次)；只改有變動的列"""
+        old = {row[0]: row[1:] for row in self._read(
+            "SELECT match_id, type, level, team_a, team_b, description, extra FROM matches WHERE tournament_id = ?",
+            (tournament_id,))}
+        changed = []
+        for mid, m in enumerate(matches):
+            extra = {k: v for k, v in m.items() if k not in MATCH_COLUMNS}
+            row = tuple(m.get(c, "") for c in MATCH_COLUMNS) + (json.dumps(extra, ensure_ascii=False) if extra else None,)
+            if old.get(mid) != row:
+                changed.append((tournament_id, mid) + row)
+        self._write(tournament_id, "matches", f"{len(changed)} changed", [
+            ("DELETE FROM matches WHERE tournament_id = ? AND match_id >= ?", (tournament_id, len(matches)), False),
+            ("INSERT OR REPLACE INTO matches (tournament_id, match_id, type, level, team_a, team_b, description, extra) "
+             "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", changed, True),
+        ])
+
+    # --- 排程 ---
+    def save_schedule(self, tournament_id, plan, points_per_matchup):
+        """排程位置；match_id 對應 save_matches 時的比賽順序"""
+        placements = [(tournament_id, p.match_id, p.row, p.col, p.span, int(plan.match_no[p.match_id]))
+                      for p in plan.placements()]
+        play_start = plan.play_start.isoformat() if plan.play_start else None
+        layout = plan.layout.to_json() if plan.layout is not None else None
+        self._write(tournament_id, "schedule", f"{len(placements)} placed", [
+            ("INSERT OR REPLACE INTO schedules (tournament_id, slots_count, num_courts, points_per_matchup, play_start, "
+             "mins_per_point, layout) VALUES (?, ?, ?, ?, ?, ?, ?)",
+             (tournament_id, plan.slots_count, plan.num_courts, points_per_matchup, play_start, plan.mins_per_point,
+              layout), False),
+            ("DELETE FROM placements WHERE tournament_id = ?", (tournament_id,), False),
+            ("INSERT INTO placements VALUES (?, ?, ?, ?, ?, ?)", placements, True),
+        ])
+
+    def clear_schedule(self, tournament_id):
+        self._write(tournament_id, "schedule", "cleared", [
+            ("DELETE FROM schedules WHERE tournament_id = ?", (tournament_id,), False),
+            ("DELETE FROM placements WHERE tournament_id = ?", (tournament_id,), False),
+        ])
+
+    # --- 成績 ---
+    def record_result(self, tournament_id, team_a, team_b, score_a, score_b):
+        self._write(tournament_id, "result", f"{team_a} {score_a}:{score_b} {team_b}", [
+            ("DELETE FROM results WHERE tournament_id = ? AND team_a = ? AND team_b = ?",
+             (tournament_id, team_b, team_a), False),
+            ("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+             (tournament_id, team_a, team_b, score_a, score_b, _now()), False),
+        ])
+
+    def clear_result(self, tournament_id, team_a, team_b):
+        self._write(tournament_id, "clear_result", f"{team_a} vs {team_b}", [
+            ("DELETE FROM results WHERE tournament_id = ? AND ((team_a = ? AND team_b = ?) OR (team_a = ? AND team_b = ?))",
+             (tournament_id, team_a, team_b, team_b, team_a), False),
+        ])
+
+    def record_results(self, tournament_id, group_results, knockout_results, detail=None):
+        """
+        一批成績 (填分表匯入) 在同一個 transaction 寫入，只記一筆 history
+        group_results: [(team_a, team_b, score_a, score_b)]；knockout_results: [(match_id, team_a, team_b, score_a, score_b)]
+        (複賽 / 決賽同兩隊可能在初賽遇過，所以另存一張表，以比賽 id 為 key)
+        """
+        now = _now()
+        self._write(tournament_id, "import_results", detail or f"{len(group_results) + len(knockout_results)} results", [
+            ("DELETE FROM results WHERE tournament_id = ? AND team_a = ? AND team_b = ?",
+             [(tournament_id, b, a) for a, b, _, _ in group_results], True),
+            ("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+             [(tournament_id, a, b, sa, sb, now) for a, b, sa, sb in group_results], True),
+            ("INSERT OR REPLACE INTO knockout_results VALUES (?, ?, ?, ?, ?, ?, ?)",
+             [(tournament_id, mid, a, b, sa, sb, now) for mid, a, b, sa, sb in knockout_results], True),
+        ])
+
+    # --- 讀取 ---
+    def load(self, tournament_id):
+        """
+        回傳 {"teams", "matches", "results", "knockout_results", "settings", "plan"}；
+        knockout_results 為 {比賽 id: (team_a, team_b, score_a, score_b)}；plan 為 Schedule (沒有存過排程時為 None)
+        """
+        teams = [{"name": name, "level": level} for name, level in self._read(
+            "SELECT name, level FROM teams WHERE tournament_id = ? ORDER BY pos", (tournament_id,))]
+        matches = []
+        for row in self._read(
+                "SELECT type, level, team_a, team_b, description, extra FROM matches WHERE tournament_id = ? ORDER BY match_id",
+                (tournament_id,)):
+            m = dict(zip(MATCH_COLUMNS, row[:5]))
+            if row[5]:
+                m.update(json.loads(row[5]))
+            matches.append(m)
+        results = self._read("SELECT team_a, team_b, score_a, score_b FROM results WHERE tournament_id = ?",
+                             (tournament_id,))
+        knockout_results = {mid: tuple(row) for mid, *row in self._read(
+            "SELECT match_id, team_a, team_b, score_a, score_b FROM knockout_results WHERE tournament_id = ?",
+            (tournament_id,))}
+        settings = self._read("SELECT settings FROM tournaments WHERE id = ?", (tournament_id,))
+        settings = json.loads(settings[0][0]) if settings else {}
+
+        plan = None
+        meta = self._read("SELECT slots_count, num_courts, points_per_matchup, play_start, mins_per_point, layout "
+                          "FROM schedules WHERE tournament_id = ?", (tournament_id,))
+        if meta:
+            slots_count, num_courts, points_per_matchup, play_start, mins_per_point, layout = meta[0]
+            table = MatchTable.from_dicts(matches, points_per_matchup)
+            plan = Schedule(table, slots_count, num_courts,
+                            datetime.fromisoformat(play_start) if play_start else None, mins_per_point,
+                            VenueLayout.from_json(layout) if layout else None)
+            for mid, row, col, span, match_no in self._read(
+                    "SELECT match_id, start_slot, court, span, match_no FROM placements WHERE tournament_id = ?", (tournament_id,)):
+                if mid < len(table):
+                    plan.place(mid, row, col, span)
+                    plan.match_no[mid] = match_no
+        return {"teams": teams, "matches": matches, "results": results, "knockout_results": knockout_results,
+                "settings": settings, "plan": plan}
+
+    # --- JSON 相容 ---
+    def import_json(self, tournament_id, data):
+        """舊版設定檔 ({"teams", "matches"}) 匯入到指定賽事 (取代原本的隊伍與比賽)"""
+        self.save_teams(tournament_id, data.get("teams", []))
+        self.save_matches(tournament_id, data.get("matches", []))
+        self.clear_schedule(tournament_id)
+
+    def export_json(self, tournament_id):
+        data = self.load(tournament_id)
+        return json.dumps({"teams": data["teams"], "matches": data["matches"]}, ensure_ascii=False)
+
+
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_store(path=DEFAULT_DB_PATH):
+    """同一個資料庫檔在整個 process 只開一條連線"""
+    with _STORES_LOCK:
+        if path not in _STORES:
+            _STORES[path] = TournamentStore(path)
+        return _STORES[path]
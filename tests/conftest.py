@@ -0,0 +1,26 @@
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+# 專案是平放在根目錄的模組 (沒有打包)，測試直接 import
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from generation import assign_groups, generate_bracket, generate_round_robin, group_name, make_test_teams  # noqa: E402
+from model import MatchTable  # noqa: E402
+from scheduling import get_match_priority  # noqa: E402
+
+
+@pytest.fixture
+def tournament():
+    """產生測試賽事：tournament(隊數, 組數, 每組晉級隊數, ...) -> (teams, MatchTable)；per_group=0 時只有初賽"""
+    def build(n_teams, groups, per_group=2, include_loser=True, points_per_matchup=3, seed=0):
+        rng = random.Random(seed)
+        teams = assign_groups(make_test_teams(n_teams, rng), groups, rng)
+        matches = generate_round_robin(teams)
+        if per_group:
+            matches += generate_bracket([group_name(i) for i in range(groups)], per_group, include_loser)
+        matches.sort(key=get_match_priority)
+        return teams, MatchTable.from_dicts(matches, points_per_matchup)
+    return build
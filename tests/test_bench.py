@@ -0,0 +1,59 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+import bench
+from lazy import lazy_import
+
+APP = str(Path(__file__).resolve().parent.parent / "app.py")
+
+
+def test_lazy_module_imports_on_first_use(tmp_path, monkeypatch):
+    (tmp_path / "heavy_mod.py").write_text("VALUE = 42\n", encoding="utf-8")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "heavy_mod", raising=False)
+    heavy = lazy_import("heavy_mod")
+    assert "heavy_mod" not in sys.modules and "not loaded" in repr(heavy)
+    assert heavy.VALUE == 42
+    assert "heavy_mod" in sys.modules and "(loaded)" in repr(heavy)
+
+
+def test_lazy_module_missing_attribute(tmp_path, monkeypatch):
+    (tmp_path / "small_mod.py").write_text("", encoding="utf-8")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    with pytest.raises(AttributeError):
+        lazy_import("small_mod").nothing
+
+
+def test_home_page_cold_start(tmp_path, monkeypatch):
+    # 新的 process 跑首頁：不出錯、不載入大套件
+    monkeypatch.setenv("BADMINTON_DB", str(tmp_path / "cold.db"))
+    r = bench.measure_cold_start(APP, repeat=1)
+    assert r["exceptions"] == [] and r["loaded"] == []
+    assert r["seconds"] > 0
+
+
+def test_cold_start_sees_eager_imports_and_errors(tmp_path):
+    app = tmp_path / "eager.py"
+    app.write_text("import pandas\nraise RuntimeError('壞掉')\n", encoding="utf-8")
+    r = bench.measure_cold_start(str(app), repeat=1)
+    assert "pandas" in r["loaded"]
+    assert len(r["exceptions"]) == 1 and "壞掉" in r["exceptions"][0]
+
+
+@pytest.mark.parametrize("result, budget, code, message", [
+    ({"seconds": 0.5, "exceptions": [], "loaded": []}, 1.5, 0, None),
+    ({"seconds": 2.0, "exceptions": [], "loaded": []}, 1.5, 1, "超過冷啟動預算"),
+    ({"seconds": 0.5, "exceptions": [], "loaded": ["pandas", "pyarrow"]}, 1.5, 1, "首頁就載入了 pandas, pyarrow"),
+    ({"seconds": 0.5, "exceptions": ["boom"], "loaded": []}, 1.5, 1, "app 執行錯誤"),
+])
+def test_check_cold_start(monkeypatch, capsys, result, budget, code, message):
+    monkeypatch.setattr(bench, "measure_cold_start", lambda app_path: result)
+    assert bench.check_cold_start(budget) == code
+    out = capsys.readouterr().out
+    assert out.startswith(f"冷啟動 {result['seconds']*1000:.0f}ms")
+    if message is None:
+        assert "⚠️" not in out
+    else:
+        assert message in out
@@ -0,0 +1,143 @@
+import random
+
+import numpy as np
+import pytest
+
+from budget import (CostRates, _knockout_lower_bound, best_group_plan, cheapest_candidates, estimate_cost,
+                    finish_lower_bound, plan_capacity, plan_groups, verify_candidates)
+from generation import assign_groups, generate_bracket, generate_round_robin, group_name, make_test_teams
+from model import MatchTable, Stage
+from scheduling import get_match_priority, schedule_lower_bound, schedule_matches
+
+RATES = CostRates(court_price_per_hr=250, shuttles_per_point=1, shuttle_tube_price=600, medal_price=50,
+                  food_price=100, staff_count=2, staff_fee=1000)
+
+
+def match_dicts(table):
+    return [table.to_dict(mid) for mid in range(len(table))]
+
+
+def test_finish_lower_bound_matches_scalar_bound(tournament):
+    _, table = tournament(20, 4, 2, seed=1)
+    matches = match_dicts(table)
+    matches[0]["points"] = 9   # 指定點數的比賽不隨每場點數變動
+    courts = np.array([1, 3, 8])[:, None]
+    points = np.array([1, 3, 5, 7])[None, :]
+    bounds = finish_lower_bound(matches, courts, points)
+    assert bounds.shape == (3, 4)
+    for i, c in enumerate((1, 3, 8)):
+        for j, ppm in enumerate((1, 3, 5, 7)):
+            scalar_table = MatchTable.from_dicts(matches, ppm)
+            assert bounds[i, j] == schedule_lower_bound(scalar_table, c)
+            # 下限不會超過真正排出來的結束格
+            placements, missing = schedule_matches(scalar_table, c, 10000)
+            assert not missing and bounds[i, j] <= max(p.row + p.span for p in placements)
+
+
+def test_finish_lower_bound_empty():
+    assert finish_lower_bound([], 4, 3) == 0
+
+
+def test_plan_capacity_grid(tournament):
+    _, table = tournament(16, 2, 2, seed=2)
+    matches = match_dicts(table)
+    df = plan_capacity(matches, RATES, 9 * 60, 32, [4, 6, 8], [10, 15], [3, 5], [0, 30])
+    assert len(df) == 3 * 2 * 2 * 2
+    assert list(df["total_cost"]) == sorted(df["total_cost"])
+    assert (df["feasible"] == (df["lb_slots"] <= df["slots_count"])).all()
+    assert (df["slots_count"] == (9 * 60 - 2 * df["setup_teardown_min"]) // df["mins_per_point"]).all()
+    # 每一列與單獨算一次的結果相同
+    for row in df.itertuples(index=False):
+        assert row.lb_slots == finish_lower_bound(matches, row.num_courts, row.points_per_matchup)
+        cost = estimate_cost(RATES, row.num_courts, 9, len(matches), row.points_per_matchup, 32)
+        assert row.total_cost == pytest.approx(float(cost["total"]))
+
+
+def test_cheapest_candidates_and_verify(tournament):
+    _, table = tournament(16, 2, 2, seed=3)
+    matches = match_dicts(table)
+    df = plan_capacity(matches, RATES, 9 * 60, 32, [2, 4, 6, 8, 10], [10, 15], [3, 5], [0, 30, 60])
+    best = cheapest_candidates(df, 3)
+    assert len(best) <= 3 and best["feasible"].all()
+    assert not best.duplicated(["num_courts", "mins_per_point", "points_per_matchup"]).any()
+    # 同樣的組合只留佈置時間最長 (而且仍可行) 的那個
+    for row in best.itertuples(index=False):
+        same = df[(df["num_courts"] == row.num_courts) & (df["mins_per_point"] == row.mins_per_point)
+                  & (df["points_per_matchup"] == row.points_per_matchup) & df["feasible"]]
+        assert row.setup_teardown_min == same["setup_teardown_min"].max()
+    verified = verify_candidates(matches, best)
+    # 下限只是必要條件：全部排得進去時，結束格不會早於下限
+    complete = verified[verified["unscheduled"] == 0]
+    assert len(complete)
+    assert (complete["finish_slots"] >= complete["lb_slots"]).all()
+    assert (verified["finish_slots"] <= verified["slots_count"]).all()
+    assert (verified["finish_minutes"] == verified["finish_slots"] * verified["mins_per_point"]).all()
+
+
+def grouped_tournament(n_teams, groups, per_group, include_loser, points_per_matchup):
+    teams = assign_groups(make_test_teams(n_teams, random.Random(n_teams)), groups, random.Random(groups))
+    matches = generate_round_robin(teams)
+    if per_group:
+        matches += generate_bracket([group_name(i) for i in range(groups)], per_group, include_loser)
+    matches.sort(key=get_match_priority)
+    return teams, MatchTable.from_dicts(matches, points_per_matchup)
+
+
+@pytest.mark.parametrize("n_teams, courts, ppm, per_group, include_loser", [
+    (16, 4, 3, 2, True),
+    (24, 6, 2, 1, True),
+    (30, 5, 3, 2, False),
+    (13, 3, 4, 0, True),
+])
+def test_plan_groups_bound_against_real_schedule(n_teams, courts, ppm, per_group, include_loser):
+    df = plan_groups(n_teams, courts, 1000, ppm, per_group, include_loser)
+    assert len(df)
+    for row in df.itertuples(index=False):
+        teams, table = grouped_tournament(n_teams, int(row.groups), per_group, include_loser, ppm)
+        stages = [table.stage[mid] for mid in range(len(table))]
+        # 公式算的場數與真正產生的比賽相同
+        assert row.group_matches == stages.count(Stage.GROUP)
+        assert row.knockout_matches == len(stages) - stages.count(Stage.GROUP)
+        sizes = sorted({sum(t["level"] == group_name(g) for t in teams) for g in range(int(row.groups))})
+        assert row.matches_per_team == sizes[0] - 1
+        # 結束格下限不超過真正排出來的結束格
+        placements, missing = schedule_matches(table, courts, 1000)
+        assert not missing
+        assert row.lb_slots <= max(p.row + p.span for p in placements)
+
+
+def test_plan_groups_order_and_validity():
+    df = plan_groups(32, 4, 60, 3, per_group=2)
+    # 晉級總數是 2 的次方、每組至少要有晉級 + 敗部的人數
+    assert set(df["groups"]) == {1, 2, 4, 8}
+    assert (df["feasible"] == (df["lb_slots"] <= 60)).all()
+    keys = list(zip(~df["feasible"], -df["matches_per_team"], -df["group_matches"], df["lb_slots"]))
+    assert keys == sorted(keys)
+    assert df["sizes"].tolist()[df["groups"].tolist().index(4)] == "8人×4"
+    assert "4人×1 + 3人×1" in plan_groups(7, 2, 100, 3)["sizes"].tolist()
+
+
+def test_knockout_lower_bound():
+    matches, slots = _knockout_lower_bound([0, 2, 4, 8], True, 3)
+    # 2 隊：勝部 + 敗部決賽；4 隊：兩個半區各 2 場 + 兩場決賽 + 季殿軍賽；8 隊再多一輪
+    assert matches.tolist() == [0, 2, 7, 15]
+    # 冠軍一輪一輪打上去：1 / 2 / 3 輪
+    assert slots.tolist() == [0, 3, 6, 9]
+    matches, _ = _knockout_lower_bound([8], False, 3)
+    assert matches.tolist() == [8]
+
+
+def test_best_group_plan(tournament):
+    teams = make_test_teams(24, random.Random(0))
+    candidates = plan_groups(24, 4, 60, 3, 2, True)
+    row, grouped = best_group_plan(teams, 4, 60, 3, 2, True, rng=random.Random(1))
+    assert row is not None and row.feasible
+    assert len(grouped) == 24 and all(t["level"] == "未分組" for t in teams)   # 原本的 teams 不動
+    # 選出的分法真的排得下
+    matches = generate_round_robin(grouped) + generate_bracket([group_name(i) for i in range(row.groups)], 2)
+    matches.sort(key=get_match_priority)
+    assert schedule_matches(MatchTable.from_dicts(matches, 3), 4, 60)[1] == []
+    # 傳入已算好的候選表，結果相同
+    again = best_group_plan(teams, 4, 60, 3, 2, True, rng=random.Random(1), candidates=candidates)
+    assert tuple(again[0]) == tuple(row) and again[1] == grouped
+    assert best_group_plan(teams, 1, 5, 3, 2, True) == (None, None)
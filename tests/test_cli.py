@@ -0,0 +1,43 @@
+import json
+import os
+
+from cli import EXIT_ERROR, EXIT_OK, EXIT_UNSCHEDULED, event_names, main
+
+
+def test_event_names():
+    assert event_names(["a/ev.json", "b/x.npz"]) == ["ev", "x"]
+    # 同名的依輸入順序編號，編號也不會撞到其他檔名
+    assert event_names(["a/ev.json", "b/ev.json", "ev.npz", "x.json", "ev-1.json"]) == \
+        ["ev-2", "ev-3", "ev-4", "x", "ev-1"]
+
+
+def write_event(path, n_teams, **settings):
+    teams = [{"name": f"隊{i:02d}", "level": "未分組"} for i in range(n_teams)]
+    settings = dict({"groups": 2, "num_courts": 4, "seed": 1, "date": "2026-10-17"}, **settings)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"teams": teams, "settings": settings}, f, ensure_ascii=False)
+    return str(path)
+
+
+def test_same_stem_outputs_do_not_overwrite(tmp_path, capsys):
+    first = write_event(tmp_path / "a" / "ev.json", 8)
+    second = write_event(tmp_path / "b" / "ev.json", 6)
+    out = tmp_path / "out"
+    assert main([first, second, "--out", str(out), "--workers", "1"]) == EXIT_OK
+    assert sorted(os.listdir(out)) == ["ev-1", "ev-2"]
+    for name, n_teams in (("ev-1", 8), ("ev-2", 6)):
+        with open(out / name / "matches.csv", encoding="utf-8-sig") as f:
+            # 兩組循環賽：8 隊 = 4 + 4 人 (12 場)，6 隊 = 3 + 3 人 (6 場)
+            assert len(f.read().splitlines()) - 1 == {8: 12, 6: 6}[n_teams]
+    assert "輸出到" in capsys.readouterr().out
+
+
+def test_exit_code_ignores_file_order(tmp_path):
+    tight = write_event(tmp_path / "tight.json", 12, num_courts=1, start="09:00", end="10:00", setup_teardown_min=0)
+    bad = tmp_path / "bad.json"
+    bad.write_text("{not json", encoding="utf-8")
+    out = str(tmp_path / "out")
+    assert main([tight, "--out", out, "--workers", "1"]) == EXIT_UNSCHEDULED
+    assert main([tight, str(bad), "--out", out, "--workers", "1"]) == EXIT_ERROR
+    assert main([str(bad), tight, "--out", out, "--workers", "1"]) == EXIT_ERROR
@@ -0,0 +1,154 @@
+import io
+import json
+
+import numpy as np
+import pytest
+
+from config import ConfigError, dump_config, load_config
+
+TEAMS = [{"name": "快樂小隊-01", "level": "A組"}, {"name": "光速戰隊-02", "level": "A組"},
+         {"name": "佛系聯隊-03", "level": "B組"}, {"name": "", "level": "未分組"}]
+MATCHES = [
+    {"type": "初賽", "level": "A組", "team_a": "快樂小隊-01", "team_b": "光速戰隊-02", "desc": "A組 循環賽", "round": 1},
+    {"type": "複賽-勝部", "level": "決賽區", "team_a": "A組 冠軍", "team_b": "B組 冠軍", "desc": "4強賽 A1vsB1",
+     "points": 7},
+    {"type": "決賽-勝部", "level": "決賽區", "team_a": "4強賽 勝方1", "team_b": "4強賽 勝方2", "desc": "🏆 總冠軍賽",
+     "note": "轉播場", "referee": ["王", "李"]},
+]
+
+
+def arrays_of(data):
+    with np.load(io.BytesIO(data), allow_pickle=False) as npz:
+        return {k: npz[k] for k in npz.files}
+
+
+def rebuild(arrays, meta=None):
+    """改過欄位 / meta 之後重新打包成設定檔 bytes"""
+    arrays = dict(arrays)
+    if meta is not None:
+        arrays["meta"] = np.frombuffer(json.dumps(meta, ensure_ascii=False).encode("utf-8"), dtype=np.uint8)
+    buf = io.BytesIO()
+    np.savez_compressed(buf, **arrays)
+    return buf.getvalue()
+
+
+def test_npz_round_trip():
+    data = dump_config(TEAMS, MATCHES)
+    assert data.startswith(b"PK")
+    assert load_config(data) == (TEAMS, MATCHES)
+
+
+def test_empty_round_trip():
+    assert load_config(dump_config([], [])) == ([], [])
+
+
+def test_legacy_json_round_trip():
+    data = json.dumps({"teams": TEAMS, "matches": MATCHES}, ensure_ascii=False).encode("utf-8")
+    assert load_config(data) == (TEAMS, MATCHES)
+    assert load_config(b"{}") == ([], [])
+
+
+@pytest.mark.parametrize("data", [b"{not json", b"PK\x03\x04 broken zip", b"", b"\xff\xfe"])
+def test_unreadable(data):
+    with pytest.raises(ConfigError, match="無法解析設定檔"):
+        load_config(data)
+
+
+@pytest.mark.parametrize("data, message", [
+    (b"[1, 2]", "不是賽事設定檔"),
+    (b'"teams"', "不是賽事設定檔"),
+    (b"null", "不是賽事設定檔"),
+    (b'{"teams": 3}', "teams / matches 必須是清單"),
+    (b'{"teams": [], "matches": {"a": 1}}', "teams / matches 必須是清單"),
+])
+def test_bad_legacy_json(data, message):
+    with pytest.raises(ConfigError, match=message):
+        load_config(data)
+
+
+@pytest.mark.parametrize("change, message", [
+    ({"format": "something-else"}, "不是賽事設定檔"),
+    ({"extra": {"99": {"note": "x"}}}, "extra 欄位錯誤"),
+    ({"extra": {"-1": {"note": "x"}}}, "extra 欄位錯誤"),
+    ({"extra": {"first": {"note": "x"}}}, "extra 欄位錯誤"),
+    ({"extra": {"0": 5}}, "extra 欄位錯誤"),
+    ({"extra": [1]}, "extra 欄位錯誤"),
+    ({"version": 99}, "不支援的設定檔版本 99"),
+    ({"teams": 5}, "team 欄位長度不一致"),
+    ({"matches": 2}, "match 欄位長度不一致"),
+])
+def test_bad_meta(change, message):
+    data = dump_config(TEAMS, MATCHES)
+    meta = json.loads(arrays_of(data)["meta"].tobytes().decode("utf-8"))
+    with pytest.raises(ConfigError, match=message):
+        load_config(rebuild(arrays_of(data), dict(meta, **change)))
+
+
+def corrupt_strings(arrays):
+    arrays["string_ends"] = arrays["string_ends"].copy()
+    arrays["string_ends"][-1] += 3
+
+
+def corrupt_team_id(arrays):
+    arrays["team_name"] = arrays["team_name"].copy()
+    arrays["team_name"][0] = len(arrays["string_ends"])
+
+
+def corrupt_match_id(arrays):
+    arrays["match_team_b"] = arrays["match_team_b"].copy()
+    arrays["match_team_b"][1] = -1
+
+
+def corrupt_points(arrays):
+    arrays["match_points"] = arrays["match_points"].copy()
+    arrays["match_points"][0] = -5
+
+
+def invalid_utf8(arrays):
+    # 長度不變，只是位元組不是合法的 utf-8
+    arrays["strings"] = arrays["strings"].copy()
+    arrays["strings"][:2] = 0xFF
+
+
+def float_ids(arrays):
+    arrays["match_team_a"] = arrays["match_team_a"].astype(np.float64)
+
+
+def text_ends(arrays):
+    arrays["string_ends"] = arrays["string_ends"].astype("U3")
+
+
+def short_round(arrays):
+    arrays["match_round"] = arrays["match_round"][:-1]
+
+
+def drop_desc(arrays):
+    del arrays["match_desc"]
+
+
+@pytest.mark.parametrize("corrupt, message", [
+    (corrupt_strings, "字串表損毀"),
+    (invalid_utf8, "字串表損毀"),
+    (float_ids, "match_team_a 欄位錯誤"),
+    (text_ends, "string_ends 欄位錯誤"),
+    (corrupt_team_id, "team 欄位有不存在的字串 id"),
+    (corrupt_match_id, "match 欄位有不存在的字串 id"),
+    (corrupt_points, "match_points 欄位錯誤"),
+    (short_round, "match_round 欄位錯誤"),
+    (drop_desc, "設定檔缺少欄位 'match_desc'"),
+])
+def test_bad_columns(corrupt, message):
+    arrays = arrays_of(dump_config(TEAMS, MATCHES))
+    corrupt(arrays)
+    with pytest.raises(ConfigError, match=message):
+        load_config(rebuild(arrays))
+
+
+def test_meta_not_an_object():
+    with pytest.raises(ConfigError, match="不是賽事設定檔"):
+        load_config(rebuild(arrays_of(dump_config(TEAMS, MATCHES)), [1, 2]))
+
+
+def test_config_error_is_value_error():
+    with pytest.raises(ValueError):
+        load_config(b"PK")
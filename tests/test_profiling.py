@@ -0,0 +1,105 @@
+import json
+import threading
+
+import pytest
+
+from profiling import Trace, activate, count, current_trace, span, span_in
+
+
+@pytest.fixture(autouse=True)
+def no_active_trace():
+    activate(None)
+    yield
+    activate(None)
+
+
+def test_inactive_is_a_no_op():
+    with span("x"):
+        count("hits")
+    assert current_trace() is None
+    # 還沒開始任何 rerun 時也不記錄
+    trace = Trace()
+    trace.add_span("x", 0, 1)
+    trace.count("hits")
+    assert list(trace.reruns) == []
+
+
+def test_spans_and_counters():
+    trace = Trace()
+    activate(trace)
+    trace.begin_rerun("#1")
+    with span("outer", rows=3):
+        with span("inner"):
+            count("cache_hit")
+        count("cache_hit", 2)
+    with pytest.raises(ValueError):
+        with span("failed"):
+            raise ValueError
+    rerun = trace.reruns[-1]
+    assert rerun["counters"] == {"cache_hit": 3}
+    rows = trace.span_rows(rerun)
+    # 依開始時間排序；出錯的區段也有記到
+    assert [r["span"] for r in rows] == ["outer", "inner", "failed"]
+    assert rows[0]["rows"] == 3 and rows[0]["ms"] >= rows[1]["ms"] >= 0
+    assert rows[0]["start_ms"] >= 0
+
+
+def test_summary_sums_repeated_spans():
+    trace = Trace()
+    rerun = trace.begin_rerun("#1")
+    base = rerun["started_ns"]
+    trace.add_span("draw", base, base + 2_000_000)
+    trace.add_span("draw", base + 5_000_000, base + 6_000_000)
+    trace.add_span("total", base, base + 10_000_000)
+    [row] = trace.summary_rows()
+    assert (row["rerun"], row["draw"], row["total"]) == ("#1", 3.0, 10.0)
+
+
+def test_keeps_only_recent_reruns():
+    trace = Trace(max_reruns=3)
+    for i in range(5):
+        trace.begin_rerun(f"#{i}")
+    assert [r["label"] for r in trace.reruns] == ["#2", "#3", "#4"]
+
+
+def test_chrome_trace():
+    trace = Trace()
+    for i in range(2):
+        rerun = trace.begin_rerun(f"#{i}")
+        base = rerun["started_ns"]
+        trace.add_span("schedule", base + 1_000, base + 4_000, {"matches": 10})
+        if i:
+            trace.count("cache_miss")
+    events = json.loads(trace.chrome_trace())["traceEvents"]
+    spans = [e for e in events if e["ph"] == "X"]
+    assert [e["args"] for e in spans] == [{"matches": 10, "rerun": 0}, {"matches": 10, "rerun": 1}]
+    # 時間單位是微秒
+    assert all(e["dur"] == pytest.approx(3.0) for e in spans)
+    [counters] = [e for e in events if e["ph"] == "C"]
+    assert counters["args"] == {"cache_miss": 1}
+    assert counters["ts"] == pytest.approx(spans[1]["ts"] + spans[1]["dur"])
+
+
+def test_trace_is_per_thread():
+    trace = Trace()
+    activate(trace)
+    trace.begin_rerun("#1")
+    seen = []
+
+    def other():
+        seen.append(current_trace())
+        with span("elsewhere"):
+            pass
+        # 不在 rerun thread 上的程式要明確指定 Trace
+        with span_in(trace, "download"):
+            pass
+        with span_in(None, "ignored"):
+            pass
+
+    worker = threading.Thread(target=other)
+    worker.start()
+    worker.join()
+    assert seen == [None]
+    assert [name for name, *_ in trace.reruns[-1]["spans"]] == ["download"]
+    assert trace.reruns[-1]["spans"][0][3] == worker.ident
+    assert current_trace() is trace
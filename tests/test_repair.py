@@ -0,0 +1,67 @@
+import random
+from datetime import datetime
+
+import pytest
+
+from model import Schedule
+from scheduling import repair_schedule, schedule_matches
+from validation import validate_schedule
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_repair_properties(tournament, seed):
+    rng = random.Random(seed)
+    courts = rng.randint(3, 8)
+    teams, table = tournament(rng.choice([12, 16, 24, 32]), rng.choice([2, 4]), 2, seed=seed)
+    placements, missing = schedule_matches(table, courts, 1000)
+    assert not missing
+    # 留足夠的時間，關掉場地後仍排得下
+    slots = max(p.row + p.span for p in placements) * 3
+    plan = Schedule.from_placements(table, placements, slots, courts, datetime(2026, 10, 17, 9), 10)
+
+    cutoff = rng.randrange(plan.end_slot())
+    closed = set(rng.sample(range(courts), rng.randint(1, courts // 2)))
+    running = [mid for mid in plan.scheduled_ids().tolist()
+               if plan.start[mid] < cutoff < plan.start[mid] + plan.span[mid]]
+    extend = {int(plan.match_no[running[0]]): 2} if running else {}
+    late = rng.choice(teams)["name"]
+    delays = {late: cutoff + rng.randint(1, 20)}
+
+    repaired, moved, unscheduled = repair_schedule(plan, cutoff, closed_courts=closed, extend=extend, delays=delays)
+
+    assert validate_schedule(repaired, teams=teams) == []
+    assert not unscheduled
+    for mid in plan.scheduled_ids().tolist():
+        old_start, new_start = int(plan.start[mid]), int(repaired.start[mid])
+        # 比賽編號沿用原排程
+        assert repaired.match_no[mid] == plan.match_no[mid]
+        if old_start < cutoff:
+            # 已開打的比賽固定不動
+            assert (new_start, repaired.court[mid]) == (old_start, plan.court[mid])
+        elif mid in moved:
+            # 搬動的比賽不早於原本公布的時間
+            assert new_start >= old_start
+        else:
+            assert (new_start, repaired.court[mid]) == (old_start, plan.court[mid])
+    # 關閉的場地在 cutoff 之後只剩進行中的比賽
+    for col in closed:
+        for mid in set(repaired.grid[cutoff:, col].tolist()) - {-1}:
+            assert repaired.start[mid] < cutoff
+    # 遲到的隊伍不會在報到前上場
+    tid = table.string_id(late)
+    for mid in repaired.scheduled_ids().tolist():
+        if repaired.start[mid] >= cutoff and tid in (table.team_a[mid], table.team_b[mid]):
+            assert repaired.start[mid] >= delays[late]
+    for match_no, extra in extend.items():
+        mid = plan.id_by_match_no(match_no)
+        assert repaired.span[mid] == plan.span[mid] + extra
+
+
+def test_repair_without_changes_keeps_schedule(tournament):
+    _, table = tournament(16, 2, 2, seed=1)
+    placements, _ = schedule_matches(table, 4, 1000)
+    plan = Schedule.from_placements(table, placements, 300, 4)
+    repaired, moved, unscheduled = repair_schedule(plan, 10)
+    assert moved == [] and unscheduled == []
+    assert (repaired.grid == plan.grid).all()
+    assert (repaired.match_no == plan.match_no).all()
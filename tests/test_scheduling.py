@@ -0,0 +1,199 @@
+import random
+import time
+
+import pytest
+
+from model import MatchTable, Schedule, Stage
+from scheduling import (critical_path_order, multi_start_schedule, optimize_schedule, schedule_lower_bound,
+                        schedule_matches, schedule_score, shuffled_order)
+from validation import validate_schedule
+
+
+def scan_schedule(table, num_courts, slots_count, order):
+    """
+    對照用的逐格掃描：每一格、每個空場地依 order 挑第一場「前置都打完、兩隊都有空、時間放得下」的比賽
+    (與 schedule_matches 規則相同，只是不跳時間點、每次重掃整個佇列)
+    """
+    links = table.links()
+    span = table.span
+    groups = {}
+    for mid in range(len(table)):
+        if table.stage[mid] == Stage.GROUP:
+            groups.setdefault(table.level[mid], []).append(mid)
+    end = {}
+    team_free = {}
+    court_free = [0] * num_courts
+    placements = []
+    queue = list(order)
+
+    def ready(mid, row):
+        link = links[mid]
+        if any(f.source is not None and end.get(f.source, slots_count + 1) > row for f in link.feeds):
+            return False
+        if any(end.get(m, slots_count + 1) > row for lvl in link.gates for m in groups.get(lvl, ())):
+            return False
+        return all(team_free.get(t, 0) <= row for t in (table.team_a[mid], table.team_b[mid]))
+
+    for row in range(slots_count):
+        for col in range(num_courts):
+            if court_free[col] > row:
+                continue
+            mid = next((m for m in queue if row + span[m] <= slots_count and ready(m, row)), None)
+            if mid is None:
+                break
+            queue.remove(mid)
+            end[mid] = court_free[col] = row + span[mid]
+            team_free[table.team_a[mid]] = team_free[table.team_b[mid]] = end[mid]
+            placements.append((mid, row, col, span[mid]))
+    return placements, queue
+
+
+@pytest.mark.parametrize("n_teams, groups, per_group, courts, slots, ppm", [
+    (8, 2, 2, 2, 200, 3),
+    (16, 2, 2, 4, 200, 3),
+    (24, 4, 2, 6, 40, 2),      # 排不完
+    (30, 4, 1, 3, 300, 5),
+    (11, 3, 0, 5, 100, 1),
+])
+def test_matches_scan_reference(tournament, n_teams, groups, per_group, courts, slots, ppm):
+    _, table = tournament(n_teams, groups, per_group, points_per_matchup=ppm, seed=n_teams)
+    for order in (critical_path_order(table), shuffled_order(table, random.Random(1)), list(range(len(table)))):
+        placements, missing = schedule_matches(table, courts, slots, order=order)
+        expected, expected_missing = scan_schedule(table, courts, slots, order)
+        assert sorted(tuple(p) for p in placements) == sorted(expected)
+        assert missing == expected_missing
+
+
+def test_knockouts_wait_for_feeders(tournament):
+    _, table = tournament(32, 4, 2, points_per_matchup=3, seed=7)
+    placements, missing = schedule_matches(table, 8, 1000)
+    assert missing == []
+    start = {p.match_id: p.row for p in placements}
+    end = {p.match_id: p.row + p.span for p in placements}
+    group_end = {}
+    for mid in range(len(table)):
+        if table.stage[mid] == Stage.GROUP:
+            name = table.name(table.level[mid])
+            group_end[name] = max(group_end.get(name, 0), end[mid])
+
+    checked = 0
+    for mid, link in enumerate(table.links()):
+        teams = (table.name(table.team_a[mid]), table.name(table.team_b[mid]))
+        for team in teams:
+            # "A組 冠軍"：A 組初賽全部打完才能上場
+            group = team.split(" ")[0]
+            if group in group_end:
+                assert group_end[group] <= start[mid], (teams, group)
+                checked += 1
+        # "8強賽 勝方1" / "4強賽 敗方2"：來源比賽打完才能上場
+        for feed in link.feeds:
+            assert feed.source is not None, feed.text
+            assert end[feed.source] <= start[mid], feed.text
+            checked += 1
+    assert checked
+
+
+def test_missing_when_slots_run_out(tournament):
+    _, table = tournament(16, 2, 2, points_per_matchup=3, seed=3)
+    order = critical_path_order(table)
+    placements, missing = schedule_matches(table, 2, 30, order=order)
+    placed = {p.match_id for p in placements}
+    assert missing
+    # 沒排到的比賽依 order 的順序列出，與排入的剛好互補
+    assert missing == [mid for mid in order if mid not in placed]
+    assert all(p.row + p.span <= 30 for p in placements)
+    # 兩組的初賽都沒排完，依賴它們的複賽 / 決賽一場都不會排入
+    assert any(table.stage[mid] == Stage.GROUP for mid in missing)
+    assert all(table.stage[mid] == Stage.GROUP for mid in placed)
+
+
+def test_nothing_fits():
+    table = MatchTable.from_dicts([{"type": "初賽", "level": "A組", "team_a": "甲", "team_b": "乙", "desc": ""}], 5)
+    placements, missing = schedule_matches(table, 4, 3)
+    assert placements == [] and missing == [0]
+
+
+def is_valid(table, placements, num_courts, slots_count):
+    plan = Schedule.from_placements(table, placements, slots_count, num_courts)
+    return validate_schedule(plan) == []
+
+
+def test_schedule_lower_bound():
+    matches = [{"type": "初賽", "level": "A組", "team_a": a, "team_b": b, "desc": ""}
+               for a, b in [("甲", "乙"), ("甲", "丙"), ("甲", "丁"), ("乙", "丙")]]
+    table = MatchTable.from_dicts(matches, 3)
+    # 甲 一隊就要打 3 場 = 9 格；總共 12 格分到 4 面場地只要 3 格
+    assert schedule_lower_bound(table, 4) == 9
+    # 1 面場地：12 格都排在同一面
+    assert schedule_lower_bound(table, 1) == 12
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_optimize_never_worse_than_greedy(tournament, seed):
+    _, table = tournament(20, 4, 2, seed=seed)
+    greedy = schedule_matches(table, 5, 60)
+    placements, missing = optimize_schedule(table, 5, 60, 0.3, seed=seed)
+    assert schedule_score(placements, missing) <= schedule_score(*greedy)
+    assert is_valid(table, placements, 5, 60)
+    # 每場不是排入就是列為排不進去
+    assert len(placements) + len(missing) == len(table)
+
+
+def test_optimize_respects_time_budget(tournament):
+    _, table = tournament(40, 4, 2, seed=1)
+    start = time.perf_counter()
+    optimize_schedule(table, 6, 400, 0.3, seed=1)
+    # 預算用完後最多再多排一次
+    assert time.perf_counter() - start < 1.5
+
+
+def test_optimize_stops_at_lower_bound():
+    # 兩場互不相干的比賽、兩面場地：貪婪法就已達下限，不必用完預算
+    matches = [{"type": "初賽", "level": "A組", "team_a": "甲", "team_b": "乙", "desc": ""},
+               {"type": "初賽", "level": "A組", "team_a": "丙", "team_b": "丁", "desc": ""},
+               {"type": "初賽", "level": "A組", "team_a": "甲", "team_b": "丙", "desc": ""}]
+    table = MatchTable.from_dicts(matches, 2)
+    start = time.perf_counter()
+    placements, missing = optimize_schedule(table, 2, 20, 30, seed=0)
+    assert time.perf_counter() - start < 5
+    assert missing == [] and max(p.row + p.span for p in placements) == schedule_lower_bound(table, 2)
+
+
+def test_optimize_from_given_order(tournament):
+    _, table = tournament(16, 2, 2, seed=4)
+    order = shuffled_order(table, random.Random(9))
+    start = schedule_matches(table, 3, 200, order)
+    placements, missing = optimize_schedule(table, 3, 200, 0.2, seed=0, order=order)
+    assert schedule_score(placements, missing) <= schedule_score(*start)
+    assert is_valid(table, placements, 3, 200)
+
+
+def test_multi_start_is_reproducible(tournament):
+    _, table = tournament(24, 4, 2, seed=2)
+    runs = [multi_start_schedule(table, 4, 80, 12, seed=7, workers=w) for w in (1, 1, 3)]
+    # 同一個 seed：不論 worker 數都選出同一次嘗試、同一份排程
+    first = runs[0]
+    for placements, missing, order, attempt in runs[1:]:
+        assert (sorted(placements), missing, order, attempt) == (sorted(first[0]), first[1], first[2], first[3])
+
+
+def test_multi_start_never_worse_than_greedy(tournament):
+    _, table = tournament(24, 4, 2, seed=3)
+    greedy = schedule_matches(table, 4, 80)
+    placements, missing, order, attempt = multi_start_schedule(table, 4, 80, 16, seed=1, workers=1)
+    # 第 0 次嘗試就是預設順序
+    assert schedule_score(placements, missing) <= schedule_score(*greedy)
+    assert schedule_matches(table, 4, 80, order) == (placements, missing)
+    assert is_valid(table, placements, 4, 80)
+    single = multi_start_schedule(table, 4, 80, 1, seed=1, workers=1)
+    assert single[3] == 0 and (single[0], single[1]) == greedy
+
+
+def test_shuffled_order_keeps_dependencies(tournament):
+    _, table = tournament(16, 2, 2, seed=5)
+    order = shuffled_order(table, random.Random(3))
+    assert sorted(order) == list(range(len(table)))
+    assert order == shuffled_order(table, random.Random(3))
+    # 洗牌後依賴仍然被遵守 (引擎本來就會等前置比賽)，排出來的仍是合法排程
+    placements, missing = schedule_matches(table, 3, 300, order)
+    assert missing == [] and is_valid(table, placements, 3, 300)
@@ -0,0 +1,120 @@
+import io
+
+import pytest
+from openpyxl import Workbook
+
+from model import MatchTable, Schedule
+from scheduling import schedule_matches
+from scoresheets import SheetRow, merge_scores, read_score_sheet
+
+MATCHES = [
+    {"type": "初賽", "level": "A組", "team_a": "甲", "team_b": "乙", "desc": "A組 循環賽"},
+    {"type": "初賽", "level": "B組", "team_a": "丙", "team_b": "丁", "desc": "B組 循環賽"},
+    # 排名已套用的決賽 (實際隊名) 與還是代稱的季殿軍賽
+    {"type": "決賽-勝部", "level": "決賽區", "team_a": "甲", "team_b": "丙", "desc": "🏆 總冠軍賽"},
+    {"type": "決賽-勝部", "level": "決賽區", "team_a": "A組 亞軍", "team_b": "B組 亞軍", "desc": "🥉 季殿軍賽"},
+]
+
+
+@pytest.fixture
+def plan():
+    table = MatchTable.from_dicts(MATCHES, 3)
+    placements, missing = schedule_matches(table, 2, 100, order=range(len(table)))
+    assert not missing
+    return Schedule.from_placements(table, placements, 100, 2)
+
+
+def no(plan, mid):
+    return int(plan.match_no[mid])
+
+
+def row(plan, mid, score_a, score_b, team_a=None, team_b=None, source="a.xlsx", line=2):
+    return SheetRow(source, "Sheet", line, no(plan, mid), team_a, team_b, score_a, score_b)
+
+
+def nothing(mid):
+    return None
+
+
+def test_swapped_team_columns(plan):
+    rows = [row(plan, 0, 21, 15, "甲", "乙"), row(plan, 1, 21, 15, "丁", "丙")]
+    updates, conflicts, unchanged = merge_scores(rows, plan, nothing)
+    # 成績一律依排程的 team_a / team_b 順序
+    assert updates == {0: (21, 15), 1: (15, 21)}
+    assert conflicts == [] and unchanged == 0
+
+
+def test_wrong_teams(plan):
+    updates, conflicts, _ = merge_scores([row(plan, 0, 21, 15, "甲", "丙")], plan, nothing)
+    assert updates == {}
+    assert [c.reason.startswith("隊伍不符") for c in conflicts] == [True]
+
+
+def test_conflicting_sheets(plan):
+    rows = [
+        row(plan, 0, 21, 15, source="a.xlsx"), row(plan, 0, 15, 21, "乙", "甲", source="b.xlsx"),  # 同一個成績
+        row(plan, 1, 21, 15, source="a.xlsx", line=3), row(plan, 1, 21, 18, source="b.xlsx", line=3),
+    ]
+    updates, conflicts, _ = merge_scores(rows, plan, nothing)
+    assert updates == {0: (21, 15)}
+    assert sorted((c.source, c.match_no) for c in conflicts) == [("a.xlsx", no(plan, 1)), ("b.xlsx", no(plan, 1))]
+    assert all("多張表成績不同 (21:15 / 21:18)" in c.reason for c in conflicts)
+
+
+def test_knockout_tie_and_placeholders(plan):
+    rows = [row(plan, 2, 21, 21, line=2), row(plan, 3, 21, 10, line=3)]
+    updates, conflicts, _ = merge_scores(rows, plan, nothing)
+    assert updates == {}
+    assert [(c.row, c.reason) for c in conflicts] == [(2, "淘汰賽不能平手"), (3, "對戰隊伍尚未確定")]
+    # 初賽可以平手；決賽有勝負就收
+    updates, conflicts, _ = merge_scores([row(plan, 0, 20, 20), row(plan, 2, 21, 19)], plan, nothing)
+    assert updates == {0: (20, 20), 2: (21, 19)} and conflicts == []
+
+
+def test_existing_scores(plan):
+    current = {0: (21, 15), 1: (10, 21)}.get
+    rows = [row(plan, 0, 21, 15), row(plan, 1, 21, 10), row(plan, 2, 21, 12)]
+    updates, conflicts, unchanged = merge_scores(rows, plan, current)
+    assert updates == {2: (21, 12)} and unchanged == 1
+    assert [(c.match_no, c.reason) for c in conflicts] == [(no(plan, 1), "已登錄 10:21，表上為 21:10")]
+    updates, conflicts, unchanged = merge_scores(rows, plan, current, overwrite=True)
+    assert updates == {1: (21, 10), 2: (21, 12)} and conflicts == [] and unchanged == 1
+
+
+def test_unknown_match_no(plan):
+    updates, conflicts, _ = merge_scores([SheetRow("a.xlsx", "Sheet", 2, 999, None, None, 1, 2)], plan, nothing)
+    assert updates == {} and [c.reason for c in conflicts] == ["排程裡沒有這個比賽編號"]
+
+
+def workbook(rows):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "初賽"
+    for r in rows:
+        ws.append(r)
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def test_read_score_sheet():
+    data = workbook([
+        ["No.", "組別", "Team A", "Score A", "Score B", "Team B"],
+        [1, "A組", "甲", 21, 15, "乙"],
+        [2.0, "B組", "丙", "21", "", "丁"],   # 成績不完整
+        [3, "A組", "甲", "x", 1, "乙"],       # 格式錯誤
+        [4, "B組", "丙", None, None, "丁"],   # 沒填，略過
+        [None, "", "", 5, 5, ""],             # 沒有編號，略過
+        [5, "", None, 7.0, 0, None],
+    ])
+    rows, conflicts = read_score_sheet(data, "a.xlsx")
+    assert rows == [SheetRow("a.xlsx", "初賽", 2, 1, "甲", "乙", 21, 15),
+                    SheetRow("a.xlsx", "初賽", 7, 5, None, None, 7, 0)]
+    assert [(c.row, c.reason) for c in conflicts] == [(3, "成績不完整"), (4, "編號或成績格式錯誤")]
+
+
+def test_read_score_sheet_unreadable():
+    rows, conflicts = read_score_sheet(b"not a workbook", "bad.xlsx")
+    assert rows == [] and len(conflicts) == 1 and conflicts[0].reason.startswith("無法讀取")
+    # 沒有 Match No. / Score 欄的表整張略過
+    assert read_score_sheet(workbook([["隊名", "備註"], ["甲", 1]]), "x.xlsx") == ([], [])
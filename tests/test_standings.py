@@ -0,0 +1,97 @@
+from itertools import combinations
+
+import pytest
+
+from standings import GroupStandings, score_changes
+
+
+def group(lvl, names):
+    """一組的循環賽比賽 dict"""
+    return [{"type": "初賽", "level": lvl, "team_a": a, "team_b": b, "desc": f"{lvl} 循環賽"}
+            for a, b in combinations(names, 2)]
+
+
+def standings_with(lvl, results):
+    """results: [(a, b, a 得點, b 得點), ...]，隊伍依出現順序成組"""
+    names = list(dict.fromkeys(n for a, b, _, _ in results for n in (a, b)))
+    standings = GroupStandings.from_matches(group(lvl, names))
+    for a, b, sa, sb in results:
+        standings.record(a, b, sa, sb)
+    return standings
+
+
+def test_head_to_head_beats_point_ratio():
+    # B隊 / A隊 都 2 勝，B隊 贏了彼此那場 (點數比較差也排前面)；D隊 / C隊 都 1 勝同理
+    standings = standings_with("A組", [
+        ("B隊", "A隊", 21, 19), ("B隊", "D隊", 21, 19), ("B隊", "C隊", 0, 21),
+        ("A隊", "D隊", 21, 0), ("A隊", "C隊", 21, 0),
+        ("D隊", "C隊", 21, 20),
+    ])
+    assert standings._ratio("A隊") > standings._ratio("B隊")
+    assert standings._ratio("C隊") > standings._ratio("D隊")
+    assert standings.ranking("A組") == ["B隊", "A隊", "D隊", "C隊"]
+
+
+def test_circular_tie_falls_back_to_point_ratio():
+    # 三隊互有勝負 (各 1 勝)，彼此間勝場相同，比點數比
+    standings = standings_with("B組", [
+        ("甲", "乙", 21, 10), ("乙", "丙", 21, 19), ("丙", "甲", 21, 19),
+    ])
+    assert standings.ranking("B組") == ["甲", "丙", "乙"]
+
+
+def test_equal_ratio_falls_back_to_point_difference():
+    # A隊 / B隊 平手、都贏 C隊；點數比都是 4，B隊 點數差 18 > A隊 15
+    standings = standings_with("C組", [
+        ("A隊", "B隊", 5, 5), ("A隊", "C隊", 15, 0), ("B隊", "C隊", 19, 1),
+    ])
+    assert standings._ratio("A隊") == standings._ratio("B隊")
+    assert standings.ranking("C組") == ["B隊", "A隊", "C隊"]
+    rows = standings.table_rows("C組")
+    assert [(r["team"], r["point_diff"]) for r in rows] == [("B隊", 18), ("A隊", 15), ("C隊", -33)]
+
+
+def test_identical_records_ordered_by_name():
+    standings = standings_with("D組", [("乙", "甲", 10, 10)])
+    assert standings.ranking("D組") == sorted(["甲", "乙"])
+
+
+def test_corrected_score_reorders_and_placeholders_wait_for_group():
+    standings = standings_with("A組", [("A隊", "B隊", 21, 10), ("B隊", "C隊", 21, 10)])
+    assert standings.placeholder_map() == {}
+    standings.record("A隊", "C隊", 21, 10)
+    assert standings.ranking("A組") == ["A隊", "B隊", "C隊"]
+    assert standings.placeholder_map()["A組 冠軍"] == "A隊"
+    # 改成績：B隊 贏 A隊 (兩隊的勝敗場數一起修正)
+    standings.record("B隊", "A隊", 21, 5)
+    assert standings.stats["A隊"][:3] == [2, 1, 1]
+    assert standings.ranking("A組") == ["B隊", "A隊", "C隊"]
+    assert standings.placeholder_map()["A組 冠軍"] == "B隊"
+    standings.clear("A隊", "C隊")
+    assert standings.placeholder_map() == {}
+
+
+def test_record_outside_group():
+    standings = GroupStandings.from_matches(group("A組", ["甲", "乙"]) + group("B組", ["丙", "丁"]))
+    with pytest.raises(KeyError):
+        standings.record("甲", "丙", 21, 10)
+
+
+def editor_rows(*scores):
+    return [{"Team A": f"A{i}", "Team B": f"B{i}", "Score A": a, "Score B": b} for i, (a, b) in enumerate(scores)]
+
+
+def test_unchanged_blank_rows_are_not_written():
+    # 編輯器整欄有數字時空白變成 NaN；原本是 None 的空白列不算變動
+    rows = editor_rows((None, None), (21, 15), (None, None), (None, None))
+    nan = float("nan")
+    assert score_changes(rows, [nan, 21.0, nan, 7.0], [nan, 15.0, nan, nan]) == []
+    assert score_changes(rows, [None, 21, None, None], [None, 15, None, None]) == []
+
+
+def test_score_changes():
+    rows = editor_rows((None, None), (21, 15), (21, 15), (None, None))
+    nan = float("nan")
+    assert score_changes(rows, [21.0, 21.0, nan, 10.0], [19.0, 18.0, 15.0, 21.0]) == [
+        ("A0", "B0", (21, 19)), ("A1", "B1", (21, 18)), ("A2", "B2", None), ("A3", "B3", (10, 21)),
+    ]
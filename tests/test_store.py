@@ -0,0 +1,147 @@
+import json
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from model import Schedule, Session, VenueLayout
+from scheduling import schedule_matches
+from store import TournamentStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TournamentStore(str(tmp_path / "t.db"))
+    yield store
+    store.close()
+
+
+def plan_for(table, num_courts=4, layout=None):
+    placements, _ = schedule_matches(table, num_courts, 500)
+    if layout is not None:
+        return Schedule.from_placements(table, placements, layout.shape[0], layout.shape[1],
+                                        layout.row_times[0], layout.mins_per_point, layout)
+    return Schedule.from_placements(table, placements, 500, num_courts, datetime(2026, 10, 17, 9), 15)
+
+
+def test_round_trip(store, tournament):
+    teams, table = tournament(12, 2, 2, points_per_matchup=3)
+    matches = [table.to_dict(mid) for mid in range(len(table))]
+    matches[0]["points"] = 7
+    plan = plan_for(table)
+    tid = store.create_tournament("秋季盃")
+    store.save_teams(tid, teams)
+    store.save_matches(tid, matches)
+    store.save_schedule(tid, plan, 3)
+    store.save_settings(tid, {"filled_slots": {"A組 冠軍": teams[0]["name"]}})
+    store.record_result(tid, teams[0]["name"], teams[1]["name"], 21, 15)
+    store.record_results(tid, [(teams[2]["name"], teams[3]["name"], 10, 21)], [(len(matches) - 1, "甲", "乙", 21, 19)])
+
+    data = store.load(tid)
+    assert data["teams"] == teams
+    assert data["matches"] == matches
+    assert data["settings"] == {"filled_slots": {"A組 冠軍": teams[0]["name"]}}
+    assert sorted(data["results"]) == sorted([(teams[0]["name"], teams[1]["name"], 21, 15),
+                                             (teams[2]["name"], teams[3]["name"], 10, 21)])
+    assert data["knockout_results"] == {len(matches) - 1: ("甲", "乙", 21, 19)}
+    loaded = data["plan"]
+    assert (loaded.grid == plan.grid).all() and (loaded.match_no == plan.match_no).all()
+    assert (loaded.play_start, loaded.mins_per_point, loaded.layout) == (plan.play_start, 15, None)
+    assert json.loads(store.export_json(tid)) == {"teams": teams, "matches": matches}
+
+
+def test_round_trip_with_venue_layout(store, tournament):
+    _, table = tournament(8, 2, 2)
+    layout = VenueLayout([Session("甲館", datetime(2026, 10, 17, 9), datetime(2026, 10, 17, 18), 3),
+                          Session("乙館", datetime(2026, 10, 17, 10), datetime(2026, 10, 17, 16), 2)], 15)
+    tid = store.create_tournament("多場館")
+    store.save_matches(tid, [table.to_dict(mid) for mid in range(len(table))])
+    store.save_schedule(tid, plan_for(table, layout=layout), 3)
+    loaded = store.load(tid)["plan"]
+    assert loaded.layout.to_json() == layout.to_json()
+    assert loaded.court_label(3) == "乙館 Court 1"
+
+
+def history_details(store, tid, kind):
+    return [detail for _, k, detail in reversed(store.history(tid)) if k == kind]
+
+
+def test_saves_only_write_changed_rows(store, tournament):
+    teams, table = tournament(10, 2, 2)
+    matches = [table.to_dict(mid) for mid in range(len(table))]
+    tid = store.create_tournament("x")
+    store.save_teams(tid, teams)
+    store.save_teams(tid, teams)
+    teams[3] = dict(teams[3], level="候補")
+    store.save_teams(tid, teams)
+    store.save_teams(tid, teams[:8])
+    assert history_details(store, tid, "teams") == ["10 changed", "0 changed", "1 changed", "0 changed"]
+    assert store.load(tid)["teams"] == teams[:8]
+
+    store.save_matches(tid, matches)
+    matches[-1] = dict(matches[-1], team_a="快樂小隊-01")
+    store.save_matches(tid, matches)
+    store.save_matches(tid, matches[:5])
+    assert history_details(store, tid, "matches") == [f"{len(matches)} changed", "1 changed", "0 changed"]
+    assert store.load(tid)["matches"] == matches[:5]
+
+
+def test_results_and_history(store):
+    tid = store.create_tournament("x")
+    store.record_result(tid, "甲", "乙", 21, 15)
+    # 同一場反過來輸入時取代原本的成績
+    store.record_result(tid, "乙", "甲", 21, 19)
+    assert store.load(tid)["results"] == [("乙", "甲", 21, 19)]
+    store.clear_result(tid, "甲", "乙")
+    assert store.load(tid)["results"] == []
+    assert [kind for _, kind, _ in store.history(tid)] == ["clear_result", "result", "result"]
+    assert len(store.history(tid, 2)) == 2
+
+
+def test_tournaments_are_separate(store):
+    a, b = store.create_tournament("a"), store.create_tournament("b")
+    store.save_teams(a, [{"name": "甲", "level": "A組"}])
+    store.save_teams(b, [{"name": "乙", "level": "A組"}])
+    assert [name for _, name, _ in store.list_tournaments()] == ["b", "a"]
+    store.delete_tournament(a)
+    assert [name for _, name, _ in store.list_tournaments()] == ["b"]
+    assert store.load(a)["teams"] == [] and store.history(a) == []
+    assert store.load(b)["teams"] == [{"name": "乙", "level": "A組"}]
+    with pytest.raises(sqlite3.IntegrityError):
+        store.create_tournament("b")
+
+
+def test_import_json_replaces_schedule(store, tournament):
+    teams, table = tournament(8, 2, 2)
+    tid = store.create_tournament("x")
+    store.save_matches(tid, [table.to_dict(mid) for mid in range(len(table))])
+    store.save_schedule(tid, plan_for(table), 3)
+    store.import_json(tid, {"teams": teams[:4], "matches": []})
+    data = store.load(tid)
+    assert data["teams"] == teams[:4] and data["matches"] == [] and data["plan"] is None
+
+
+def test_migrates_old_schedules_table(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE tournaments (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE, created_at TEXT NOT NULL,
+                                  updated_at TEXT NOT NULL, settings TEXT NOT NULL DEFAULT '{}');
+        CREATE TABLE schedules (tournament_id INTEGER PRIMARY KEY, slots_count INTEGER NOT NULL,
+                                num_courts INTEGER NOT NULL, points_per_matchup INTEGER NOT NULL,
+                                play_start TEXT, mins_per_point INTEGER);
+        INSERT INTO tournaments VALUES (1, '舊賽事', '2025-01-01T09:00:00', '2025-01-01T09:00:00', '{}');
+        INSERT INTO schedules VALUES (1, 40, 2, 3, '2025-01-01T09:00:00', 15);
+    """)
+    conn.close()
+
+    store = TournamentStore(path)
+    try:
+        columns = {row[1] for row in store._read("PRAGMA table_info(schedules)")}
+        assert "layout" in columns
+        plan = store.load(1)["plan"]
+        assert plan.grid.shape == (40, 2) and plan.layout is None
+    finally:
+        store.close()
+    # 再開一次不會重複加欄位
+    TournamentStore(path).close()
@@ -0,0 +1,166 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from model import MatchTable, Schedule, Session, VenueLayout
+from scheduling import schedule_matches
+from validation import KIND_LABELS, validate_matches, validate_schedule, violation_rows
+
+TEAMS = [{"name": n, "level": "A組"} for n in "甲乙丙"] + [{"name": n, "level": "B組"} for n in "丁戊己"]
+MATCHES = [
+    {"type": "初賽", "level": "A組", "team_a": "甲", "team_b": "乙", "desc": "A組 循環賽"},
+    {"type": "初賽", "level": "A組", "team_a": "甲", "team_b": "丙", "desc": "A組 循環賽"},
+    {"type": "初賽", "level": "A組", "team_a": "乙", "team_b": "丙", "desc": "A組 循環賽"},
+    {"type": "初賽", "level": "B組", "team_a": "丁", "team_b": "戊", "desc": "B組 循環賽"},
+    {"type": "初賽", "level": "B組", "team_a": "丁", "team_b": "己", "desc": "B組 循環賽"},
+    {"type": "初賽", "level": "B組", "team_a": "戊", "team_b": "己", "desc": "B組 循環賽"},
+    {"type": "複賽-勝部", "level": "決賽區", "team_a": "A組 冠軍", "team_b": "B組 亞軍", "desc": "4強賽 A1vsB2"},
+    {"type": "複賽-勝部", "level": "決賽區", "team_a": "B組 冠軍", "team_b": "A組 亞軍", "desc": "4強賽 B1vsA2"},
+    {"type": "決賽-勝部", "level": "決賽區", "team_a": "4強賽 勝方1", "team_b": "4強賽 勝方2", "desc": "🏆 總冠軍賽"},
+]
+SEMI, FINAL = 6, 8
+START = datetime(2026, 10, 17, 9)
+
+
+@pytest.fixture
+def plan():
+    table = MatchTable.from_dicts(MATCHES, 3)
+    placements, missing = schedule_matches(table, 2, 60)
+    assert not missing
+    # 比排程多一面空場地，方便把比賽搬到任何時間
+    plan = Schedule.from_placements(table, placements, 60, 3, START, 10)
+    plan.renumber()
+    assert validate_schedule(plan, START, START + timedelta(hours=10), TEAMS) == []
+    return plan
+
+
+def spare(plan):
+    return plan.grid.shape[1] - 1
+
+
+def move(plan, mid, row, col=None):
+    unplace(plan, mid)
+    plan.place(mid, row, spare(plan) if col is None else col, int(plan.span[mid]))
+
+
+def unplace(plan, mid):
+    plan.grid[plan.grid == mid] = -1
+    plan.start[mid] = -1
+    plan.court[mid] = -1
+
+
+def kinds(violations):
+    return sorted({v.kind for v in violations})
+
+
+def test_team_overlap(plan):
+    # 甲 同時打 甲乙、甲丙
+    move(plan, 1, int(plan.start[0]))
+    violations = validate_schedule(plan)
+    assert kinds(violations) == ["team_overlap"]
+    [v] = violations
+    assert {v.match_id, v.other} == {0, 1} and v.detail == "甲"
+
+
+def test_feed_order(plan):
+    # 總冠軍賽搬到第一場 4強賽開打的時候
+    move(plan, FINAL, int(plan.start[SEMI]))
+    violations = validate_schedule(plan)
+    assert (FINAL, SEMI) in [(v.match_id, v.other) for v in violations if v.kind == "feed_order"]
+    assert kinds(violations) == ["feed_order"]
+
+
+def test_feed_unscheduled(plan):
+    unplace(plan, SEMI)
+    assert [(v.kind, v.match_id, v.other) for v in validate_schedule(plan)] == [("feed_unscheduled", FINAL, SEMI)]
+
+
+def test_gate_order_and_incomplete(plan):
+    move(plan, SEMI, 0)
+    assert kinds(validate_schedule(plan)) == ["gate_order"]
+    move(plan, SEMI, int(plan.start[FINAL]) - int(plan.span[SEMI]))
+    unplace(plan, 5)
+    violations = validate_schedule(plan)
+    assert kinds(violations) == ["gate_incomplete"]
+    # 兩場 4強賽都要等 B組 打完
+    assert sorted(v.match_id for v in violations) == [SEMI, SEMI + 1]
+    assert {v.detail for v in violations} == {"B組"}
+
+
+def test_court_overlap_and_grid_mismatch(plan):
+    other = int(plan.grid[0, 0])
+    mid = int(plan.grid[0, 1])
+    plan.grid[plan.grid == mid] = -1
+    # 位置指到別場比賽的格子，大表上卻沒有它
+    plan.start[mid], plan.court[mid] = 0, 0
+    violations = validate_schedule(plan)
+    assert [(v.kind, v.match_id, v.other) for v in violations] == [("court_overlap", mid, other)]
+    plan.start[mid], plan.court[mid] = 0, 1
+    assert [(v.kind, v.match_id) for v in validate_schedule(plan)] == [("grid_mismatch", mid)]
+    # 大表上有不屬於那一格的比賽
+    plan.place(mid, 0, 1, int(plan.span[mid]))
+    plan.grid[50, spare(plan)] = 0
+    assert [(v.kind, v.match_id, v.other) for v in validate_schedule(plan)] == [("grid_mismatch", None, 0)]
+
+
+def test_out_of_range(plan):
+    unplace(plan, FINAL)
+    plan.start[FINAL], plan.court[FINAL] = 59, 0
+    assert [(v.kind, v.match_id) for v in validate_schedule(plan)] == [("out_of_range", FINAL)]
+
+
+def test_out_of_window(plan):
+    end = START + timedelta(minutes=10 * int(plan.start[FINAL] + plan.span[FINAL]))
+    assert validate_schedule(plan, START, end) == []
+    late = validate_schedule(plan, START, end - timedelta(minutes=10))
+    assert [(v.kind, v.match_id) for v in late] == [("out_of_window", FINAL)]
+    early = validate_schedule(plan, START + timedelta(minutes=5))
+    assert {v.kind for v in early} == {"out_of_window"}
+    assert {v.match_id for v in early} == set(plan.grid[0].tolist()) - {-1}
+
+
+def test_closed_court_and_day_boundary():
+    day1, day2 = datetime(2026, 10, 17, 9), datetime(2026, 10, 18, 9)
+    layout = VenueLayout([Session("甲館", day1, day1 + timedelta(hours=1), 2),
+                          Session("乙館", day1, day1 + timedelta(minutes=30), 1),
+                          Session("甲館", day2, day2 + timedelta(hours=1), 2)], 10)
+    table = MatchTable.from_dicts(MATCHES[:3], 3)
+    rows = layout.shape[0]
+    plan = Schedule.from_placements(table, [], rows, layout.shape[1], layout.row_times[0], 10, layout)
+    assert validate_schedule(plan) == []
+    # 乙館 只開前半小時；第一天最後一格接到第二天
+    plan.place(0, 2, 2, 3)
+    plan.place(1, 5, 0, 3)
+    assert [(v.kind, v.match_id) for v in validate_schedule(plan)] == [("closed_court", 0), ("out_of_window", 1)]
+
+
+def test_validate_matches():
+    matches = [dict(m) for m in MATCHES]
+    matches[0]["team_b"] = "甲"
+    matches[3]["team_a"] = "庚"
+    matches[FINAL]["team_b"] = "8強賽 勝方1"
+    table = MatchTable.from_dicts(matches, 3)
+    found = [(v.kind, v.match_id) for v in validate_matches(table, TEAMS)]
+    assert ("self_match", 0) in found
+    assert ("unknown_team", 3) in found
+    assert ("unresolved_feed", FINAL) in found
+    # 沒給名單就不檢查隊伍
+    assert "unknown_team" not in kinds(validate_matches(table))
+
+
+def test_team_in_wrong_group():
+    teams = [dict(t) for t in TEAMS]
+    teams[0]["level"] = "B組"
+    violations = validate_matches(MatchTable.from_dicts(MATCHES, 3), teams)
+    assert {v.match_id for v in violations} == {0, 1}
+    assert {v.detail for v in violations} == {"甲 在 B組，不是 A組"}
+
+
+def test_violation_rows(plan):
+    move(plan, 1, int(plan.start[0]))
+    [row] = violation_rows(validate_schedule(plan), plan.table, plan)
+    assert row["問題"] == KIND_LABELS["team_overlap"] and row["說明"] == "甲"
+    assert row["比賽"].startswith("No.") and "甲 vs" in row["比賽"]
+    [row] = violation_rows(validate_matches(MatchTable.from_dicts([dict(MATCHES[0], team_b="甲")], 3)),
+                           MatchTable.from_dicts(MATCHES[:1], 3))
+    assert row["比賽"] == "#1 A組 甲 vs 乙" and row["相關比賽"] == ""
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from model import Session, Stage, VenueLayout
+from validation import validate_schedule
+from venues import schedule_venues
+
+ONE_DAY = [Session("甲館", datetime(2026, 10, 17, 9), datetime(2026, 10, 17, 18), 6),
+           Session("乙館", datetime(2026, 10, 17, 9, 30), datetime(2026, 10, 17, 17), 4)]
+TWO_DAYS = [Session("甲館", datetime(2026, 10, 17, 9), datetime(2026, 10, 17, 12), 4),
+            Session("乙館", datetime(2026, 10, 17, 9), datetime(2026, 10, 17, 13), 3),
+            Session("甲館", datetime(2026, 10, 18, 9), datetime(2026, 10, 18, 17), 6),
+            Session("乙館", datetime(2026, 10, 18, 13), datetime(2026, 10, 18, 17), 2)]
+
+
+@pytest.mark.parametrize("sessions, n_teams, groups, per_group, travel, seed", [
+    (ONE_DAY, 32, 4, 2, 30, 0),
+    (ONE_DAY, 24, 8, 1, 0, 1),
+    (TWO_DAYS, 24, 4, 2, 20, 2),
+    (TWO_DAYS, 16, 4, 1, 60, 3),
+])
+def test_schedule_venues_is_valid(tournament, sessions, n_teams, groups, per_group, travel, seed):
+    teams, table = tournament(n_teams, groups, per_group, points_per_matchup=2, seed=seed)
+    matches = [table.to_dict(mid) for mid in range(len(table))]
+    layout = VenueLayout(sessions, 15)
+    plan, venue_of = schedule_venues(matches, 2, layout, travel_minutes=travel, seed=seed, workers=1)
+
+    assert validate_schedule(plan, teams=teams) == []
+    assert len(plan.unscheduled_ids()) == 0
+    assert set(venue_of.values()) == set(layout.venues)
+    final_venue = layout.venues[layout.court_venue[plan.court[plan.id_by_match_no(len(table))]]]
+    group_end = {}
+    for mid in plan.scheduled_ids().tolist():
+        venue = layout.venues[layout.court_venue[plan.court[mid]]]
+        if table.stage[mid] == Stage.GROUP:
+            # 一組的初賽整組在同一個場館
+            level = table.name(table.level[mid])
+            assert venue == venue_of[level]
+            end = plan.end_time(plan.start[mid] + plan.span[mid])
+            group_end[level] = max(group_end.get(level, end), end)
+        else:
+            assert venue == final_venue
+    # 從其他場館晉級的隊伍有移動時間
+    for mid in plan.scheduled_ids().tolist():
+        if table.stage[mid] == Stage.GROUP:
+            continue
+        start = plan.row_time(plan.start[mid])
+        for level, end in group_end.items():
+            if venue_of[level] != final_venue:
+                assert start >= end + timedelta(minutes=travel)
+
+
+def test_schedule_venues_keeps_fixed_groups(tournament):
+    teams, table = tournament(32, 4, 2, seed=5)
+    matches = [table.to_dict(mid) for mid in range(len(table))]
+    layout = VenueLayout(ONE_DAY, 15)
+    fixed = {"A組": "乙館", "B組": "乙館"}
+    plan, venue_of = schedule_venues(matches, 3, layout, venue_groups=fixed, final_venue="甲館", workers=1)
+    assert {g: venue_of[g] for g in fixed} == fixed
+    assert validate_schedule(plan, teams=teams) == []
+    for mid in plan.scheduled_ids().tolist():
+        if table.stage[mid] == Stage.GROUP and table.name(table.level[mid]) in fixed:
+            assert layout.venues[layout.court_venue[plan.court[mid]]] == "乙館"
+
+
+def test_schedule_venues_unknown_venue(tournament):
+    _, table = tournament(8, 2, 2)
+    matches = [table.to_dict(mid) for mid in range(len(table))]
+    with pytest.raises(ValueError):
+        schedule_venues(matches, 3, VenueLayout(ONE_DAY, 15), final_venue="丙館", workers=1)
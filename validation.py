@@ -0,0 +1,196 @@
+"""
+排程檢查：產生或讀進來的排程是否合理，一次走過所有比賽 (O(比賽數 + 大表格數))
+
+- 比賽表：自己對自己、初賽隊伍不在名單 / 組別、晉級代稱對不到來源比賽
+- 位置：超出大表、大表與比賽位置不一致 (同一場地同時兩場)、排在未開放的場地格、超出比賽時間
+- 隊伍：同一隊同時排兩場
+- 先後：複賽 / 決賽要在晉級來源比賽、以及晉級組別的初賽全部打完之後
+
+每次排程完都跑，2000 隊的賽事也只要幾十毫秒
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from model import Stage
+
+# 一個問題：match_id / other 為比賽 id (沒有時為 None)，detail 為說明
+Violation = namedtuple("Violation", ["kind", "match_id", "other", "detail"])
+
+KIND_LABELS = {
+    "self_match": "自己對自己",
+    "unknown_team": "名單外的隊伍",
+    "unresolved_feed": "晉級來源不明",
+    "out_of_range": "超出大表",
+    "grid_mismatch": "大表不一致",
+    "court_overlap": "場地重疊",
+    "closed_court": "場地未開放",
+    "out_of_window": "超出比賽時間",
+    "team_overlap": "隊伍同時兩場",
+    "feed_unscheduled": "晉級來源未排入",
+    "feed_order": "早於晉級來源",
+    "gate_incomplete": "組別初賽未排完",
+    "gate_order": "早於組別打完",
+}
+
+
+def validate_matches(table, teams=None):
+    """比賽表本身的問題 (不看排程)；teams 為隊伍 dict list，給的話檢查初賽隊伍是否在該組名單"""
+    violations = []
+    s = table.strings
+    a = np.frombuffer(table.team_a, dtype=np.int32) if len(table) else np.zeros(0, dtype=np.int32)
+    b = np.frombuffer(table.team_b, dtype=np.int32) if len(table) else np.zeros(0, dtype=np.int32)
+    for mid in np.flatnonzero(a == b).tolist():
+        violations.append(Violation("self_match", mid, None, s[a[mid]]))
+
+    if teams is not None:
+        roster = {t['name']: t['level'] for t in teams}
+        for mid in range(len(table)):
+            if table.stage[mid] != Stage.GROUP:
+                continue
+            level = s[table.level[mid]]
+            for sid in {table.team_a[mid], table.team_b[mid]}:
+                name = s[sid]
+                if name not in roster:
+                    violations.append(Violation("unknown_team", mid, None, f"{name} 不在隊伍名單"))
+                elif roster[name] != level:
+                    violations.append(Violation("unknown_team", mid, None, f"{name} 在 {roster[name]}，不是 {level}"))
+
+    for mid, link in enumerate(table.links()):
+        for feed in link.feeds:
+            if feed.source is None:
+                violations.append(Violation("unresolved_feed", mid, None, feed.text))
+    return violations
+
+
+def _cells(start, span):
+    """每場比賽佔的每一格的列 (依比賽順序接在一起)"""
+    total = int(span.sum())
+    offsets = np.repeat(np.cumsum(span) - span, span)
+    return np.repeat(start, span) + np.arange(total) - offsets
+
+
+def validate_schedule(plan, play_start=None, play_end=None, teams=None):
+    """
+    檢查排程 (model.Schedule)；回傳 Violation list，空的就是沒問題
+    play_start / play_end：比賽時間 (單一場地時檢查；多場館 / 多天以 layout 的開放時段為準)
+    """
+    table = plan.table
+    violations = validate_matches(table, teams)
+    rows, cols = plan.grid.shape
+    start, court, span = plan.start, plan.court, plan.span
+    placed = np.flatnonzero(start >= 0)
+
+    # 1. 位置在大表內
+    outside = (start[placed] + span[placed] > rows) | (court[placed] < 0) | (court[placed] >= cols) | (span[placed] < 1)
+    for mid in placed[outside].tolist():
+        violations.append(Violation("out_of_range", mid, None,
+                                    f"第 {start[mid]} 格、場地 {court[mid]}、{span[mid]} 格"))
+    placed = placed[~outside]
+
+    # 2. 大表每一格與比賽位置一致：一格只屬於一場，比賽佔的格都是它自己
+    cell_rows = _cells(start[placed], span[placed])
+    cell_cols = np.repeat(court[placed], span[placed])
+    owners = np.repeat(placed, span[placed])
+    found = plan.grid[cell_rows, cell_cols]
+    wrong = np.flatnonzero(found != owners)
+    reported = set()
+    for i in wrong.tolist():
+        mid, other = int(owners[i]), int(found[i])
+        if mid in reported:
+            continue
+        reported.add(mid)
+        if other < 0:
+            violations.append(Violation("grid_mismatch", mid, None, f"大表第 {cell_rows[i]} 格沒有這場"))
+        else:
+            violations.append(Violation("court_overlap", mid, other,
+                                        f"{plan.time_label(cell_rows[i])} {plan.court_label(cell_cols[i])}"))
+    claimed = np.zeros(plan.grid.shape, dtype=bool)
+    claimed[cell_rows, cell_cols] = True
+    stray_rows, stray_cols = np.nonzero((plan.grid >= 0) & ~claimed)
+    stray = plan.grid[stray_rows, stray_cols]
+    for other, i in zip(*np.unique(stray, return_index=True)):
+        other = int(other)
+        violations.append(Violation("grid_mismatch", None, other if other < len(table) else None,
+                                    f"{plan.time_label(stray_rows[i])} {plan.court_label(stray_cols[i])} "
+                                    f"有不屬於它的比賽 (id {other})"))
+
+    # 3. 比賽時間：多場館看開放的場地格，單一場地看 play_start..play_end
+    layout = plan.layout
+    if layout is not None:
+        closed = ~layout.open[cell_rows, cell_cols]
+        for mid in np.unique(owners[closed]).tolist():
+            violations.append(Violation("closed_court", mid, None, plan.court_label(court[mid])))
+        # 一場比賽的格子時間要連續 (不能跨到隔天)
+        times = np.array(layout.row_times, dtype="datetime64[m]")
+        last = start[placed] + span[placed] - 1
+        gap = (times[last] - times[start[placed]]).astype(np.int64)
+        for mid in placed[gap != (span[placed] - 1) * layout.mins_per_point].tolist():
+            violations.append(Violation("out_of_window", mid, None, f"{plan.time_label(start[mid])} 跨越時段"))
+    elif plan.play_start is not None and (play_start is not None or play_end is not None):
+        step = plan.mins_per_point * 60
+        first = 0 if play_start is None else -(-(play_start - plan.play_start).total_seconds() // step)
+        limit = rows if play_end is None else (play_end - plan.play_start).total_seconds() // step
+        early = start[placed] < first
+        late = start[placed] + span[placed] > limit
+        for mid in placed[early | late].tolist():
+            violations.append(Violation("out_of_window", mid, None,
+                                        f"{plan.time_label(start[mid])} ~ {plan.end_label(start[mid] + span[mid])}"))
+
+    # 4. 同一隊不能同時兩場：依開始格走一遍，記每隊目前打到第幾格
+    busy_until, last_match = {}, {}
+    for mid in placed[np.argsort(start[placed], kind="stable")].tolist():
+        row, end = int(start[mid]), int(start[mid] + span[mid])
+        for team in {table.team_a[mid], table.team_b[mid]}:
+            if busy_until.get(team, -1) > row:
+                violations.append(Violation("team_overlap", mid, last_match[team], table.name(team)))
+            if end > busy_until.get(team, -1):
+                busy_until[team] = end
+                last_match[team] = mid
+
+    # 5. 先後順序：晉級來源比賽、晉級組別的初賽都要先打完
+    group_end, incomplete = {}, set()
+    for mid in range(len(table)):
+        if table.stage[mid] != Stage.GROUP:
+            continue
+        level = table.level[mid]
+        if start[mid] < 0:
+            incomplete.add(level)
+        else:
+            group_end[level] = max(group_end.get(level, 0), int(start[mid] + span[mid]))
+    links = table.links()
+    for mid in placed.tolist():
+        if table.stage[mid] == Stage.GROUP:
+            continue
+        row = int(start[mid])
+        link = links[mid]
+        for feed in link.feeds:
+            src = feed.source
+            if src is None:
+                continue
+            if start[src] < 0:
+                violations.append(Violation("feed_unscheduled", mid, src, feed.text))
+            elif start[src] + span[src] > row:
+                violations.append(Violation("feed_order", mid, src, feed.text))
+        for level in link.gates:
+            if level in incomplete:
+                violations.append(Violation("gate_incomplete", mid, None, table.name(level)))
+            elif group_end.get(level, 0) > row:
+                violations.append(Violation("gate_order", mid, None,
+                                            f"{table.name(level)} {plan.end_label(group_end[level])} 才打完"))
+    return violations
+
+
+def violation_rows(violations, table, plan=None):
+    """顯示用：每個問題一列 (有排程時以比賽編號 No. 表示，否則為比賽清單的第幾場)"""
+    def label(mid):
+        if mid is None:
+            return ""
+        if plan is not None and plan.match_no[mid] > 0:
+            number = f"No.{plan.match_no[mid]}"
+        else:
+            number = f"#{mid + 1}"
+        return f"{number} {table.name(table.level[mid])} {table.name(table.team_a[mid])} vs {table.name(table.team_b[mid])}"
+
+    return [{"問題": KIND_LABELS[v.kind], "比賽": label(v.match_id), "相關比賽": label(v.other), "說明": v.detail}
+            for v in violations]
@@ -0,0 +1,197 @@
+"""
+多場館 / 多天排程
+
+- 每一組的初賽整組排在同一個場館，隊伍在初賽期間不用換場館
+- 每個場館的時段依時間接成一條時間軸 (scheduling.schedule_matches 的 sessions)，
+  各場館互不相干，交給 ProcessPoolExecutor 平行排程
+- 複賽 / 決賽排在決賽場館：等晉級的組別都打完 (從其他場館過來的另加移動時間) 才開始
+- 最後合併成一份大表 (model.Schedule + VenueLayout)，依時間、場地統一編號
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from model import MatchTable, Schedule, Stage
+from profiling import span
+from scheduling import multi_start_schedule, schedule_matches
+
+
+def venue_timeline(layout, venue):
+    """場館的時間軸：[(時段 index, 大表起始列, 時間軸起始格, 格數), ...]，依時間先後"""
+    timeline = []
+    offset = 0
+    for i in layout.venue_sessions(venue):
+        r0, r1 = layout.session_rows[i]
+        if r1 > r0:
+            timeline.append((i, r0, offset, r1 - r0))
+            offset += r1 - r0
+    return timeline
+
+
+def _session_bounds(layout, timeline):
+    """給 schedule_matches 的 sessions：[(結束格, 場地數), ...]"""
+    return [(offset + rows, layout.sessions[i].num_courts) for i, _, offset, rows in timeline]
+
+
+def _venue_capacity(layout, venue):
+    return sum(rows * layout.sessions[i].num_courts for i, _, _, rows in venue_timeline(layout, venue))
+
+
+def assign_venues(matches, layout, points_per_matchup, fixed=None, final_venue=None):
+    """
+    把每一組的初賽分到一個場館：依組別初賽總格數由大到小，
+    放到目前負載比例 (已分配格數 / 場館全部場地格數) 最低的場館
+    fixed: {組別: 場館} 指定的組別不動；final_venue 預先計入複賽 / 決賽的格數
+    回傳 {組別: 場館}
+    """
+    fixed = dict(fixed or {})
+    unknown = set(fixed.values()) - set(layout.venues)
+    if unknown:
+        raise ValueError(f"沒有這個場館：{', '.join(sorted(unknown))}")
+    load = {}
+    knockout = 0
+    for m in matches:
+        slots = int(m.get("points") or points_per_matchup)
+        if "初賽" in m.get("type", ""):
+            load[m['level']] = load.get(m['level'], 0) + slots
+        else:
+            knockout += slots
+
+    capacity = {v: _venue_capacity(layout, v) for v in layout.venues}
+    used = {v: 0 for v in layout.venues}
+    if final_venue is not None:
+        used[final_venue] += knockout
+    assignment = {}
+    for level, slots in load.items():
+        if level in fixed:
+            assignment[level] = fixed[level]
+            used[fixed[level]] += slots
+    for level, slots in sorted(load.items(), key=lambda x: (-x[1], x[0])):
+        if level in assignment:
+            continue
+        venue = min(layout.venues, key=lambda v: ((used[v] + slots) / max(capacity[v], 1), layout.venues.index(v)))
+        assignment[level] = venue
+        used[venue] += slots
+    return assignment
+
+
+def default_final_venue(layout):
+    """預設決賽場館：最後結束的場館 (同時結束時取場地格數多的)"""
+    return max(layout.venues, key=lambda v: (max(layout.sessions[i].end for i in layout.venue_sessions(v)),
+                                             _venue_capacity(layout, v)))
+
+
+def _solve_venue(matches, points_per_matchup, sessions, attempts, seed):
+    """在 worker 行程裡排一個場館；回傳 (placements, unscheduled)，比賽 id 為 matches 的 index"""
+    table = MatchTable.from_dicts(matches, points_per_matchup)
+    num_courts = max(c for _, c in sessions)
+    if attempts > 1:
+        placements, unscheduled, _, _ = multi_start_schedule(table, num_courts, sessions[-1][0], attempts,
+                                                             seed=seed, workers=1, sessions=sessions)
+        return placements, unscheduled
+    return schedule_matches(table, num_courts, sessions[-1][0], sessions=sessions)
+
+
+def _to_grid(layout, timeline, row, col):
+    """場館時間軸上的 (格, 場地) -> 大表的 (列, 欄)"""
+    for i, r0, offset, rows in timeline:
+        if offset <= row < offset + rows:
+            return r0 + row - offset, layout.session_cols[i][0] + col
+    raise ValueError(f"時間軸外的格數 {row}")
+
+
+def _timeline_time(layout, timeline, row):
+    """場館時間軸第 row 格的開始時間；超出時間軸時為 None"""
+    for _, r0, offset, rows in timeline:
+        if offset <= row < offset + rows:
+            return layout.row_times[r0 + row - offset]
+    return None
+
+
+def schedule_venues(matches, points_per_matchup, layout, venue_groups=None, final_venue=None,
+                    travel_minutes=0, attempts=1, seed=0, workers=None):
+    """
+    多場館排程；matches 為已依優先級排序的比賽 dict list
+    venue_groups: {組別: 場館} 指定分配 (其餘自動)；final_venue: 複賽 / 決賽的場館 (預設 default_final_venue)
+    travel_minutes: 從其他場館晉級的隊伍移動到決賽場館的時間
+    attempts > 1 時每個場館各自做多起點排程 (scheduling.multi_start_schedule)
+
+    回傳 (Schedule, {組別: 場館})；Schedule.table 的比賽順序同 matches
+    """
+    table = MatchTable.from_dicts(matches, points_per_matchup)
+    final_venue = final_venue or default_final_venue(layout)
+    if final_venue not in layout.venues:
+        raise ValueError(f"沒有這個場館：{final_venue}")
+    groups = assign_venues(matches, layout, points_per_matchup, venue_groups, final_venue)
+    timelines = {v: venue_timeline(layout, v) for v in layout.venues}
+
+    by_venue = {v: [] for v in layout.venues}
+    knockout = []
+    for mid, m in enumerate(matches):
+        if table.stage[mid] == Stage.GROUP:
+            by_venue[groups[m['level']]].append(mid)
+        else:
+            knockout.append(mid)
+
+    rows, cols = layout.shape
+    plan = Schedule(table, rows, cols, layout.row_times[0], layout.mins_per_point, layout)
+
+    # 1. 各場館的初賽平行排程
+    jobs = [(v, ids) for v, ids in by_venue.items() if ids and timelines[v]]
+    args = [([matches[i] for i in ids], points_per_matchup, _session_bounds(layout, timelines[v]), attempts, seed)
+            for v, ids in jobs]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    with span("venue_solves", venues=len(jobs), workers=workers):
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_solve_venue, *zip(*args)))
+        else:
+            results = [_solve_venue(*a) for a in args]
+    solved = {venue: placements for (venue, _), (placements, _) in zip(jobs, results)}
+    for venue, ids in jobs:
+        for p in solved[venue]:
+            row, col = _to_grid(layout, timelines[venue], p.row, p.col)
+            plan.place(ids[p.match_id], row, col, p.span)
+
+    # 2. 複賽 / 決賽：決賽場館自己的初賽打完、且晉級組別都到齊後才開始
+    timeline = timelines[final_venue]
+    if knockout and timeline:
+        links = table.links()
+        travel = timedelta(minutes=travel_minutes)
+        group_ready, incomplete = {}, set()
+        for mid in range(len(table)):
+            if table.stage[mid] != Stage.GROUP:
+                continue
+            lvl = table.level[mid]
+            if plan.start[mid] < 0:
+                incomplete.add(lvl)
+                continue
+            ready = plan.end_time(plan.start[mid] + plan.span[mid])
+            if groups[table.name(lvl)] != final_venue:
+                ready += travel
+            group_ready[lvl] = max(group_ready.get(lvl, ready), ready)
+        gates = set().union(*(links[mid].gates for mid in knockout))
+        release = max((group_ready[lvl] for lvl in gates if lvl in group_ready), default=None)
+
+        start_row = max((p.row + p.span for p in solved.get(final_venue, ())), default=0)
+        if release is not None:
+            while (_timeline_time(layout, timeline, start_row) or release) < release:
+                start_row += 1
+
+        bounds = [(end - start_row, courts) for end, courts in _session_bounds(layout, timeline) if end > start_row]
+        if bounds:
+            with span("knockout_solve", matches=len(knockout)):
+                placements, _ = _solve_venue([matches[i] for i in knockout], points_per_matchup, bounds, 1, seed)
+            # 有初賽沒排進去的組別，晉級對手無法確定：依賴它的比賽 (含後續輪次) 都不排
+            dropped = set()
+            for p in sorted(placements, key=lambda p: p.row):
+                mid = knockout[p.match_id]
+                link = links[mid]
+                if link.gates & incomplete or any(f.source in dropped for f in link.feeds):
+                    dropped.add(mid)
+                    continue
+                row, col = _to_grid(layout, timeline, start_row + p.row, p.col)
+                plan.place(mid, row, col, p.span)
+
+    plan.renumber()
+    return plan, groups